@@ -0,0 +1,273 @@
+"""Seat allocation systems, for counterfactuals over the results of an
+election.
+
+Election.party_seats counts seats by first past the post.  The systems here
+allocate seats from a Tally instead: the popular vote, first-past-the-post
+seats and number of ridings of an election, all of which Election keeps up
+to date as votes are recorded.  An election's tally is taken once and can
+then be handed to any number of systems, so comparing several systems does
+not add up the votes again for each one.
+
+Highest averages methods (D'Hondt, Sainte-Laguë) give seats one at a time to
+the party with the highest quotient votes / divisor.  Rather than giving out
+every seat that way, the seats each party is sure to get are counted first,
+with integer arithmetic, and only the last few are given out from a heap of
+quotients; the cost depends on the number of parties, not of seats.
+"""
+import heapq
+from fractions import Fraction
+from typing import Dict, List, Optional
+
+
+class Tally:
+    """The totals of an election that seat allocation systems work from.
+
+    === Public Attributes ===
+    votes: maps each party recorded in the election to its popular vote.
+    district_seats: maps each such party to the number of ridings it won
+        outright, as given by Election.party_seats.
+    ridings: the number of ridings recorded in the election.
+
+    === Representation Invariants ===
+    - self.votes and self.district_seats have the same keys, in the same
+      order
+    - sum(self.district_seats.values()) <= self.ridings
+    """
+    votes: Dict[str, int]
+    district_seats: Dict[str, int]
+    ridings: int
+
+    def __init__(self, votes: Dict[str, int], district_seats: Dict[str, int],
+                 ridings: int) -> None:
+        """Initialize a tally of an election with <ridings> ridings, in which
+        each party earned <votes> and won <district_seats>.
+        """
+        self.votes = votes
+        self.district_seats = district_seats
+        self.ridings = ridings
+
+
+class SeatAllocation:
+    """A system for allocating seats to parties from the tally of an
+    election.
+
+    This is an abstract class.  Only subclasses should be instantiated.
+    """
+
+    def allocate(self, tally: Tally) -> Dict[str, int]:
+        """Return the number of seats won by each party in <tally>, in the
+        order of tally.votes.
+        """
+        raise NotImplementedError
+
+
+class FirstPastThePost(SeatAllocation):
+    """Each riding is won by the party with the most votes there, as in
+    Election.party_seats.
+
+    >>> FirstPastThePost().allocate(Tally({'a': 5, 'b': 3}, {'a': 1, 'b': 1},
+    ...                                   2))
+    {'a': 1, 'b': 1}
+    """
+
+    def allocate(self, tally: Tally) -> Dict[str, int]:
+        """Return the number of ridings each party in <tally> won."""
+        return tally.district_seats.copy()
+
+
+class HighestAverages(SeatAllocation):
+    """A highest averages (divisor) method: each seat in turn goes to the
+    party with the highest quotient of its votes divided by the divisor for
+    the seats it has so far.  A party with k seats has divisor
+    first + step * k.
+
+    Of parties with equal quotients for the last seat, the one with more
+    votes, and then the one recorded first, gets it.
+
+    === Private Attributes ===
+    _seats: the number of seats to allocate, or None to allocate one for
+        each riding.
+    _threshold: the smallest fraction of the popular vote a party must have
+        to get any seats.
+    _first: the divisor of a party with no seats.
+    _step: the amount the divisor grows for each seat a party gets.
+
+    === Representation Invariants ===
+    - self._first >= 1 and self._step >= 1
+    """
+    _seats: Optional[int]
+    _threshold: float
+    _first: int
+    _step: int
+
+    def __init__(self, seats: Optional[int] = None, threshold: float = 0.0,
+                 first: int = 1, step: int = 1) -> None:
+        """Initialize a highest averages method allocating <seats> seats
+        (one per riding if None) among the parties with at least <threshold>
+        of the popular vote, with divisors <first>, <first> + <step>, ...
+        """
+        self._seats = seats
+        self._threshold = threshold
+        self._first = first
+        self._step = step
+
+    def allocate(self, tally: Tally) -> Dict[str, int]:
+        """Return the number of seats won by each party in <tally>.
+
+        >>> tally = Tally({'a': 100, 'b': 80, 'c': 30}, {}, 8)
+        >>> DHondt().allocate(tally)
+        {'a': 4, 'b': 3, 'c': 1}
+        >>> DHondt(threshold=0.15).allocate(tally)
+        {'a': 5, 'b': 3, 'c': 0}
+        """
+        seats = tally.ridings if self._seats is None else self._seats
+        total = sum(tally.votes.values())
+        eligible = {party: votes for party, votes in tally.votes.items()
+                    if votes > 0 and votes >= self._threshold * total}
+        won = self.apportion(eligible, seats)
+        return {party: won.get(party, 0) for party in tally.votes}
+
+    def apportion(self, votes: Dict[str, int], seats: int) -> Dict[str, int]:
+        """Return the number of seats each party in <votes> gets when <seats>
+        seats are allocated among them, ignoring the threshold.
+
+        Precondition: every value in <votes> is > 0.
+
+        >>> SainteLague().apportion({'a': 53000, 'b': 24000, 'c': 23000}, 7)
+        {'a': 3, 'b': 2, 'c': 2}
+        """
+        parties = list(votes)
+        total = sum(votes.values())
+        if seats <= 0 or total == 0:
+            return dict.fromkeys(parties, 0)
+
+        # Every quotient of at least total / (step * m) gets a seat if there
+        # are at most <seats> of them.  Start from m = seats, which gives each
+        # party about its share of the seats, and lower m until that holds;
+        # the seats counted are then sure to be allocated.
+        m = seats
+        won = self._seats_above(votes, parties, total, m)
+        given = sum(won)
+        while given > seats:
+            m = m * seats // given
+            won = self._seats_above(votes, parties, total, m)
+            given = sum(won)
+
+        heap = [(-Fraction(votes[parties[i]],
+                           self._first + self._step * won[i]),
+                 -votes[parties[i]], i) for i in range(len(parties))]
+        heapq.heapify(heap)
+        for _ in range(seats - given):
+            _, minus_votes, i = heapq.heappop(heap)
+            won[i] += 1
+            heapq.heappush(heap, (-Fraction(-minus_votes, self._first
+                                            + self._step * won[i]),
+                                  minus_votes, i))
+        return dict(zip(parties, won))
+
+    def _seats_above(self, votes: Dict[str, int], parties: List[str],
+                     total: int, m: int) -> List[int]:
+        """Return, for each party in <parties>, the number of its quotients
+        that are at least <total> / (self._step * <m>).
+        """
+        won = []
+        for party in parties:
+            # The largest divisor d with votes / d >= total / (step * m)
+            largest = votes[party] * self._step * m // total
+            if largest < self._first:
+                won.append(0)
+            else:
+                won.append((largest - self._first) // self._step + 1)
+        return won
+
+
+class DHondt(HighestAverages):
+    """The D'Hondt method, with divisors 1, 2, 3, ..."""
+
+    def __init__(self, seats: Optional[int] = None,
+                 threshold: float = 0.0) -> None:
+        """Initialize the D'Hondt method allocating <seats> seats (one per
+        riding if None) among the parties with at least <threshold> of the
+        popular vote.
+        """
+        HighestAverages.__init__(self, seats, threshold, 1, 1)
+
+
+class SainteLague(HighestAverages):
+    """The Sainte-Laguë method, with divisors 1, 3, 5, ..."""
+
+    def __init__(self, seats: Optional[int] = None,
+                 threshold: float = 0.0) -> None:
+        """Initialize the Sainte-Laguë method allocating <seats> seats (one
+        per riding if None) among the parties with at least <threshold> of
+        the popular vote.
+        """
+        HighestAverages.__init__(self, seats, threshold, 1, 2)
+
+
+class MixedMember(SeatAllocation):
+    """Mixed-member proportional representation.  Every riding elects its
+    first-past-the-post winner, and list seats are added so that each
+    party's total is, as far as possible, proportional to its popular vote.
+
+    A party gets list seats only if it has at least the threshold fraction
+    of the popular vote or won a riding.  The ridings plus the list seats
+    are apportioned among those parties by <method>, and each gets list
+    seats to make up the difference from the ridings it won.  A party that
+    won more ridings than it is entitled to keeps them, so the legislature
+    grows by the overhang.
+
+    === Private Attributes ===
+    _list_seats: the number of list seats.
+    _threshold: the smallest fraction of the popular vote that gets a party
+        list seats without winning a riding.
+    _method: the method used to apportion the seats.
+
+    >>> tally = Tally({'a': 45, 'b': 35, 'c': 20}, {'a': 2, 'b': 2, 'c': 0},
+    ...               4)
+    >>> MixedMember(4).allocate(tally)
+    {'a': 3, 'b': 3, 'c': 2}
+    >>> tally.district_seats = {'a': 4, 'b': 0, 'c': 0}
+    >>> MixedMember(4).allocate(tally)
+    {'a': 4, 'b': 3, 'c': 2}
+    """
+    _list_seats: int
+    _threshold: float
+    _method: HighestAverages
+
+    def __init__(self, list_seats: int, threshold: float = 0.05,
+                 method: Optional[HighestAverages] = None) -> None:
+        """Initialize mixed-member proportional representation with
+        <list_seats> list seats, open to parties with at least <threshold> of
+        the popular vote or a riding, apportioned by <method> (Sainte-Laguë
+        if None).
+        """
+        self._list_seats = list_seats
+        self._threshold = threshold
+        self._method = SainteLague() if method is None else method
+
+    def allocate(self, tally: Tally) -> Dict[str, int]:
+        """Return the total number of seats, ridings and list seats, won by
+        each party in <tally>.
+        """
+        total = sum(tally.votes.values())
+        eligible = {party: votes for party, votes in tally.votes.items()
+                    if votes > 0 and (votes >= self._threshold * total
+                                      or tally.district_seats[party] > 0)}
+        entitled = self._method.apportion(
+            eligible, tally.ridings + self._list_seats)
+        return {party: max(entitled.get(party, 0),
+                           tally.district_seats[party])
+                for party in tally.votes}
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'fractions', 'heapq', 'typing'
+        ]
+    })
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,79 @@
+import random
+from datetime import date
+
+from allocation import DHondt, FirstPastThePost, HighestAverages, \
+    MixedMember, SainteLague, Tally
+from elections import ArrayElection, Election, Jurisdiction
+
+
+def one_at_a_time(votes: dict, seats: int, first: int, step: int) -> dict:
+    """Return the seats each party in <votes> gets by a highest averages
+    method, giving out one seat at a time."""
+    won = dict.fromkeys(votes, 0)
+    for _ in range(seats):
+        best = max(votes, key=lambda p: (votes[p] / (first + step * won[p]),
+                                         votes[p]))
+        won[best] += 1
+    return won
+
+
+def test_highest_averages_match_one_at_a_time() -> None:
+    """Test that counting sure seats first and then using a heap gives the
+    same seats as giving them out one at a time."""
+    rng = random.Random(1)
+    for trial in range(200):
+        votes = {'p{}'.format(i): rng.randint(1, 100000)
+                 for i in range(rng.randint(1, 8))}
+        seats = rng.randint(0, 120)
+        for method, first, step in [(DHondt(), 1, 1),
+                                    (SainteLague(), 1, 2),
+                                    (HighestAverages(first=2, step=3), 2, 3)]:
+            assert method.apportion(votes, seats) == \
+                one_at_a_time(votes, seats, first, step)
+
+
+def test_large_seat_count() -> None:
+    """Test that a very large number of seats is allocated in full."""
+    votes = {'a': 7000001, 'b': 2999999, 'c': 1}
+    won = SainteLague().apportion(votes, 10 ** 6)
+    assert sum(won.values()) == 10 ** 6
+    assert won == {'a': 700000, 'b': 300000, 'c': 0}
+
+
+def test_election_systems_share_tally() -> None:
+    """Test the systems on an election read from a data file, and that the
+    first-past-the-post system agrees with party_seats."""
+    for kind in [Election, ArrayElection]:
+        e = kind(date(2015, 10, 19))
+        for path in ['data/parkdale-highpark.csv', 'data/nunavut.csv',
+                     'data/labrador.csv']:
+            with open(path, encoding='utf-8') as file:
+                e.read_results(file)
+        results = e.seat_allocations({
+            'fptp': FirstPastThePost(),
+            'dhondt': DHondt(seats=100),
+            'mmp': MixedMember(3, threshold=0.1)})
+        assert results['fptp'] == e.party_seats()
+        assert sum(results['dhondt'].values()) == 100
+        assert results['dhondt']['Liberal'] > results['dhondt']['Green Party']
+        assert list(results['mmp']) == list(e.popular_vote())
+        for party in results['mmp']:
+            assert results['mmp'][party] >= results['fptp'][party]
+        assert sum(results['mmp'].values()) >= 6
+
+    j = Jurisdiction('Canada')
+    j._elections[date(2015, 10, 19)] = e
+    assert j.seat_allocations({'fptp': FirstPastThePost()},
+                              end=date(2000, 1, 1)) == {}
+
+
+def test_mixed_member_threshold() -> None:
+    """Test that parties below the threshold get no list seats unless they
+    won a riding."""
+    tally = Tally({'a': 60, 'b': 36, 'c': 4}, {'a': 3, 'b': 0, 'c': 1}, 4)
+    assert MixedMember(6, threshold=0.05).allocate(tally) == \
+        {'a': 6, 'b': 4, 'c': 1}
+    tally.district_seats['c'] = 0
+    tally.district_seats['a'] = 4
+    assert MixedMember(6, threshold=0.05).allocate(tally) == \
+        {'a': 6, 'b': 4, 'c': 0}
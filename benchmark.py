@@ -0,0 +1,309 @@
+"""Benchmarks for the ingestion and query hot paths of elections.py.
+
+Each benchmark is timed over several repeats, and reported with the rows per
+second it processed (where it reads rows), percentiles of its latency, and the
+peak memory allocated during one extra, traced run.  Results are written as
+JSON, so that runs on two commits can be compared:
+
+    python benchmark.py --scale data --output before.json
+    python benchmark.py --scale data --output after.json
+    python benchmark.py --compare before.json after.json
+
+The data scale uses the csv files in data/.  The other scales use files made
+by generate_data.py; national is 338 ridings x 200 polls x 20 elections.
+They are written to a temporary directory before timing starts, and each
+benchmark opens the files it reads inside its timed body, so that the text
+of the files is never held in memory all at once.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from glob import glob
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from elections import ArrayElection, Election, Jurisdiction, clean_line
+from generate_data import election_date, write_elections
+from ingest import read_votes
+from instrument import percentiles
+
+# Synthetic scales: (ridings, polls per riding, parties, elections).
+SCALES = {
+    'small': (30, 20, 6, 4),
+    'medium': (100, 100, 8, 10),
+    'national': (338, 200, 10, 20),
+}
+
+# Columns of the csv files read by Election.read_results.
+_RIDING, _PARTY, _VOTES = 1, 13, 17
+
+
+def run_benchmark(name: str, func: Callable[[Any], Any], repeat: int,
+                  setup: Optional[Callable[[], Any]] = None,
+                  rows: Optional[int] = None) -> Dict[str, Any]:
+    """Time func(setup()) <repeat> times, not counting the time taken by
+    setup, and return the measurements.  <rows> is the number of rows func
+    processes, if it reads rows.
+    """
+    if setup is None:
+        setup = _no_setup
+    samples = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        func(arg)
+        samples.append(time.perf_counter() - start)
+
+    arg = setup()
+    tracemalloc.start()
+    func(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {'name': name, 'repeat': repeat,
+              'latency_ms': percentiles(samples),
+              'peak_memory_bytes': peak}
+    if rows is not None:
+        result['rows'] = rows
+        result['rows_per_sec'] = round(rows / min(samples))
+    return result
+
+
+def _no_setup() -> None:
+    """Return None, for benchmarks that need no setup."""
+    return None
+
+
+def _load(paths: List[str], kind: type = Election,
+          legacy: bool = False) -> Election:
+    """Return an election of class <kind> holding the results of the csv
+    files at <paths>.
+    """
+    election = kind(date(2015, 10, 19))
+    for path in paths:
+        with open(path, encoding='utf-8') as file:
+            election.read_results(file, legacy)
+    return election
+
+
+def _load_mapped(paths: List[str]) -> Election:
+    """Return an election holding the results of the csv files at <paths>,
+    read with Election.read_mapped.
+    """
+    election = Election(date(2015, 10, 19))
+    for path in paths:
+        election.read_mapped(path)
+    return election
+
+
+def _clean_lines(paths: List[str]) -> int:
+    """Split every line after the header of the csv files at <paths> with
+    clean_line, and return the number of lines split.
+    """
+    rows = 0
+    for path in paths:
+        with open(path, encoding='utf-8') as file:
+            next(file, None)
+            for line in file:
+                clean_line(line)
+                rows += 1
+    return rows
+
+
+def _read_triples(paths: List[str]) -> List[Tuple[str, str, int]]:
+    """Return the riding, party and votes of every row with votes in the csv
+    files at <paths>.
+    """
+    triples = []
+    for path in paths:
+        with open(path, encoding='utf-8') as file:
+            triples.extend(read_votes(file, _RIDING, _PARTY, _VOTES))
+    return triples
+
+
+def benchmark_elections(paths: List[str], repeat: int) -> List[Dict]:
+    """Return the results of the Election benchmarks, run on the csv files
+    at <paths>.
+    """
+    rows = _clean_lines(paths)
+    triples = _read_triples(paths)
+
+    def replay(election: Election) -> None:
+        """Record every triple in <election>."""
+        for riding, party, votes in triples:
+            election.update_results(riding, party, votes)
+
+    loaded = _load(paths)
+
+    return [
+        run_benchmark('clean_line', lambda _: _clean_lines(paths), repeat,
+                      rows=rows),
+        run_benchmark('Election.read_results',
+                      lambda _: _load(paths), repeat, rows=rows),
+        run_benchmark('Election.read_results[legacy]',
+                      lambda _: _load(paths, legacy=True), repeat, rows=rows),
+        run_benchmark('ArrayElection.read_results',
+                      lambda _: _load(paths, ArrayElection), repeat,
+                      rows=rows),
+        run_benchmark('Election.read_mapped',
+                      lambda _: _load_mapped(paths), repeat, rows=rows),
+        run_benchmark('Election.update_results', replay, repeat,
+                      setup=lambda: Election(date(2015, 10, 19)),
+                      rows=len(triples)),
+        run_benchmark('ArrayElection.update_results', replay, repeat,
+                      setup=lambda: ArrayElection(date(2015, 10, 19)),
+                      rows=len(triples)),
+        run_benchmark('Election.popular_vote',
+                      lambda _: loaded.popular_vote(), repeat),
+        run_benchmark('Election.party_seats[cold]',
+                      lambda election: election.party_seats(), repeat,
+                      setup=lambda: Election.combine(loaded)),
+        run_benchmark('Election.party_seats',
+                      lambda _: loaded.party_seats(), repeat),
+    ]
+
+
+def benchmark_jurisdiction(elections: Dict[date, List[str]],
+                           repeat: int) -> List[Dict]:
+    """Return the results of the Jurisdiction benchmarks, run on a
+    jurisdiction holding, for each date in <elections>, the results of the
+    csv files at the paths listed under it.
+
+    Each query is timed with the query cache turned off, so that the query
+    itself is measured, and then again, marked [cached], answered from the
+    cache.
+    """
+    uncached = Jurisdiction('Canada', cache_size=0)
+    cached = Jurisdiction('Canada')
+    for jurisdiction in [uncached, cached]:
+        for d in elections:
+            for path in elections[d]:
+                with open(path, encoding='utf-8') as file:
+                    jurisdiction.read_results(d.year, d.month, d.day, file)
+    party = uncached.parties()[0]
+
+    results = []
+    for suffix, jurisdiction in [('', uncached), ('[cached]', cached)]:
+        results.extend([
+            run_benchmark('Jurisdiction.party_history' + suffix,
+                          lambda _, j=jurisdiction: j.party_history(party),
+                          repeat),
+            run_benchmark('Jurisdiction.party_wins' + suffix,
+                          lambda _, j=jurisdiction: j.party_wins(party),
+                          repeat),
+            run_benchmark('Jurisdiction.riding_changes' + suffix,
+                          lambda _, j=jurisdiction: j.riding_changes(),
+                          repeat),
+        ])
+    return results
+
+
+def run_suite(scale: str, repeat: int) -> Dict[str, Any]:
+    """Return the results of every benchmark at <scale>, repeated <repeat>
+    times, with details of the machine and commit they were run on.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        if scale == 'data':
+            paths = sorted(glob('data/*.csv'))
+            # The files are split into elections so that their ridings
+            # change.
+            elections = {date(2000 + i, 1, 1): [paths[i]]
+                         for i in range(len(paths))}
+        else:
+            # Without commas in quoted cells, the files can also be read by
+            # clean_line.
+            ridings, polls, parties, n_elections = SCALES[scale]
+            generated = write_elections(directory, ridings, polls, parties,
+                                        n_elections, 0, quoted_commas=False)
+            elections = {election_date(i): [generated[i]]
+                         for i in range(n_elections)}
+            paths = elections[election_date(0)]
+
+        results = benchmark_elections(paths, repeat) + \
+            benchmark_jurisdiction(elections, repeat)
+    for result in results:
+        result['scale'] = scale
+    return {'meta': _metadata(), 'results': results}
+
+
+def _metadata() -> Dict[str, Any]:
+    """Return details of the machine, interpreter and commit in use."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'python': sys.version.split()[0],
+            'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any],
+            threshold: float = 0.1) -> List[str]:
+    """Return a line for each benchmark in both <old> and <new> comparing its
+    median latency, marked REGRESSION if <new> is slower by more than
+    <threshold> as a fraction of <old>.
+
+    >>> old = {'results': [{'name': 'a', 'scale': 's',
+    ...                     'latency_ms': {'p50': 1.0}}]}
+    >>> new = {'results': [{'name': 'a', 'scale': 's',
+    ...                     'latency_ms': {'p50': 1.5}}]}
+    >>> compare(old, new)
+    ['a [s]: 1.0 ms -> 1.5 ms (x1.50) REGRESSION']
+    """
+    old_results = {(r['name'], r['scale']): r for r in old['results']}
+    lines = []
+    for result in new['results']:
+        key = (result['name'], result['scale'])
+        if key in old_results:
+            before = old_results[key]['latency_ms']['p50']
+            after = result['latency_ms']['p50']
+            ratio = after / before if before > 0 else 1.0
+            line = '{} [{}]: {} ms -> {} ms (x{:.2f})'.format(
+                key[0], key[1], before, after, ratio)
+            if ratio > 1 + threshold:
+                line += ' REGRESSION'
+            lines.append(line)
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the benchmarks, or compare two earlier runs, as described by the
+    command line arguments <argv>.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', default='data',
+                        choices=['data'] + list(SCALES))
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help='write the JSON results here')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two JSON results instead')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        results = []
+        for path in args.compare:
+            with open(path) as file:
+                results.append(json.load(file))
+        print('\n'.join(compare(results[0], results[1], args.threshold)))
+        return
+
+    report = json.dumps(run_suite(args.scale, args.repeat), indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
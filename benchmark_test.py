@@ -0,0 +1,45 @@
+import json
+
+from benchmark import compare, main, run_suite
+
+
+def test_run_suite_reports_every_benchmark() -> None:
+    """Test that run_suite reports latency and memory for every hot path, and
+    rows per second for those that read rows."""
+    report = run_suite('data', 1)
+    names = {result['name'] for result in report['results']}
+    assert {'clean_line', 'Election.read_results', 'Election.update_results',
+            'Election.popular_vote', 'Election.party_seats',
+            'Jurisdiction.party_history', 'Jurisdiction.party_wins',
+            'Jurisdiction.riding_changes',
+            'Jurisdiction.party_history[cached]'} <= names
+    for result in report['results']:
+        assert result['latency_ms']['p50'] >= 0
+        assert result['peak_memory_bytes'] >= 0
+        if result['name'] == 'Election.read_results':
+            assert result['rows'] == 7360
+            assert result['rows_per_sec'] > 0
+    json.dumps(report)
+
+
+def test_main_writes_and_compares(tmp_path, capsys) -> None:
+    """Test that main writes JSON results that it can then compare."""
+    path = str(tmp_path / 'small.json')
+    main(['--scale', 'small', '--repeat', '1', '--output', path])
+    main(['--compare', path, path])
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 16
+    assert not any('REGRESSION' in line for line in lines)
+
+
+def test_compare_skips_missing() -> None:
+    """Test that compare only reports benchmarks that are in both runs."""
+    old = {'results': [{'name': 'a', 'scale': 's', 'latency_ms': {'p50': 2}}]}
+    new = {'results': [{'name': 'a', 'scale': 's', 'latency_ms': {'p50': 1}},
+                       {'name': 'b', 'scale': 's', 'latency_ms': {'p50': 1}}]}
+    assert compare(old, new) == ['a [s]: 2 ms -> 1 ms (x0.50)']
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main(['benchmark_test.py'])
@@ -0,0 +1,188 @@
+"""Chunked, resumable reading of large csv files of election results.
+
+read_resumable reads a file a fixed number of lines at a time into a
+partial election.  After each chunk it writes a checkpoint: a snapshot (see
+snapshot.py) of the partial election, whose name holds the byte offset
+reached, the data rows read so far, and a SHA-256 hash of the bytes before
+that offset.  If the job fails part way, through a bad row or by being
+killed, a later call with the same checkpoint path starts from the last
+checkpoint instead of from the first row.  A checkpoint is only used if the
+part of the file it covers has not changed, so a bad row after it can be
+fixed before resuming.
+
+Each chunk is parsed in full before any of it is added to the partial
+election, so a bad row leaves the partial election as it was at the end of
+the previous chunk.
+
+Chunks end, and reading resumes, at line breaks, so a file read this way
+must not have line breaks inside quoted cells.
+"""
+import hashlib
+import json
+import os
+import time
+from itertools import islice
+from typing import Any, Callable, Optional, Tuple
+
+from elections import Election, PARTY, RIDING, VOTES
+from ingest import parse_votes
+from snapshot import read_snapshot, write_snapshot
+
+# The number of lines read between checkpoints by default.
+DEFAULT_CHUNK_ROWS = 100000
+
+# The number of bytes read at a time when hashing the part of a file covered
+# by a checkpoint.
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+class Progress:
+    """How far read_resumable has got through a file.
+
+    === Public Attributes ===
+    rows: the number of data rows read so far, including any read before the
+        job was resumed.  The header line and blank lines are not counted.
+    bytes_read: the number of bytes of the file read so far, including its
+        header line.
+    total_bytes: the size of the file in bytes.
+    rows_per_sec: the rows read per second since this job started or
+        resumed.
+    """
+    rows: int
+    bytes_read: int
+    total_bytes: int
+    rows_per_sec: float
+
+    def __init__(self, rows: int, bytes_read: int, total_bytes: int,
+                 rows_per_sec: float) -> None:
+        """Initialize the progress of a job that has read <rows> rows."""
+        self.rows = rows
+        self.bytes_read = bytes_read
+        self.total_bytes = total_bytes
+        self.rows_per_sec = rows_per_sec
+
+
+def read_resumable(election: Election, path: str, checkpoint_path: str,
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                   progress: Optional[Callable[[Progress], None]] = None
+                   ) -> None:
+    """Update <election> with the results in the csv file at <path>, reading
+    <chunk_rows> lines at a time and checkpointing to <checkpoint_path> after
+    each chunk.
+
+    If <checkpoint_path> holds a checkpoint of this file, and the part of the
+    file it covers is unchanged, reading resumes from it.  <progress>, if
+    given, is called after each chunk.  Once the whole file has been read, its
+    results are added to <election> (as by Election.merge, so the result is
+    the same as calling read_results) and the checkpoint is removed.
+
+    Raise ValueError if a row cannot be parsed; the checkpoint of the last
+    whole chunk is kept, so the job can be resumed once the file is fixed.
+
+    Precondition: <path> is a csv file, in the format defined in the A0
+    handout, with no line breaks inside quoted cells.  chunk_rows >= 1
+    """
+    total_bytes = os.path.getsize(path)
+    partial, offset, rows, sha = _load_checkpoint(checkpoint_path, path,
+                                                  type(election))
+    if partial is None:
+        partial = type(election)(election.election_date())
+    start_rows = rows
+    start_time = time.perf_counter()
+
+    with open(path, 'rb') as input_file:
+        if offset == 0:
+            sha.update(input_file.readline())
+        else:
+            input_file.seek(offset)
+        offset = input_file.tell()
+
+        lines = list(islice(input_file, chunk_rows))
+        while lines:
+            try:
+                votes = list(parse_votes([line.decode('utf-8')
+                                          for line in lines],
+                                         RIDING, PARTY, VOTES))
+            except (ValueError, IndexError) as error:
+                raise ValueError('{}: bad row in the chunk starting at byte '
+                                 '{}: {}'.format(path, offset, error)) \
+                    from error
+            for riding, party, count in votes:
+                partial.update_results(riding, party, count)
+            for line in lines:
+                sha.update(line)
+            rows += sum(1 for line in lines if line.strip())
+            offset = input_file.tell()
+            _save_checkpoint(checkpoint_path, path, partial, offset, rows,
+                             sha.hexdigest())
+
+            if progress is not None:
+                elapsed = time.perf_counter() - start_time
+                progress(Progress(rows, offset, total_bytes,
+                                  (rows - start_rows) / elapsed
+                                  if elapsed > 0 else 0.0))
+            lines = list(islice(input_file, chunk_rows))
+
+    election.merge(partial)
+    try:
+        os.remove(checkpoint_path)
+    except FileNotFoundError:
+        pass
+
+
+def _save_checkpoint(checkpoint_path: str, path: str, partial: Election,
+                     offset: int, rows: int, digest: str) -> None:
+    """Write a checkpoint of <partial>, which holds the results in the first
+    <rows> data rows of the file at <path>.  They end at byte <offset>, and the
+    bytes before it have the SHA-256 hash <digest>.
+    """
+    meta = json.dumps({'path': os.path.abspath(path), 'offset': offset,
+                       'rows': rows, 'sha256': digest})
+    write_snapshot(checkpoint_path, meta, [partial.to_record()])
+
+
+def _load_checkpoint(checkpoint_path: str, path: str, kind: type
+                     ) -> Tuple[Optional[Election], int, int, Any]:
+    """Return the partial election of class <kind>, byte offset and data rows
+    read in the checkpoint at <checkpoint_path>, together with a SHA-256 hash
+    object that has been given the bytes of the file at <path> before that
+    offset.
+
+    If there is no such checkpoint, or it is not of this file, or the part
+    of the file it covers has changed, return None, 0, 0 and a new hash
+    object.
+    """
+    sha = hashlib.sha256()
+    try:
+        meta, records = read_snapshot(checkpoint_path)
+        meta = json.loads(meta)
+    except (OSError, ValueError):
+        return None, 0, 0, sha
+    if meta.get('path') != os.path.abspath(path) or len(records) != 1:
+        return None, 0, 0, sha
+
+    remaining = meta['offset']
+    with open(path, 'rb') as input_file:
+        while remaining > 0:
+            chunk = input_file.read(min(remaining, _HASH_CHUNK_SIZE))
+            if not chunk:
+                break
+            sha.update(chunk)
+            remaining -= len(chunk)
+    if remaining > 0 or sha.hexdigest() != meta['sha256']:
+        return None, 0, 0, hashlib.sha256()
+    return kind.from_record(records[0]), meta['offset'], meta['rows'], sha
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-io': ['read_resumable', '_load_checkpoint'],
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'hashlib', 'itertools', 'json', 'os',
+            'time', 'typing', 'elections', 'ingest', 'snapshot'
+        ]
+    })
+
+    import doctest
+    doctest.testmod()
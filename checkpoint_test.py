@@ -0,0 +1,127 @@
+import os
+from datetime import date
+
+import pytest
+
+from checkpoint import Progress, read_resumable
+from elections import ArrayElection, Election
+
+
+def read_directly(path: str) -> Election:
+    """Return an Election holding the results in the csv file at <path>."""
+    e = Election(date(2015, 10, 19))
+    with open(path, encoding='utf-8') as file:
+        e.read_results(file)
+    return e
+
+
+def test_reads_in_chunks(tmp_path) -> None:
+    """Test that reading in chunks gives the same results as read_results,
+    reports progress after each chunk and removes its checkpoint."""
+    checkpoint = str(tmp_path / 'parkdale.checkpoint')
+    reports = []
+    e = Election(date(2015, 10, 19))
+    read_resumable(e, 'data/parkdale-highpark.csv', checkpoint, 200,
+                   reports.append)
+    assert e._results == read_directly('data/parkdale-highpark.csv')._results
+    assert [p.rows for p in reports] == [200 * i for i in range(1, 10)] + \
+        [1848]
+    assert reports[-1].bytes_read == reports[-1].total_bytes == \
+        os.path.getsize('data/parkdale-highpark.csv')
+    assert all(p.rows_per_sec > 0 for p in reports)
+    assert not os.path.exists(checkpoint)
+
+
+def test_resumes_after_kill(tmp_path) -> None:
+    """Test that a job stopped part way resumes from its last checkpoint."""
+    checkpoint = str(tmp_path / 'parkdale.checkpoint')
+
+    def stop_after_three(progress: Progress) -> None:
+        if progress.rows == 600:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        read_resumable(Election(date(2015, 10, 19)),
+                       'data/parkdale-highpark.csv', checkpoint, 200,
+                       stop_after_three)
+    assert os.path.exists(checkpoint)
+
+    reports = []
+    e = ArrayElection(date(2015, 10, 19))
+    read_resumable(e, 'data/parkdale-highpark.csv', checkpoint, 200,
+                   reports.append)
+    assert reports[0].rows == 800
+    assert e.summary() == \
+        read_directly('data/parkdale-highpark.csv').summary()
+
+
+def test_resumes_after_bad_row_fixed(tmp_path) -> None:
+    """Test that a bad row stops the job with a ValueError, and that once it
+    is fixed the job resumes from the chunk holding it."""
+    path = str(tmp_path / 'parkdale.csv')
+    with open('data/parkdale-highpark.csv', encoding='utf-8') as file:
+        lines = file.readlines()
+    good = lines[250]
+    lines[250] = good.rsplit(',', 1)[0] + ',oops\n'
+    with open(path, 'w', encoding='utf-8') as file:
+        file.writelines(lines)
+
+    checkpoint = str(tmp_path / 'parkdale.checkpoint')
+    with pytest.raises(ValueError):
+        read_resumable(Election(date(2015, 10, 19)), path, checkpoint, 100)
+
+    lines[250] = good
+    with open(path, 'w', encoding='utf-8') as file:
+        file.writelines(lines)
+    reports = []
+    e = Election(date(2015, 10, 19))
+    read_resumable(e, path, checkpoint, 100, reports.append)
+    assert reports[0].rows == 300
+    assert e._results == read_directly('data/parkdale-highpark.csv')._results
+
+
+def test_counts_data_rows_only(tmp_path) -> None:
+    """Test that blank lines are not counted as rows read, before or after
+    the job is resumed."""
+    path = str(tmp_path / 'nunavut.csv')
+    with open('data/nunavut.csv', encoding='utf-8') as file:
+        lines = file.readlines()
+    with open(path, 'w', encoding='utf-8') as file:
+        file.writelines(lines[:51] + ['\n'] * 10 + lines[51:] + ['\n'])
+    checkpoint = str(tmp_path / 'nunavut.checkpoint')
+
+    def stop(progress: Progress) -> None:
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        read_resumable(Election(date(2015, 10, 19)), path, checkpoint, 100,
+                       stop)
+    reports = []
+    e = Election(date(2015, 10, 19))
+    read_resumable(e, path, checkpoint, 100, reports.append)
+    assert [p.rows for p in reports] == [190, 244]
+    assert e._results == read_directly('data/nunavut.csv')._results
+
+def test_ignores_stale_checkpoint(tmp_path) -> None:
+    """Test that a checkpoint of a file whose read part has changed, or of
+    another file, is not used."""
+    path = str(tmp_path / 'nunavut.csv')
+    with open('data/nunavut.csv', encoding='utf-8') as file:
+        text = file.read()
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    checkpoint = str(tmp_path / 'nunavut.checkpoint')
+
+    def stop(progress: Progress) -> None:
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        read_resumable(Election(date(2015, 10, 19)), path, checkpoint, 100,
+                       stop)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text.replace('Nunavut', 'Nunavvt', 2))
+    reports = []
+    e = Election(date(2015, 10, 19))
+    read_resumable(e, path, checkpoint, 100, reports.append)
+    assert reports[0].rows == 100
+    assert 'Nunavvt' in e._results
@@ -1,5 +1,9 @@
-from elections import Election, Jurisdiction
+import asyncio
+from elections import Election, ArrayElection, Jurisdiction
+from timeline import Timeline
 from datetime import date
+from glob import glob
+from io import StringIO
 
 def test_init() -> None:
     """Test function for Election.__init__.
@@ -205,6 +209,572 @@ def test_small_data() -> None:
            {"Liberal": 2940, "Green Party": 76, "Conservative": 773,
             "NDP-New Democratic Party": 293}
 
+def test_array_election_matches_election() -> None:
+    """Test function for ArrayElection.
+    Testing to see whether an ArrayElection read from a data file gives the
+    same results as an Election read from the same file."""
+    e = Election(date(2015, 10, 19))
+    a = ArrayElection(date(2015, 10, 19))
+    for filename in ['data/parkdale-highpark.csv', 'data/nunavut.csv']:
+        with open(filename) as file:
+            e.read_results(file)
+        with open(filename) as file:
+            a.read_results(file)
+    assert a.ridings_recorded() == e.ridings_recorded()
+    assert a.popular_vote() == e.popular_vote()
+    assert a.party_seats() == e.party_seats()
+    assert a.election_winners() == e.election_winners()
+    for riding in e.ridings_recorded():
+        assert a.riding_winners(riding) == e.riding_winners(riding)
+        for party in e._parties:
+            assert a.results_for(riding, party) == e.results_for(riding, party)
+
+
+def test_array_election_many_parties() -> None:
+    """Test function for ArrayElection.update_results.
+    Testing to see whether counts survive the count matrix being widened when
+    more parties are recorded than there are columns allocated."""
+    a = ArrayElection(date(2000, 3, 25))
+    for i in range(20):
+        a.update_results('r1', 'p' + str(i), i + 1)
+        a.update_results('r2', 'p' + str(i), 20 - i)
+    assert a.results_for('r1', 'p0') == 1
+    assert a.results_for('r2', 'p19') == 1
+    assert a.riding_winners('r1') == ['p19']
+    assert a.riding_winners('r2') == ['p0']
+    assert a.popular_vote() == {'p' + str(i): 21 for i in range(20)}
+
+
+def test_columnar_jurisdiction() -> None:
+    """Test function for Jurisdiction.read_results with columnar=True."""
+    j = Jurisdiction('Canada', columnar=True)
+    with open('data/small_data.csv') as data:
+        j.read_results(2000, 3, 25, data)
+    assert isinstance(j._elections[date(2000, 3, 25)], ArrayElection)
+    assert j._elections[date(2000, 3, 25)].popular_vote() == \
+           {"Liberal": 2940, "Green Party": 76, "Conservative": 773,
+            "NDP-New Democratic Party": 293}
+
+def test_summary() -> None:
+    """Test function for Election.summary and ArrayElection.summary.
+    Testing to see whether summary agrees with popular_vote, party_seats and
+    riding_winners, including in a tied riding."""
+    for e in [Election(date(2000, 3, 25)), ArrayElection(date(2000, 3, 25))]:
+        with open('data/university-rosedale.csv') as file:
+            e.read_results(file)
+        e.update_results('tied', 'Liberal', 10)
+        e.update_results('tied', 'Conservative', 10)
+        votes, seats, winners = e.summary()
+        assert votes == e.popular_vote()
+        assert seats == e.party_seats()
+        assert winners == {riding: e.riding_winners(riding)
+                           for riding in e.ridings_recorded()}
+        assert len(winners['tied']) == 2
+
+def test_read_results_quoted_commas() -> None:
+    """Test function for Election.read_results.
+    Testing to see whether a quoted poll name containing a comma does not
+    shift the riding, party and votes columns."""
+    file = StringIO(
+        'header\n'
+        '35090,"St. Paul\'s","St. Paul\'s","1","Smith, John School",N,N,"",1,'
+        '367,"Bennett","","Carolyn","Liberal","Libéral",Y,Y,113\n')
+    e = Election(date(2000, 3, 25))
+    e.read_results(file)
+    assert e._results == {"St. Paul's": {'Liberal': 113}}
+
+
+def test_read_results_legacy() -> None:
+    """Test function for Election.read_results.
+    Testing to see whether the quote-aware reader gives the same results as
+    the clean_line reader on every data file."""
+    for filename in glob('data/*.csv'):
+        e1 = Election(date(2000, 3, 25))
+        e2 = Election(date(2000, 3, 25))
+        with open(filename, encoding='utf-8') as file:
+            e1.read_results(file)
+        with open(filename, encoding='utf-8') as file:
+            e2.read_results(file, legacy=True)
+        assert e1._ridings == e2._ridings
+        assert e1._parties == e2._parties
+        assert e1._results == e2._results
+
+def test_read_many() -> None:
+    """Test function for Jurisdiction.read_many.
+    Testing to see whether reading files in parallel gives the same election
+    as reading them one after another."""
+    paths = ['data/parkdale-highpark.csv', 'data/nunavut.csv',
+             'data/labrador.csv', 'data/small_data.csv']
+    for columnar in [False, True]:
+        sequential = Jurisdiction('Canada', columnar)
+        for path in paths:
+            with open(path, encoding='utf-8') as file:
+                sequential.read_results(2015, 10, 19, file)
+        parallel = Jurisdiction('Canada', columnar)
+        parallel.read_many(2015, 10, 19, paths[:1], workers=1)
+        parallel.read_many(2015, 10, 19, paths[1:], workers=2)
+        e1 = sequential._elections[date(2015, 10, 19)]
+        e2 = parallel._elections[date(2015, 10, 19)]
+        assert e2._ridings == e1._ridings
+        assert e2._parties == e1._parties
+        assert e2.summary() == e1.summary()
+        if not columnar:
+            assert e2._results == e1._results
+
+def test_merge() -> None:
+    """Test function for Election.merge and ArrayElection.merge.
+    Testing to see whether merging elections read from separate files gives
+    the same results as reading the files into one election, including when
+    the party columns of the two count matrices do not line up."""
+    paths = ['data/nunavut.csv', 'data/labrador.csv', 'data/small_data.csv']
+    for kind in [Election, ArrayElection]:
+        expected = kind(date(2015, 10, 19))
+        partials = []
+        for path in reversed(paths):
+            partial = kind(date(2015, 10, 19))
+            with open(path, encoding='utf-8') as file:
+                partial.read_results(file)
+            with open(path, encoding='utf-8') as file:
+                expected.read_results(file)
+            partials.append(partial)
+        combined = kind.combine(*partials)
+        assert type(combined) is kind
+        assert combined._ridings == expected._ridings
+        assert combined._parties == expected._parties
+        assert combined.summary() == expected.summary()
+
+
+def test_merge_mixed() -> None:
+    """Test function for Election.merge.
+    Testing to see whether an Election and an ArrayElection can be merged
+    into each other."""
+    e = Election(date(2000, 3, 25))
+    e.update_results('r1', 'ndp', 5)
+    a = ArrayElection(date(2000, 3, 25))
+    a.update_results('r1', 'pc', 3)
+    a.update_results('r2', 'ndp', 1)
+    e.merge(a)
+    assert e._results == {'r1': {'ndp': 5, 'pc': 3}, 'r2': {'ndp': 1}}
+    a.merge(e)
+    assert a.popular_vote() == {'pc': 6, 'ndp': 7}
+
+def test_memoized_results_follow_updates() -> None:
+    """Test function for the memoized results of Election.
+    Testing to see whether party_seats, election_winners and riding_winners
+    change when a late result flips a riding, and whether only that riding's
+    winners are computed again."""
+    for kind in [Election, ArrayElection]:
+        e = kind(date(2000, 3, 25))
+        with open('data/parkdale-highpark.csv', encoding='utf-8') as file:
+            e.read_results(file)
+        e.update_results('r2', 'Green Party', 10)
+        assert e.party_seats()['Liberal'] == 1
+        assert e.election_winners() == ['Green Party', 'Liberal']
+
+        recomputed = []
+        compute = e._compute_riding_winners
+
+        def counting_compute(riding: str) -> list:
+            recomputed.append(riding)
+            return compute(riding)
+
+        e._compute_riding_winners = counting_compute
+        e.update_results('Parkdale--High Park', 'NDP-New Democratic Party',
+                         10000)
+        assert e.riding_winners('Parkdale--High Park') == \
+            ['NDP-New Democratic Party']
+        assert e.party_seats()['Liberal'] == 0
+        assert e.party_seats()['NDP-New Democratic Party'] == 1
+        assert e.election_winners() == ['NDP-New Democratic Party',
+                                        'Green Party']
+        assert recomputed == ['Parkdale--High Park']
+        assert e.summary() == kind.combine(e).summary()
+
+
+def test_array_election_refreshes_matrix_at_once() -> None:
+    """Test function for the memoized results of ArrayElection.
+    Testing to see whether the winners of a freshly read election are all
+    computed in one pass over its count matrix, and agree with Election."""
+    e = Election(date(2015, 10, 19))
+    a = ArrayElection(date(2015, 10, 19))
+    for election in [e, a]:
+        for path in ['data/nunavut.csv', 'data/labrador.csv',
+                     'data/parkdale-highpark.csv']:
+            with open(path, encoding='utf-8') as file:
+                election.read_results(file)
+
+    recomputed = []
+    a._compute_riding_winners = recomputed.append
+    assert a.summary() == e.summary()
+    assert recomputed == []
+    assert a._dirty == set()
+
+
+def read_batches(path: str, size: int) -> list:
+    """Return the data lines of the csv file at <path>, in batches of <size>.
+    """
+    with open(path, encoding='utf-8') as file:
+        lines = file.readlines()[1:]
+    return [lines[i:i + size] for i in range(0, len(lines), size)]
+
+
+def test_stream_results() -> None:
+    """Test function for Election.stream_results.
+    Testing to see whether streaming a file in batches gives the same election
+    as reading it, and whether the deltas add up to the final results."""
+    paths = ['data/nunavut.csv', 'data/labrador.csv']
+    expected = Election(date(2015, 10, 19))
+    batches = []
+    for path in paths:
+        with open(path, encoding='utf-8') as file:
+            expected.read_results(file)
+        batches.extend(read_batches(path, 50))
+
+    for kind in [Election, ArrayElection]:
+        e = kind(date(2015, 10, 19))
+        votes = {}
+        seats = {}
+        for delta in e.stream_results(batches):
+            assert delta.election_winners == e.election_winners()
+            for party in delta.popular_vote:
+                votes[party] = votes.get(party, 0) + delta.popular_vote[party]
+            for party in delta.party_seats:
+                seats[party] = seats.get(party, 0) + delta.party_seats[party]
+        assert e.summary() == expected.summary()
+        assert votes == expected.popular_vote()
+        assert {party: seats[party] for party in seats if seats[party]} == \
+            {party: n for party, n in expected.party_seats().items() if n}
+
+
+def test_stream_results_only_changed_ridings() -> None:
+    """Test function for Election.stream_results.
+    Testing to see whether a batch only reports the ridings it changed, and
+    whether rows given one at a time are each a batch."""
+    e = Election(date(2015, 10, 19))
+    with open('data/parkdale-highpark.csv', encoding='utf-8') as file:
+        e.read_results(file)
+    rows = ['1,"r1",,,,,,,,,,,,"Liberal",,,,3',
+            ['1', 'r2', '', '', '', '', '', '', '', '', '', '', '',
+             'Green Party', '', '', '', '0']]
+    deltas = list(e.stream_results(rows, batched=False))
+    assert len(deltas) == 2
+    assert deltas[0].riding_winners == {'r1': ['Liberal']}
+    assert deltas[0].party_seats == {'Liberal': 1}
+    assert deltas[1].rows == 1
+    assert deltas[1].riding_winners == {}
+    assert deltas[1].popular_vote == {}
+
+
+def test_astream_results() -> None:
+    """Test function for Election.astream_results."""
+    async def arrive(batches: list):
+        for batch in batches:
+            yield batch
+
+    async def consume(e: Election, batches: list) -> list:
+        return [delta async for delta in e.astream_results(arrive(batches))]
+
+    batches = read_batches('data/small_data.csv', 10)
+    e = Election(date(2015, 10, 19))
+    deltas = asyncio.run(consume(e, batches))
+    assert len(deltas) == len(batches)
+    assert e.popular_vote() == {"Liberal": 2940, "Green Party": 76,
+                                "Conservative": 773,
+                                "NDP-New Democratic Party": 293}
+
+
 if __name__ == '__main__':
     import pytest
     pytest.main(['elections test.py'])
+
+
+def test_party_index_updates() -> None:
+    """Test function for Jurisdiction.party_history, party_wins and
+    party_seat_history.
+    Testing to see whether the per-party index follows votes added to an
+    indexed election, elections added out of order, and range queries."""
+    j = Jurisdiction('Canada')
+    e1 = Election(date(2008, 10, 14))
+    e1.update_results('r1', 'lib', 3)
+    e1.update_results('r1', 'ndp', 1)
+    j._elections[date(2008, 10, 14)] = e1
+    assert j.party_wins('lib') == [date(2008, 10, 14)]
+    assert j.party_history('ndp') == {date(2008, 10, 14): 0.25}
+
+    # Votes added straight to an indexed election are picked up.
+    e1.update_results('r1', 'ndp', 4)
+    assert j.party_wins('lib') == []
+    assert j.party_wins('ndp') == [date(2008, 10, 14)]
+    assert j.party_history('ndp') == {date(2008, 10, 14): 0.625}
+
+    # An earlier election read later is put in date order.
+    j.read_results(2004, 6, 28, StringIO(
+        'header\n,r1,,,,,,,,,,,,green,,,,5\n,r2,,,,,,,,,,,,lib,,,,2\n'))
+    assert j.party_seat_history('green') == {date(2004, 6, 28): 1,
+                                             date(2008, 10, 14): 0}
+    assert j.party_history('bloc') == {date(2004, 6, 28): 0.0,
+                                       date(2008, 10, 14): 0.0}
+    assert j.party_wins('green') == [date(2004, 6, 28)]
+    assert j.party_wins('lib') == [date(2004, 6, 28)]
+    assert j.party_history('lib', start=date(2005, 1, 1)) == \
+        {date(2008, 10, 14): 0.375}
+    assert j.party_history('lib', date(2005, 1, 1), date(2006, 1, 1)) == {}
+
+    # Replacing an election is picked up too.
+    e2 = Election(date(2008, 10, 14))
+    e2.update_results('r1', 'green', 1)
+    j._elections[date(2008, 10, 14)] = e2
+    assert j.party_wins('green') == [date(2004, 6, 28), date(2008, 10, 14)]
+    assert j.party_seat_history('ndp', end=date(2010, 1, 1)) == \
+        {date(2004, 6, 28): 0, date(2008, 10, 14): 0}
+
+
+def test_query_cache() -> None:
+    """Test function for the query cache of Jurisdiction.
+    Testing to see whether cached results are reused, dropped only when an
+    election they depend on changes, and evicted when the cache is full."""
+    j = Jurisdiction('Canada', cache_size=3)
+    j.read_results(2004, 6, 28, StringIO('header\n,r1,,,,,,,,,,,,lib,,,,2\n'))
+    j.read_results(2008, 10, 14, StringIO('header\n,r1,,,,,,,,,,,,ndp,,,,5\n'))
+    early = j.party_history('lib', end=date(2005, 1, 1))
+    assert early == {date(2004, 6, 28): 1.0}
+    early[date(2004, 6, 28)] = 0.0
+    assert j.party_history('lib', end=date(2005, 1, 1)) == \
+        {date(2004, 6, 28): 1.0}
+    assert j.party_wins('ndp', start=date(2005, 1, 1)) == [date(2008, 10, 14)]
+    assert j.cache_stats()['hits'] == 1
+    assert j.cache_stats()['misses'] == 2
+
+    # Reading into the later election drops only the results that cover it.
+    j.read_results(2008, 10, 14, StringIO('header\n,r1,,,,,,,,,,,,lib,,,,9\n'))
+    assert j.party_history('lib', end=date(2005, 1, 1)) == \
+        {date(2004, 6, 28): 1.0}
+    assert j.party_wins('ndp', start=date(2005, 1, 1)) == []
+    assert j.cache_stats() == {'hits': 2, 'misses': 3, 'evictions': 0,
+                               'expirations': 0, 'entries': 2}
+
+    # A new election drops the riding changes, whichever its date.
+    assert j.riding_changes() == [(set(), set())]
+    j.read_results(2011, 5, 2, StringIO('header\n,r2,,,,,,,,,,,,lib,,,,1\n'))
+    assert j.riding_changes() == [(set(), set()), ({'r1'}, {'r2'})]
+
+    # The least recently used result is evicted first.
+    j.party_seat_history('lib')
+    assert j.cache_stats()['evictions'] == 0
+    j.party_wins('lib')
+    assert j.cache_stats()['evictions'] == 1
+    j.riding_changes()
+    j.party_history('lib', end=date(2005, 1, 1))
+    assert j.cache_stats()['hits'] == 3
+    assert j.cache_stats()['misses'] == 8
+
+
+def test_query_cache_ttl() -> None:
+    """Test function for the query cache of Jurisdiction.
+    Testing to see whether results expire, and whether a cache size of 0
+    turns the cache off."""
+    j = Jurisdiction('Canada', cache_ttl=0.0)
+    j.read_results(2004, 6, 28, StringIO('header\n,r1,,,,,,,,,,,,lib,,,,2\n'))
+    assert j.party_wins('lib') == [date(2004, 6, 28)]
+    assert j.party_wins('lib') == [date(2004, 6, 28)]
+    assert j.cache_stats()['expirations'] == 1
+    assert j.cache_stats()['hits'] == 0
+
+    j = Jurisdiction('Canada', cache_size=0)
+    j.read_results(2004, 6, 28, StringIO('header\n,r1,,,,,,,,,,,,lib,,,,2\n'))
+    assert j.party_wins('lib') == j.party_wins('lib')
+    assert j.cache_stats()['entries'] == 0
+    assert j.cache_stats()['misses'] == 2
+
+
+def test_query_cache_hit_skips_elections(monkeypatch) -> None:
+    """Test function for the query cache of Jurisdiction.
+    Testing to see whether a cache hit, and data_version, look at none of the
+    elections when none of them has changed, even if an election of another
+    jurisdiction has, and whether a change to any of them is still seen."""
+    j = Jurisdiction('Canada')
+    for year in range(2000, 2040, 4):
+        j.read_results(year, 6, 28,
+                       StringIO('header\n,r1,,,,,,,,,,,,lib,,,,2\n'))
+    history = j.party_history('lib')
+    version = j.data_version()
+
+    walks = []
+    iterate = Timeline.__iter__
+    monkeypatch.setattr(Timeline, '__iter__',
+                        lambda self: walks.append(1) or iterate(self))
+    assert j.party_history('lib') == history
+    assert j.data_version() == version
+    assert walks == []
+
+    e = Election(date(2000, 6, 28))
+    e.update_results('r1', 'ndp', 1)
+    e.update_results('r1', 'ndp', 1)
+    assert j.data_version() == version
+    assert j.known_data_version() == version
+    assert walks == []
+    j._elections[date(2000, 6, 28)].update_results('r1', 'ndp', 5)
+    assert j.known_data_version() is None
+    assert j.data_version() != version
+    assert j.party_history('lib')[date(2000, 6, 28)] == 2 / 7
+
+
+def test_aligned_comparisons() -> None:
+    """Test function for Jurisdiction.share_changes, seat_flips and
+    ridings_won_by.
+    Testing to see whether the aligned comparisons agree with comparisons
+    made one riding at a time, and whether the alignment is reused until an
+    election changes."""
+    j = Jurisdiction('Canada')
+    for path in ['data/parkdale-highpark.csv', 'data/nunavut.csv']:
+        with open(path, encoding='utf-8') as file:
+            j.read_results(2011, 5, 2, file)
+    for path in ['data/nunavut.csv', 'data/labrador.csv']:
+        with open(path, encoding='utf-8') as file:
+            j.read_results(2015, 10, 19, file)
+    j.read_results(2015, 10, 19, StringIO(
+        'header\n,Nunavut,,,,,,,,,,,,Green Party,,,,99999\n'))
+    first, second = date(2011, 5, 2), date(2015, 10, 19)
+    e1, e2 = j._elections[first], j._elections[second]
+
+    changes = j.share_changes(first, second)
+    assert sorted(changes) == ['Nunavut']
+    for party in e1._parties + e2._parties:
+        before = (e1.results_for('Nunavut', party) or 0) / \
+            sum(e1._results['Nunavut'].values())
+        after = (e2.results_for('Nunavut', party) or 0) / \
+            sum(e2._results['Nunavut'].values())
+        assert abs(j.share_changes(first, second, party)['Nunavut']
+                   - (after - before)) < 1e-12
+        if before or after:
+            assert abs(changes['Nunavut'][party] - (after - before)) < 1e-12
+
+    winner = e1.riding_winners('Nunavut')[0]
+    assert j.seat_flips(first, second) == {'Nunavut': (winner, 'Green Party')}
+    assert j.seat_flips(first, first) == {}
+    parkdale = e1.riding_winners('Parkdale--High Park')[0]
+    assert j.ridings_won_by(parkdale, [first]) == [
+        r for r in e1.ridings_recorded() if e1.riding_winners(r) == [parkdale]]
+    assert j.ridings_won_by('Green Party') == []
+
+    aligned = j.aligned()
+    assert j.aligned() is aligned
+    assert j.aligned([first]) is not aligned
+    j.read_results(2015, 10, 19, StringIO(
+        'header\n,Nunavut,,,,,,,,,,,,Rhinoceros,,,,99999999\n'))
+    assert j.aligned() is not aligned
+    assert j.seat_flips(first, second)['Nunavut'][1] == 'Rhinoceros'
+
+
+def test_riding_change_matrix() -> None:
+    """Test function for Jurisdiction.riding_change_matrix.
+    Testing to see whether the matrix agrees with riding_changes, and follows
+    ridings added to an election after its changes were first computed."""
+    j = Jurisdiction('Canada')
+    e1 = Election(date(2000, 2, 8))
+    e1.update_results('r1', 'ndp', 1)
+    e1.update_results('r2', 'pc', 1)
+    j._elections[date(2000, 2, 8)] = e1
+    e2 = Election(date(2004, 5, 16))
+    e2.update_results('r2', 'ndp', 1)
+    j._elections[date(2004, 5, 16)] = e2
+    assert j.riding_changes() == [({'r1'}, set())]
+
+    e2.update_results('r3', 'lib', 1)
+    e3 = Election(date(2008, 6, 1))
+    e3.update_results('r1', 'ndp', 1)
+    j._elections[date(2008, 6, 1)] = e3
+    assert j.riding_changes() == [({'r1'}, {'r3'}), ({'r2', 'r3'}, {'r1'})]
+    dates, ridings, matrix = j.riding_change_matrix()
+    assert dates == [date(2000, 2, 8), date(2004, 5, 16), date(2008, 6, 1)]
+    assert ridings == ['r1', 'r2', 'r3']
+    assert matrix == [[-1, 1], [0, -1], [1, -1]]
+
+
+def test_aread_matches_read() -> None:
+    """Test function for Jurisdiction.aread_results and aread_many.
+    Testing to see whether reading asynchronously, from paths and from
+    streams of str or bytes lines, gives the same results as read_many."""
+    paths = sorted(glob('data/*.csv'))
+    sequential = Jurisdiction('Canada')
+    sequential.read_many(2015, 10, 19, paths, workers=1)
+
+    async def byte_lines(path: str):
+        with open(path, 'rb') as file:
+            for line in file:
+                yield line
+
+    async def read_all() -> Jurisdiction:
+        j = Jurisdiction('Canada')
+        await j.aread_many(2015, 10, 19, paths[:2], max_concurrency=2)
+        for path in paths[2:]:
+            await j.aread_results(2015, 10, 19, byte_lines(path))
+        return j
+
+    j = asyncio.run(read_all())
+    e1 = sequential._elections[date(2015, 10, 19)]
+    e2 = j._elections[date(2015, 10, 19)]
+    assert e2._ridings == e1._ridings
+    assert e2._parties == e1._parties
+    assert e2._results == e1._results
+    assert e2.party_seats() == e1.party_seats()
+
+
+def test_aread_many_bounded() -> None:
+    """Test function for Jurisdiction.aread_many.
+    Testing to see whether no more than max_concurrency sources are read at
+    once, and whether the results are added in the order of the sources."""
+    active = [0, 0]
+
+    async def lines(riding: str, votes: int):
+        active[0] += 1
+        active[1] = max(active[1], active[0])
+        yield 'header\n'
+        for _ in range(3):
+            await asyncio.sleep(0)
+            yield '1,"{}",,,,,,,,,,,,"p{}",,,,{}\n'.format(riding, votes,
+                                                          votes)
+        active[0] -= 1
+
+    j = Jurisdiction('Canada', columnar=True)
+    sources = (lines('r' + str(i % 3), i + 1) for i in range(12))
+    asyncio.run(j.aread_many(2015, 10, 19, sources, max_concurrency=3))
+    e = j._elections[date(2015, 10, 19)]
+    assert active[1] <= 3
+    assert e._ridings == ['r0', 'r1', 'r2']
+    assert e._parties == ['p' + str(i + 1) for i in range(12)]
+    assert e.results_for('r0', 'p10') == 30
+
+
+def test_read_mapped_matches_read_results(tmp_path) -> None:
+    """Test function for Election.read_mapped.
+    Testing to see whether scanning the memory-mapped files gives the same
+    results as read_results, including cells with quoted commas and quotes,
+    and whether poll-level results are still kept."""
+    path = str(tmp_path / 'quoted.csv')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('\ufeffheader\n'
+                   '1,"Smith, ""A""",x," 1","Hall, B",N,N,"",0,9,"F","","G",'
+                   '"Bloc, ""Q""","b",N,N,4\r\n'
+                   '1,"r2",x," 2","Hall",N,N,"",0,9,"F","","G","lib","l",N,N,'
+                   '0\n\n'
+                   '1,"r2",x," 2","Hall",N,N,"",0,9,"F","","G","pc","p",N,N,'
+                   '12')
+    for filename in sorted(glob('data/*.csv')) + [path]:
+        for kind in [Election, ArrayElection]:
+            e = kind(date(2015, 10, 19))
+            with open(filename, encoding='utf-8') as file:
+                e.read_results(file)
+            m = kind(date(2015, 10, 19))
+            m.read_mapped(filename)
+            assert m._ridings == e._ridings
+            assert m._parties == e._parties
+            assert m.popular_vote() == e.popular_vote()
+            assert m.summary() == e.summary()
+    assert m._ridings == ['Smith, "A"', 'r2']
+    assert m._parties == ['Bloc, "Q"', 'pc']
+
+    p = Election(date(2015, 10, 19))
+    store = p.keep_polls()
+    p.read_mapped('data/nunavut.csv')
+    assert len(store.ridings()) == 1
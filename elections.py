@@ -1,5 +1,23 @@
-from datetime import date
-from typing import Dict, Tuple, List, Set, Optional, TextIO
+import asyncio
+import time
+from collections import OrderedDict, deque
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import date, timedelta
+from itertools import repeat
+from operator import add, sub
+from typing import Any, Callable, Dict, Tuple, List, Set, Optional, TextIO, \
+    Iterator, Iterable, AsyncIterable, AsyncIterator, Sequence, Union, \
+    Generator, AsyncGenerator
+
+from allocation import SeatAllocation, Tally
+from ingest import parse_line, parse_votes, read_rows, read_votes, \
+    scan_votes
+from polls import PollStore
+from redistribution import RidingMap
+from snapshot import ElectionRecord, read_snapshot, write_snapshot
+from timeline import Timeline, date_span
 
 # Constants that can be used throughout this module.
 # Column numbers where various values can be found in the csv files containing
@@ -8,6 +26,34 @@ RIDING = 1
 PARTY = 13
 VOTES = 17
 
+# The number of party columns initially allocated in each row of the count
+# matrix of an ArrayElection.  Rows are widened as more parties are recorded.
+_INITIAL_STRIDE = 8
+
+# The number of lines handed to the executor at a time by aread_results, and
+# the size hint, in bytes, for each block of lines read from a file by
+# aread_many.
+_ASYNC_CHUNK_LINES = 4096
+_ASYNC_READ_HINT = 1 << 20
+
+# The number of query results a Jurisdiction keeps in its query cache by
+# default.
+DEFAULT_CACHE_SIZE = 256
+
+
+# The winner recorded by AlignedElections for a riding that was tied in an
+# election, and for a riding that was not recorded in it.
+_TIED = -1
+_ABSENT = -2
+
+
+# A row of results, either as a line of a csv file in the format defined in the
+# A0 handout, or as the list of that line's cells.
+Row = Union[str, Sequence[str]]
+
+# A line of a csv file, either decoded or as utf-8 encoded bytes.
+Line = Union[str, bytes]
+
 
 # Helper functions
 def clean_line(line: str) -> List[str]:
@@ -36,6 +82,35 @@ def remove_quotes(lst: List[str]) -> None:
             lst[i] = lst[i][1:-1]
 
 
+class ResultsDelta:
+    """The changes made to the results of an election by one batch of rows.
+
+    === Public Attributes ===
+    rows: the number of rows in the batch.
+    riding_winners: the riding_winners, after the batch, of each riding whose
+        votes changed.
+    popular_vote: the number of votes gained by each party that gained any.
+    party_seats: the change in the number of seats won by each party whose
+        seat count changed.
+    election_winners: the election_winners after the batch.
+    """
+    rows: int
+    riding_winners: Dict[str, List[str]]
+    popular_vote: Dict[str, int]
+    party_seats: Dict[str, int]
+    election_winners: List[str]
+
+    def __init__(self, rows: int, riding_winners: Dict[str, List[str]],
+                 popular_vote: Dict[str, int], party_seats: Dict[str, int],
+                 election_winners: List[str]) -> None:
+        """Initialize the changes made by a batch of <rows> rows."""
+        self.rows = rows
+        self.riding_winners = riding_winners
+        self.popular_vote = popular_vote
+        self.party_seats = party_seats
+        self.election_winners = election_winners
+
+
 class Election:
     """Data for a single election in a parliamentary democracy.
 
@@ -51,6 +126,22 @@ class Election:
         value is the number of votes earned by that party in that riding.
             A party only appears in the dictionary for a riding if that party
         has had at least one vote recorded in that riding.
+    _totals: the popular vote of this election.  Each key is the name of a
+        party in self._parties, and its value is the total number of votes
+        recorded for it, kept up to date by update_results.
+    _dirty: the ridings whose votes have changed since their winners were
+        last computed.
+    _winners: the riding_winners of each riding not in self._dirty.
+    _seats: the party_seats of this election, counting only the ridings
+        that are not in self._dirty.
+    _leaders: the election_winners of this election, or None if they must be
+        computed again.
+    _polls: the results at each polling station in the rows read by
+        read_results, or None if they are not being kept.
+    _version: the number of times votes have been added to this election,
+        so that results computed from it can be checked for staleness.
+    _watchers: the one-item lists whose item is increased by 1 whenever
+        votes are added to this election.
 
     === Representation Invariants ==
     - For all strings s, s in self._ridings iff s in self._results
@@ -59,6 +150,10 @@ class Election:
       for every key (riding, results) in self._results,
           for every (party, votes) in results,
               votes > 0
+    - self._totals and self._seats have the same keys, in the same order,
+      as self._parties
+    - For all ridings r in self._ridings, r in self._dirty or r in
+      self._winners
 
     === Sample Usage ===
     >>> e = Election(date(2000, 2, 8))
@@ -79,6 +174,14 @@ class Election:
     _ridings: List[str]
     _parties: List[str]
     _results: Dict[str, Dict[str, int]]
+    _totals: Dict[str, int]
+    _dirty: Set[str]
+    _winners: Dict[str, List[str]]
+    _seats: Dict[str, int]
+    _leaders: Optional[List[str]]
+    _polls: Optional[PollStore]
+    _version: int
+    _watchers: List[List[int]]
 
     def __init__(self, d: date) -> None:
         """Initialize a new election on date d and with no ridings, parties,
@@ -92,6 +195,22 @@ class Election:
         self._ridings = []
         self._parties = []
         self._results = {}
+        self._totals = {}
+        self._polls = None
+        self._version = 0
+        self._watchers = []
+        self._reset_memos()
+
+    def _reset_memos(self) -> None:
+        """Forget the winners and seats of this election, so that they are all
+        computed again when next asked for.
+        """
+        self._dirty = set(self._ridings)
+        self._winners = {}
+        self._seats = {}
+        for party in self._parties:
+            self._seats[party] = 0
+        self._leaders = None
 
     def ridings_recorded(self) -> List[str]:
         """Return the ridings in which votes have been recorded in this
@@ -109,6 +228,52 @@ class Election:
         ridings_copy = self._ridings.copy()
         return ridings_copy
 
+    def election_date(self) -> date:
+        """Return the date of this election.
+
+        >>> Election(date(2000, 2, 8)).election_date()
+        datetime.date(2000, 2, 8)
+        """
+        return self._d
+
+    def version(self) -> int:
+        """Return the number of times votes have been added to this election.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.version()
+        2
+        """
+        return self._version
+
+    def watch(self, changes: List[int]) -> None:
+        """Increase changes[0] by 1 whenever votes are added to this election
+        from now on.  Watching with the same list again has no effect.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> changes = [0]
+        >>> e.watch(changes)
+        >>> e.watch(changes)
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> changes
+        [1]
+        """
+        if all(watcher is not changes for watcher in self._watchers):
+            self._watchers.append(changes)
+
+    def parties_recorded(self) -> List[str]:
+        """Return the parties for which votes have been recorded in this
+        election, in the order in which they were first recorded.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.update_results('r2', 'pc', 1)
+        >>> e.parties_recorded()
+        ['ndp', 'pc']
+        """
+        return self._parties.copy()
+
     def update_results(self, riding: str, party: str, votes: int) -> None:
         """Update this election to reflect that in <riding>, <party> received
         <votes> additional votes.
@@ -128,32 +293,256 @@ class Election:
         1001
         """
 
-        # Adding riding to self._ridings if it's not there
-        if riding not in self._ridings:
+        # Adding riding to self._ridings if it's not there.  self._results
+        # has the same ridings, and can be searched in constant time.
+        if riding not in self._results:
             self._ridings.append(riding)
+            self._results[riding] = {}
 
-        # Adding party to self._parties if it's not there
-        if party not in self._parties:
+        # Adding party to self._parties if it's not there.  self._totals has
+        # the same parties, and can be searched in constant time.
+        if party not in self._totals:
             self._parties.append(party)
+            self._totals[party] = 0
+            self._seats[party] = 0
 
-        # Deal with the case where riding is not in self._results or riding
-        # is and party is not in self._results[riding]
-        if riding not in self._results:
-            self._results[riding] = {party: votes}
-        elif party not in self._results[riding]:
-            self._results[riding][party] = votes
-
-        # We can now assume riding is in self._results and party is in
-        # self._results[riding]
+        # Deal with the case where party is not in self._results[riding]
+        results = self._results[riding]
+        if party not in results:
+            results[party] = votes
         else:
-            self._results[riding][party] += votes
-
-    def read_results(self, input_stream: TextIO) -> None:
+            results[party] += votes
+
+        # Only this riding's winners need to be computed again
+        self._totals[party] += votes
+        self._dirty.add(riding)
+        self._leaders = None
+        self._version += 1
+        for changes in self._watchers:
+            changes[0] += 1
+
+    def read_results(self, input_stream: TextIO,
+                     legacy: bool = False) -> None:
         """Update this election with the results in input_stream.
 
+        The file is parsed with ingest.read_votes, which handles quoted cells
+        containing commas.  If <legacy> is True, each line is instead split
+        with clean_line.  If this election is keeping poll-level results
+        (see keep_polls), every row is also added to its PollStore.
+
         Precondition: input_stream is an open csv file, in the format defined
         in the A0 handout.
         """
+        if legacy:
+            self._read_results_legacy(input_stream)
+        elif self._polls is not None:
+            for row in read_rows(input_stream):
+                self._polls.add_row(row)
+                votes = int(row[VOTES])
+                if votes > 0:
+                    self.update_results(row[RIDING], row[PARTY], votes)
+        else:
+            for riding, party, votes in read_votes(input_stream, RIDING, PARTY,
+                                                   VOTES):
+                self.update_results(riding, party, votes)
+
+    def read_mapped(self, path: str) -> None:
+        """Update this election with the results in the csv file at <path>,
+        scanning the memory-mapped file with ingest.scan_votes.
+
+        This gives the same results as read_results, several times faster and
+        without decoding the file.  If this election is keeping poll-level
+        results, every column is needed, so the file is read with
+        read_results instead.
+
+        Precondition: <path> is a csv file, in the format defined in the A0
+        handout, with no line breaks inside quoted cells.
+        """
+        if self._polls is not None:
+            with open(path, encoding='utf-8') as input_stream:
+                self.read_results(input_stream)
+        else:
+            for riding, party, votes in scan_votes(path, RIDING, PARTY,
+                                                   VOTES):
+                self.update_results(riding, party, votes)
+
+    def keep_polls(self) -> PollStore:
+        """Start keeping the poll-level results of the rows read by
+        read_results from now on, and return the PollStore they are kept in.
+
+        Poll-level results are not carried over by merge, or saved in
+        snapshots.
+
+        >>> from io import StringIO
+        >>> e = Election(date(2000, 2, 8))
+        >>> store = e.keep_polls()
+        >>> e.read_results(StringIO(
+        ...     'header\\n1,"r1","r1"," 1","School",N,N,"",2,50,"A","","B",'
+        ...     '"ndp","npd",N,N,30\\n'))
+        >>> store.poll_info('r1', '1')['electors']
+        50
+        >>> e.polls() is store
+        True
+        """
+        if self._polls is None:
+            self._polls = PollStore()
+        return self._polls
+
+    def polls(self) -> Optional[PollStore]:
+        """Return the poll-level results kept by this election, or None if it
+        is not keeping them.
+        """
+        return self._polls
+
+    def stream_results(self, rows: Union[Iterable[Sequence[Row]],
+                                         Iterable[Row]],
+                       batched: bool = True
+                       ) -> Generator[ResultsDelta, None, None]:
+        """Update this election with the results in <rows> as they arrive,
+        yielding the changes made by each batch.
+
+        If <batched> is True, each item of <rows> is a batch: a sequence of
+        rows.  Otherwise each item is a single row, and is a batch of its own.
+        Only the ridings changed by a batch have their winners computed again,
+        so the cost of a batch does not depend on how many rows came before.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> batches = [[['1', 'r1', '', '', '', '', '', '', '', '', '', '', '',
+        ...              'ndp', '', '', '', '5']],
+        ...            ['1,"r1",,,,,,,,,,,,"lib",,,,3',
+        ...             '1,"r1",,,,,,,,,,,,"lib",,,,4']]
+        >>> deltas = list(e.stream_results(batches))
+        >>> deltas[0].party_seats
+        {'ndp': 1}
+        >>> deltas[1].popular_vote, deltas[1].party_seats
+        ({'lib': 7}, {'ndp': -1, 'lib': 1})
+        >>> deltas[1].election_winners
+        ['lib']
+        """
+        self._refresh()
+        for item in rows:
+            batch: Sequence[Row] = item if batched else [item]
+            yield self._apply_batch(batch)
+
+    async def astream_results(
+            self, rows: Union[AsyncIterable[Sequence[Row]],
+                              AsyncIterable[Row]],
+            batched: bool = True) -> AsyncGenerator[ResultsDelta, None]:
+        """Update this election with the results in the asynchronous iterable
+        <rows> as they arrive, yielding the changes made by each batch.
+
+        <rows> and <batched> are as in stream_results.
+        """
+        self._refresh()
+        async for item in rows:
+            batch: Sequence[Row] = item if batched else [item]
+            yield self._apply_batch(batch)
+
+    async def aread_results(self, input_stream: AsyncIterable[Line],
+                            executor: Optional[Executor] = None,
+                            chunk_lines: int = _ASYNC_CHUNK_LINES) -> None:
+        """Update this election with the results in the asynchronous stream
+        of lines <input_stream>, without blocking the event loop.
+
+        Lines may be str, or utf-8 encoded bytes.  Lines are collected into
+        chunks of <chunk_lines>, and each chunk is parsed by <executor> (the
+        event loop's default executor if None) into a partial election while
+        the next chunk is being read.  The partial elections are merged in
+        order, so the result is the same as calling read_results on the same
+        lines.  At most two chunks are held in memory at a time.
+
+        Poll-level results are not kept, as with merge.
+
+        Precondition: the lines form a csv file in the format defined in the
+        A0 handout, with no line breaks inside quoted cells.
+
+        >>> async def lines():
+        ...     for line in ['header\\n', '1,"r1",,,,,,,,,,,,"ndp",,,,5\\n',
+        ...                  '1,"r1",,,,,,,,,,,,"lib",,,,3\\n']:
+        ...         yield line
+        >>> e = Election(date(2000, 2, 8))
+        >>> asyncio.run(e.aread_results(lines(), chunk_lines=1))
+        >>> e.popular_vote() == {'ndp': 5, 'lib': 3}
+        True
+        """
+        loop = asyncio.get_running_loop()
+        pending = None
+        chunk = []
+        header = True
+        async for line in input_stream:
+            if header:
+                header = False
+                continue
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            chunk.append(line)
+            if len(chunk) >= chunk_lines:
+                # Wait for the chunk before this one, so that at most one
+                # chunk is being parsed while the next is read
+                if pending is not None:
+                    self.merge(await pending)
+                pending = loop.run_in_executor(executor, _parse_chunk, chunk,
+                                               type(self))
+                chunk = []
+
+        if pending is not None:
+            self.merge(await pending)
+        if chunk:
+            self.merge(await loop.run_in_executor(executor, _parse_chunk,
+                                                  chunk, type(self)))
+
+    def _apply_batch(self, batch: Sequence[Row]) -> ResultsDelta:
+        """Update this election with the results in <batch>, and return the
+        changes made.
+
+        Any ridings whose votes changed since the winners were last computed
+        are included in the changes, as well as those in <batch>.
+        """
+        votes_gained: Dict[str, int] = {}
+        # The ridings changed, in the order first changed
+        changed: Dict[str, None] = {}
+        for row in batch:
+            cells: Sequence[str] = parse_line(row) if isinstance(row, str) \
+                else row
+            votes = int(cells[VOTES])
+            if votes > 0:
+                self.update_results(cells[RIDING], cells[PARTY], votes)
+                votes_gained[cells[PARTY]] = \
+                    votes_gained.get(cells[PARTY], 0) + votes
+                changed[cells[RIDING]] = None
+
+        for riding in self._dirty:
+            changed[riding] = None
+        old_winners: Dict[str, Optional[List[str]]] = {}
+        for riding in changed:
+            old_winners[riding] = self._winners.get(riding)
+        self._refresh()
+
+        riding_winners: Dict[str, List[str]] = {}
+        seat_changes: Dict[str, int] = {}
+        for riding in changed:
+            winners = self._winners[riding]
+            riding_winners[riding] = winners.copy()
+            old = old_winners[riding]
+            if old is not None and len(old) == 1:
+                seat_changes[old[0]] = seat_changes.get(old[0], 0) - 1
+            if len(winners) == 1:
+                seat_changes[winners[0]] = seat_changes.get(winners[0], 0) + 1
+
+        for party in list(seat_changes):
+            if seat_changes[party] == 0:
+                del seat_changes[party]
+
+        return ResultsDelta(len(batch), riding_winners, votes_gained,
+                            seat_changes, self.election_winners())
+
+    def _read_results_legacy(self, input_stream: TextIO) -> None:
+        """Update this election with the results in input_stream, splitting
+        each line with clean_line.
+
+        Precondition: input_stream is an open csv file, in the format defined
+        in the A0 handout, with no commas inside quoted cells.
+        """
         # Skips header line of input_stream
         input_stream.readline()
 
@@ -172,6 +561,180 @@ class Election:
             if votes > 0:
                 self.update_results(riding, party, votes)
 
+    def merge(self, other: 'Election') -> None:
+        """Add the votes recorded in <other> to this election.
+
+        Parties and ridings that are new to this election are recorded in the
+        order in which they were first recorded in <other>, so the result is
+        the same as if the votes in <other> had been recorded here directly.
+        Counts are added a whole riding at a time.
+
+        >>> e1 = Election(date(2000, 2, 8))
+        >>> e1.update_results('r1', 'ndp', 1)
+        >>> e1.update_results('r1', 'lib', 2)
+        >>> e2 = Election(date(2000, 2, 8))
+        >>> e2.update_results('r2', 'pc', 3)
+        >>> e2.update_results('r1', 'lib', 4)
+        >>> e1.merge(e2)
+        >>> e1.ridings_recorded()
+        ['r1', 'r2']
+        >>> e1.popular_vote() == {'ndp': 1, 'lib': 6, 'pc': 3}
+        True
+        """
+        for party in other._parties:
+            if party not in self._totals:
+                self._parties.append(party)
+                self._totals[party] = 0
+                self._seats[party] = 0
+
+        for riding, other_results in other.riding_results():
+            if riding not in self._results:
+                self._ridings.append(riding)
+                self._results[riding] = other_results.copy()
+            else:
+                results = self._results[riding]
+                for party in other_results:
+                    if party in results:
+                        results[party] += other_results[party]
+                    else:
+                        results[party] = other_results[party]
+            for party in other_results:
+                self._totals[party] += other_results[party]
+            self._dirty.add(riding)
+        self._leaders = None
+        self._version += 1
+        for changes in self._watchers:
+            changes[0] += 1
+
+    @classmethod
+    def combine(cls, *elections: 'Election') -> 'Election':
+        """Return a new election holding the sum of the votes recorded in
+        <elections>, merged in the order given.  The new election has the date
+        of the first election in <elections>, and is of this class.
+
+        Precondition: len(elections) >= 1
+
+        >>> e1 = Election(date(2000, 2, 8))
+        >>> e1.update_results('r1', 'ndp', 1)
+        >>> e2 = Election(date(2000, 2, 8))
+        >>> e2.update_results('r1', 'ndp', 2)
+        >>> e3 = Election(date(2000, 2, 8))
+        >>> e3.update_results('r2', 'lib', 5)
+        >>> e = Election.combine(e1, e2, e3)
+        >>> e.results_for('r1', 'ndp')
+        3
+        >>> e.ridings_recorded()
+        ['r1', 'r2']
+        """
+        combined = cls(elections[0]._d)
+        for election in elections:
+            combined.merge(election)
+        return combined
+
+    def riding_results(self) -> Iterator[Tuple[str, Dict[str, int]]]:
+        """Yield each riding recorded in this election, in order, together
+        with a dictionary of the votes for each party recorded in it.
+
+        The dictionaries must not be mutated.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.update_results('r2', 'lib', 2)
+        >>> list(e.riding_results())
+        [('r1', {'ndp': 1}), ('r2', {'lib': 2})]
+        """
+        for riding in self._ridings:
+            yield riding, self._results[riding]
+
+    def transposed(self, riding_map: RidingMap) -> 'Election':
+        """Return a new election of the same class and date holding the
+        results of this election moved onto the new ridings of <riding_map>,
+        as described in RidingMap.transpose.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 10)
+        >>> e.update_results('r2', 'lib', 4)
+        >>> m = RidingMap(date(2004, 1, 1), {'r1': {'a': 0.5, 'b': 0.5}})
+        >>> e.transposed(m)._results == {'a': {'ndp': 5}, 'b': {'ndp': 5},
+        ...                               'r2': {'lib': 4}}
+        True
+        """
+        election = type(self)(self._d)
+        moved = riding_map.transpose(self.riding_results(), self._parties)
+        for riding, results in moved.items():
+            for party, votes in results.items():
+                election.update_results(riding, party, votes)
+        return election
+
+    def save(self, path: str) -> None:
+        """Write the results of this election to a snapshot file at <path>,
+        which can be read back with load.
+        """
+        write_snapshot(path, '', [self.to_record()])
+
+    @classmethod
+    def load(cls, path: str) -> 'Election':
+        """Return an election of this class holding the results in the
+        snapshot file at <path>, written by Election.save.
+
+        Raise ValueError if the file is not a snapshot of one election, or is
+        stale or corrupt.
+
+        >>> import os, tempfile
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.update_results('r1', 'lib', 2)
+        >>> path = os.path.join(tempfile.mkdtemp(), 'e.snapshot')
+        >>> e.save(path)
+        >>> e2 = Election.load(path)
+        >>> e2._d == e._d and e2._results == e._results
+        True
+        """
+        records = read_snapshot(path)[1]
+        if len(records) != 1:
+            raise ValueError(path + ' is not a snapshot of one election')
+        return cls.from_record(records[0])
+
+    def to_record(self) -> ElectionRecord:
+        """Return the snapshot record of this election, as written by save.
+        """
+        party_ids = {}
+        for party in self._parties:
+            party_ids[party] = len(party_ids)
+        offsets = array('I', [0])
+        entry_parties = array('I')
+        entry_votes = array('q')
+
+        for _, results in self.riding_results():
+            for party in results:
+                entry_parties.append(party_ids[party])
+                entry_votes.append(results[party])
+            offsets.append(len(entry_votes))
+
+        return ElectionRecord(self._d, self._ridings.copy(),
+                              self._parties.copy(), offsets, entry_parties,
+                              entry_votes)
+
+    @classmethod
+    def from_record(cls, record: ElectionRecord) -> 'Election':
+        """Return a new election of this class holding the results in the
+        snapshot <record>.
+        """
+        election = cls(record.d)
+        for party in record.parties:
+            election._parties.append(party)
+            election._totals[party] = 0
+        for r in range(len(record.ridings)):
+            results = {}
+            for i in range(record.offsets[r], record.offsets[r + 1]):
+                party = record.parties[record.entry_parties[i]]
+                results[party] = record.entry_votes[i]
+                election._totals[party] += record.entry_votes[i]
+            election._ridings.append(record.ridings[r])
+            election._results[record.ridings[r]] = results
+        election._reset_memos()
+        return election
+
     def results_for(self, riding: str, party: str) -> Optional[int]:
         """Return the number of votes received in <riding> by <party> in
         this election.
@@ -214,6 +777,16 @@ class Election:
         >>> e.riding_winners('r1')
         ['pc']
         """
+        if riding in self._dirty:
+            self._refresh()
+        return self._winners[riding].copy()
+
+    def _compute_riding_winners(self, riding: str) -> List[str]:
+        """Return the winners, in <riding>, of this election, computed from
+        its vote counts.
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+        """
         # winners will be our return list, consisting of all winning parties
         winners = []
         # winning_vote will measure the largest vote in riding
@@ -228,6 +801,20 @@ class Election:
 
         return winners
 
+    def _refresh(self) -> None:
+        """Compute the winners of every riding in self._dirty, and update
+        self._seats to count them.
+        """
+        for riding in self._dirty:
+            old_winners = self._winners.get(riding)
+            if old_winners is not None and len(old_winners) == 1:
+                self._seats[old_winners[0]] -= 1
+            winners = self._compute_riding_winners(riding)
+            if len(winners) == 1:
+                self._seats[winners[0]] += 1
+            self._winners[riding] = winners
+        self._dirty.clear()
+
     def popular_vote(self) -> Dict[str, int]:
         """For each party, return the total number of votes it earned, across
         all ridings, in this election.
@@ -246,16 +833,8 @@ class Election:
         >>> e.popular_vote() == {'ndp': 8, 'lib': 7, 'pc': 7, 'green': 6}
         True
         """
-        # Initialize return dictionary
-        d = {}
-        for party in self._parties:
-            d[party] = 0
-
-        for riding in self._ridings:
-            for party in self._results[riding]:
-                d[party] += self._results[riding][party]
-
-        return d
+        # self._totals is kept up to date by update_results
+        return self._totals.copy()
 
     def party_seats(self) -> Dict[str, int]:
         """For each party, return the number of ridings that it won in this
@@ -277,16 +856,41 @@ class Election:
         >>> e.party_seats() == {'pc': 1, 'ndp': 1, 'lib': 0, 'green': 0}
         True
         """
-        d = {}
-        for party in self._parties:
-            d[party] = 0
+        # Only the ridings whose votes have changed since the last call are
+        # looked at again
+        self._refresh()
+        return self._seats.copy()
+
+    def summary(self) -> Tuple[Dict[str, int], Dict[str, int],
+                               Dict[str, List[str]]]:
+        """Return the popular vote, the party seats and the riding winners of
+        this election, all at once.
 
+        The first two values are the same as those returned by popular_vote
+        and party_seats.  The third maps each riding recorded in this election
+        to its riding_winners; a riding was tied iff its list has more than
+        one party.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.update_results('r1', 'lib', 2)
+        >>> e.update_results('r1', 'pc', 3)
+        >>> e.update_results('r2', 'pc', 4)
+        >>> e.update_results('r2', 'lib', 4)
+        >>> votes, seats, winners = e.summary()
+        >>> votes == {'ndp': 1, 'lib': 6, 'pc': 7}
+        True
+        >>> seats == {'ndp': 0, 'lib': 0, 'pc': 1}
+        True
+        >>> winners == {'r1': ['pc'], 'r2': ['pc', 'lib']}
+        True
+        """
+        self._refresh()
+        winners = {}
         for riding in self._ridings:
-            if len(self.riding_winners(riding)) == 1:
-                riding_winner = self.riding_winners(riding)[0]
-                d[riding_winner] += 1
+            winners[riding] = self._winners[riding].copy()
 
-        return d
+        return self.popular_vote(), self._seats.copy(), winners
 
     def election_winners(self) -> List[str]:
         """Return the party (or parties, in the case of a tie) that won the
@@ -306,18 +910,823 @@ class Election:
         >>> e.election_winners()
         ['pc']
         """
-        lst = []
-        party_seats = self.party_seats()
+        if self._leaders is None:
+            lst = []
+            party_seats = self.party_seats()
 
-        max_seats_won = 0
-        for party in party_seats:
-            if party_seats[party] > max_seats_won:
-                max_seats_won = party_seats[party]
-                lst = [party]
-            elif party_seats[party] == max_seats_won:
-                lst.append(party)
+            max_seats_won = 0
+            for party in party_seats:
+                if party_seats[party] > max_seats_won:
+                    max_seats_won = party_seats[party]
+                    lst = [party]
+                elif party_seats[party] == max_seats_won:
+                    lst.append(party)
 
-        return lst
+            self._leaders = lst
+
+        return self._leaders.copy()
+
+    def tally(self) -> Tally:
+        """Return the popular vote, party seats and number of ridings of
+        this election, for use by seat allocation systems.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.update_results('r1', 'lib', 2)
+        >>> t = e.tally()
+        >>> t.votes == {'ndp': 1, 'lib': 2}
+        True
+        >>> t.district_seats == {'ndp': 0, 'lib': 1}
+        True
+        """
+        return Tally(self.popular_vote(), self.party_seats(),
+                     len(self._ridings))
+
+    def allocate_seats(self, system: SeatAllocation) -> Dict[str, int]:
+        """Return the number of seats each party would have won in this
+        election under the seat allocation system <system>.
+
+        >>> from allocation import DHondt
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 3)
+        >>> e.update_results('r1', 'lib', 2)
+        >>> e.update_results('r2', 'ndp', 3)
+        >>> e.update_results('r2', 'lib', 2)
+        >>> e.allocate_seats(DHondt(seats=5)) == {'ndp': 3, 'lib': 2}
+        True
+        """
+        return system.allocate(self.tally())
+
+    def seat_allocations(self, systems: Dict[str, SeatAllocation]
+                         ) -> Dict[str, Dict[str, int]]:
+        """Return, for each name in <systems>, the number of seats each
+        party would have won in this election under that system.
+
+        The votes are totalled once, however many systems there are.
+        """
+        tally = self.tally()
+        return {name: systems[name].allocate(tally) for name in systems}
+
+
+class ArrayElection(Election):
+    """An Election whose vote counts are stored in a dense riding x party count
+    matrix, with riding and party names interned into integer ids.
+
+    This has the same public interface as Election, but avoids the per-riding
+    dictionaries of Election._results, which matters for national-size files.
+    In the case of a tie in a riding, the tied parties are listed in the
+    order in which they were first recorded in this election.
+
+    === Private Attributes ===
+    _riding_ids: maps each riding in self._ridings to its index in that list.
+    _party_ids: maps each party in self._parties to its index in that list.
+    _stride: the number of party columns allocated in each row of _counts.
+    _counts: the vote counts for this election, stored row by row.  The votes
+        earned by party self._parties[p] in riding self._ridings[r] are stored
+        at index r * self._stride + p.  Unused columns hold 0.
+    _party_totals: the total number of votes recorded for each party, indexed
+        by party id.  This takes the place of Election._totals.
+
+    An ArrayElection has no _results or _totals attributes.
+
+    === Representation Invariants ==
+    - self._riding_ids[self._ridings[i]] == i for every index i
+    - self._party_ids[self._parties[i]] == i for every index i
+    - len(self._parties) <= self._stride
+    - len(self._counts) == len(self._ridings) * self._stride
+    - All vote counts are >= 0.  A party has votes recorded in a riding iff
+      its count in that riding is > 0.
+
+    === Sample Usage ===
+    >>> e = ArrayElection(date(2000, 2, 8))
+    >>> e.update_results('r1', 'ndp', 1234)
+    >>> e.update_results('r1', 'lib', 1345)
+    >>> e.update_results('r1', 'pc', 1456)
+    >>> e.riding_winners('r1')
+    ['pc']
+    >>> e.update_results('r2', 'pc', 1)
+    >>> e.popular_vote() == {'ndp': 1234, 'lib': 1345, 'pc': 1457}
+    True
+    >>> e.results_for('r1', 'lib')
+    1345
+    >>> e.party_seats() == {'ndp': 0, 'lib': 0, 'pc': 2}
+    True
+    """
+    _riding_ids: Dict[str, int]
+    _party_ids: Dict[str, int]
+    _stride: int
+    _counts: array
+    _party_totals: array
+
+    def __init__(self, d: date) -> None:
+        """Initialize a new election on date d and with no ridings, parties,
+        or votes recorded so far.
+
+        >>> e = ArrayElection(date(2000, 2, 8))
+        >>> e.ridings_recorded()
+        []
+        """
+        Election.__init__(self, d)
+        # The count matrix takes the place of the dictionaries of Election
+        del self._results, self._totals
+        self._riding_ids = {}
+        self._party_ids = {}
+        self._stride = _INITIAL_STRIDE
+        self._counts = array('q')
+        self._party_totals = array('q')
+
+    def _widen(self) -> None:
+        """Double the number of party columns allocated in each row of
+        self._counts, keeping all recorded counts in place.
+        """
+        old_stride = self._stride
+        new_stride = old_stride * 2
+        widened = array('q', [0]) * (new_stride * len(self._ridings))
+        for r in range(len(self._ridings)):
+            start = r * new_stride
+            widened[start:start + old_stride] = \
+                self._counts[r * old_stride:(r + 1) * old_stride]
+        self._stride = new_stride
+        self._counts = widened
+
+    def update_results(self, riding: str, party: str, votes: int) -> None:
+        """Update this election to reflect that in <riding>, <party> received
+        <votes> additional votes.
+
+        Precondition: votes >= 1
+
+        >>> e = ArrayElection(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.update_results('r1', 'ndp', 1000)
+        >>> e.results_for('r1', 'ndp')
+        1001
+        """
+        r = self._riding_ids.get(riding)
+        if r is None:
+            r = self._add_riding(riding)
+
+        p = self._party_ids.get(party)
+        if p is None:
+            p = self._add_party(party)
+
+        self._counts[r * self._stride + p] += votes
+        self._party_totals[p] += votes
+        self._dirty.add(riding)
+        self._leaders = None
+        self._version += 1
+        for changes in self._watchers:
+            changes[0] += 1
+
+    def _add_riding(self, riding: str) -> int:
+        """Record <riding> in this election, with no votes, and return its id.
+
+        Precondition: <riding> is not already in self._ridings.
+        """
+        r = len(self._ridings)
+        self._riding_ids[riding] = r
+        self._ridings.append(riding)
+        self._counts.extend(array('q', [0]) * self._stride)
+        return r
+
+    def _add_party(self, party: str) -> int:
+        """Record <party> in this election, with no votes, and return its id.
+
+        Precondition: <party> is not already in self._parties.
+        """
+        p = len(self._parties)
+        if p == self._stride:
+            self._widen()
+        self._party_ids[party] = p
+        self._parties.append(party)
+        self._party_totals.append(0)
+        self._seats[party] = 0
+        return p
+
+    def merge(self, other: Election) -> None:
+        """Add the votes recorded in <other> to this election.
+
+        Parties and ridings that are new to this election are recorded in the
+        order in which they were first recorded in <other>.  If <other> is also
+        an ArrayElection, each of its rows is added to the matching row of
+        this election's count matrix in one operation.
+
+        >>> e1 = ArrayElection(date(2000, 2, 8))
+        >>> e1.update_results('r1', 'ndp', 1)
+        >>> e2 = ArrayElection(date(2000, 2, 8))
+        >>> e2.update_results('r1', 'ndp', 2)
+        >>> e2.update_results('r2', 'pc', 3)
+        >>> e1.merge(e2)
+        >>> e1.popular_vote() == {'ndp': 3, 'pc': 3}
+        True
+        """
+        # Map the id of each party in other to its id in this election
+        party_map = []
+        for party in other._parties:
+            p = self._party_ids.get(party)
+            if p is None:
+                p = self._add_party(party)
+            party_map.append(p)
+
+        if isinstance(other, ArrayElection):
+            self._merge_rows(other, party_map)
+        else:
+            for riding, other_results in other.riding_results():
+                for party in other_results:
+                    self.update_results(riding, party, other_results[party])
+        self._leaders = None
+        self._version += 1
+        for changes in self._watchers:
+            changes[0] += 1
+
+    def _merge_rows(self, other: 'ArrayElection',
+                    party_map: List[int]) -> None:
+        """Add each row of the count matrix of <other> to the row for the same
+        riding in this election, where party_map[p] is the id in this election
+        of the party with id p in <other>.
+        """
+        width = len(other._parties)
+        aligned = party_map == list(range(width))
+        for r in range(len(other._ridings)):
+            riding = other._ridings[r]
+            row = other._counts[r * other._stride:r * other._stride + width]
+            target = self._riding_ids.get(riding)
+            if target is None:
+                target = self._add_riding(riding)
+            start = target * self._stride
+            if aligned:
+                self._counts[start:start + width] = array(
+                    'q', map(add, self._counts[start:start + width], row))
+            else:
+                for p in range(width):
+                    self._counts[start + party_map[p]] += row[p]
+            self._dirty.add(riding)
+
+        if aligned:
+            self._party_totals[:width] = array(
+                'q', map(add, self._party_totals[:width], other._party_totals))
+        else:
+            for p in range(width):
+                self._party_totals[party_map[p]] += other._party_totals[p]
+
+    def riding_results(self) -> Iterator[Tuple[str, Dict[str, int]]]:
+        """Yield each riding recorded in this election, in order, together
+        with a dictionary of the votes for each party recorded in it.
+        """
+        width = len(self._parties)
+        for r in range(len(self._ridings)):
+            start = r * self._stride
+            row = self._counts[start:start + width]
+            yield self._ridings[r], {self._parties[p]: row[p]
+                                     for p in range(width) if row[p] > 0}
+
+    @classmethod
+    def from_record(cls, record: ElectionRecord) -> 'ArrayElection':
+        """Return a new election of this class holding the results in the
+        snapshot <record>, scattering its entries into a count matrix.
+        """
+        election = cls(record.d)
+        while election._stride < len(record.parties):
+            election._stride *= 2
+        for party in record.parties:
+            election._party_ids[party] = len(election._parties)
+            election._parties.append(party)
+        for riding in record.ridings:
+            election._riding_ids[riding] = len(election._ridings)
+            election._ridings.append(riding)
+
+        counts = array('q', [0]) * (len(record.ridings) * election._stride)
+        totals = array('q', [0]) * len(record.parties)
+        for r in range(len(record.ridings)):
+            start = r * election._stride
+            for i in range(record.offsets[r], record.offsets[r + 1]):
+                counts[start + record.entry_parties[i]] = record.entry_votes[i]
+                totals[record.entry_parties[i]] += record.entry_votes[i]
+        election._counts = counts
+        election._party_totals = totals
+        election._reset_memos()
+        return election
+
+    def results_for(self, riding: str, party: str) -> Optional[int]:
+        """Return the number of votes received in <riding> by <party> in
+        this election, or None if there are none recorded.
+
+        >>> e = ArrayElection(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1234)
+        >>> e.update_results('r2', 'pc', 1)
+        >>> e.results_for('r1', 'ndp')
+        1234
+        >>> e.results_for('r1', 'pc') is None
+        True
+        """
+        r = self._riding_ids.get(riding)
+        p = self._party_ids.get(party)
+        if r is None or p is None:
+            return None
+        votes = self._counts[r * self._stride + p]
+        if votes == 0:
+            return None
+        else:
+            return votes
+
+    def _compute_riding_winners(self, riding: str) -> List[str]:
+        """Return the winners, in <riding>, of this election, computed from
+        the maximum of its row of the count matrix and the number of times
+        that maximum occurs in the row.
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+
+        >>> e = ArrayElection(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 3)
+        >>> e.update_results('r1', 'lib', 2)
+        >>> e.update_results('r1', 'pc', 3)
+        >>> e._compute_riding_winners('r1')
+        ['ndp', 'pc']
+        """
+        start = self._riding_ids[riding] * self._stride
+        row = self._counts[start:start + len(self._parties)]
+        winning_vote = max(row)
+        if row.count(winning_vote) == 1:
+            return [self._parties[row.index(winning_vote)]]
+        else:
+            return [self._parties[p] for p in range(len(row))
+                    if row[p] == winning_vote]
+
+    def _refresh(self) -> None:
+        """Compute the winners of every riding in self._dirty, and update
+        self._seats to count them.
+
+        If more than half of the ridings are dirty, as they are after
+        read_results, the winners and seats of every riding are computed
+        again in a single pass over the count matrix, from the maximum of
+        each row and the number of times it occurs there, rather than riding
+        by riding.
+        """
+        if 2 * len(self._dirty) <= len(self._ridings):
+            Election._refresh(self)
+            return
+
+        width = len(self._parties)
+        stride = self._stride
+        counts = self._counts
+        seats = [0] * width
+        winners = {}
+        for r in range(len(self._ridings)):
+            row = counts[r * stride:r * stride + width]
+            winning_vote = max(row)
+            if row.count(winning_vote) == 1:
+                p = row.index(winning_vote)
+                seats[p] += 1
+                winners[self._ridings[r]] = [self._parties[p]]
+            else:
+                winners[self._ridings[r]] = [
+                    self._parties[p] for p in range(width)
+                    if row[p] == winning_vote]
+
+        self._winners = winners
+        self._seats = {self._parties[p]: seats[p] for p in range(width)}
+        self._dirty.clear()
+
+    def popular_vote(self) -> Dict[str, int]:
+        """For each party, return the total number of votes it earned, across
+        all ridings, in this election.
+
+        >>> e = ArrayElection(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.update_results('r2', 'ndp', 7)
+        >>> e.update_results('r2', 'pc', 4)
+        >>> e.popular_vote() == {'ndp': 8, 'pc': 4}
+        True
+        """
+        return {self._parties[p]: self._party_totals[p]
+                for p in range(len(self._parties))}
+
+
+def _read_partial(path: str, d: date, columnar: bool) -> Election:
+    """Return a new election on date <d> holding the results in the csv file
+    at <path>.  It is an ArrayElection if <columnar> is True.
+
+    This is run in worker processes by Jurisdiction.read_many.
+    """
+    if columnar:
+        election = ArrayElection(d)
+    else:
+        election = Election(d)
+    election.read_mapped(path)
+    return election
+
+
+def _parse_chunk(lines: List[str], kind: type) -> Election:
+    """Return a new election of class <kind> holding the results in <lines>,
+    which are part of a csv file with its header line removed.
+
+    This is run by the executor given to Election.aread_results.  The date of
+    the election is not used, since only its votes are merged.
+    """
+    election = kind(date.min)
+    for riding, party, votes in parse_votes(lines, RIDING, PARTY, VOTES):
+        election.update_results(riding, party, votes)
+    return election
+
+
+async def _aread_lines(path: str) -> AsyncIterator[str]:
+    """Yield the lines of the file at <path>, reading them a block at a time
+    in the event loop's default executor.  The file is closed once every line
+    has been yielded, or when the generator is closed early.
+    """
+    loop = asyncio.get_running_loop()
+    with open(path, encoding='utf-8') as input_stream:
+        lines = await loop.run_in_executor(None, input_stream.readlines,
+                                           _ASYNC_READ_HINT)
+        while lines:
+            for line in lines:
+                yield line
+            lines = await loop.run_in_executor(None, input_stream.readlines,
+                                               _ASYNC_READ_HINT)
+
+
+class AlignedElections:
+    """Several elections of a jurisdiction, aligned on a shared index of
+    ridings and parties so that they can be compared a riding at a time.
+
+    An AlignedElections is returned, and may be shared, by
+    Jurisdiction.aligned; it must not be mutated.
+
+    === Public Attributes ===
+    dates: the dates of the aligned elections, in increasing order.
+    ridings: every riding recorded in any of the elections, in the order
+        they were first recorded.
+    parties: every party recorded in any of the elections, in the order
+        they were first recorded.
+
+    === Private Attributes ===
+    _positions: maps each date in self.dates to its index in that list.
+    _riding_ids: maps each riding in self.ridings to its index in that list.
+    _party_ids: maps each party in self.parties to its index in that list.
+    _shares: for each election, in the order of self.dates, the fraction of
+        the votes in each riding earned by each party, stored row by row:
+        the share of party p in riding r is at r * len(self.parties) + p.
+        Ridings not recorded in the election have a row of zeros.
+    _winners: for each election, the id of the party that won each riding,
+        or _TIED if the riding was tied, or _ABSENT if it was not recorded.
+
+    === Representation Invariants ===
+    - len(self._shares[i]) == len(self.ridings) * len(self.parties) and
+      len(self._winners[i]) == len(self.ridings) for every index i
+
+    === Sample Usage ===
+    >>> e1 = Election(date(2000, 2, 8))
+    >>> e1.update_results('r1', 'ndp', 3)
+    >>> e1.update_results('r1', 'lib', 1)
+    >>> e2 = Election(date(2004, 5, 16))
+    >>> e2.update_results('r1', 'ndp', 1)
+    >>> e2.update_results('r1', 'lib', 1)
+    >>> e2.update_results('r1', 'pc', 2)
+    >>> a = AlignedElections([date(2000, 2, 8), date(2004, 5, 16)], [e1, e2])
+    >>> a.share_changes(date(2000, 2, 8), date(2004, 5, 16), 'ndp')
+    {'r1': -0.5}
+    >>> a.seat_flips(date(2000, 2, 8), date(2004, 5, 16))
+    {'r1': ('ndp', 'pc')}
+    """
+    dates: List[date]
+    ridings: List[str]
+    parties: List[str]
+    _positions: Dict[date, int]
+    _riding_ids: Dict[str, int]
+    _party_ids: Dict[str, int]
+    _shares: List[array]
+    _winners: List[array]
+
+    def __init__(self, dates: List[date], elections: List[Election]) -> None:
+        """Initialize the alignment of <elections>, held on <dates>.
+
+        Precondition: <dates> is in increasing order, with no duplicates, and
+        len(dates) == len(elections)
+        """
+        self.dates = dates
+        self._positions = {dates[i]: i for i in range(len(dates))}
+        self.ridings = []
+        self.parties = []
+        self._riding_ids = {}
+        self._party_ids = {}
+        for election in elections:
+            for riding in election._ridings:
+                if riding not in self._riding_ids:
+                    self._riding_ids[riding] = len(self.ridings)
+                    self.ridings.append(riding)
+            for party in election._parties:
+                if party not in self._party_ids:
+                    self._party_ids[party] = len(self.parties)
+                    self.parties.append(party)
+
+        stride = len(self.parties)
+        self._shares = []
+        self._winners = []
+        for election in elections:
+            shares = array('d', [0.0]) * (len(self.ridings) * stride)
+            winners = array('l', [_ABSENT]) * len(self.ridings)
+            for riding, results in election.riding_results():
+                r = self._riding_ids[riding]
+                total = sum(results.values())
+                for party in results:
+                    shares[r * stride + self._party_ids[party]] = \
+                        results[party] / total
+                riding_winners = election.riding_winners(riding)
+                winners[r] = self._party_ids[riding_winners[0]] \
+                    if len(riding_winners) == 1 else _TIED
+            self._shares.append(shares)
+            self._winners.append(winners)
+
+    def share_changes(self, start: date, end: date,
+                      party: Optional[str] = None
+                      ) -> Union[Dict[str, Dict[str, float]],
+                                 Dict[str, float]]:
+        """Return the change in each party's share of the vote in each riding
+        from the election on <start> to the election on <end>.
+
+        Include only ridings recorded in both elections.  If <party> is None,
+        map each riding to the change of each party with votes recorded
+        there in either election; otherwise map each riding to the change of
+        <party> alone (0.0 if it had no votes there in either).
+
+        Precondition: <start> and <end> are in self.dates.
+        """
+        before = self._shares[self._positions[start]]
+        after = self._shares[self._positions[end]]
+        stride = len(self.parties)
+        present = self._present_in_both(start, end)
+        if party is not None:
+            p = self._party_ids.get(party)
+            return {self.ridings[r]: 0.0 if p is None
+                    else after[r * stride + p] - before[r * stride + p]
+                    for r in present}
+
+        changes = {}
+        for r in present:
+            row_before = before[r * stride:(r + 1) * stride]
+            row_after = after[r * stride:(r + 1) * stride]
+            deltas = list(map(sub, row_after, row_before))
+            changes[self.ridings[r]] = {
+                self.parties[p]: deltas[p] for p in range(stride)
+                if row_before[p] or row_after[p]}
+        return changes
+
+    def seat_flips(self, start: date, end: date) -> Dict[str, Tuple[str, str]]:
+        """Return each riding whose winner changed from the election on
+        <start> to the election on <end>, mapped to its winners in those
+        elections.
+
+        Include only ridings recorded, and not tied, in both elections.
+
+        Precondition: <start> and <end> are in self.dates.
+        """
+        before = self._winners[self._positions[start]]
+        after = self._winners[self._positions[end]]
+        return {self.ridings[r]: (self.parties[before[r]],
+                                  self.parties[after[r]])
+                for r in range(len(self.ridings))
+                if before[r] != after[r] and before[r] >= 0 and after[r] >= 0}
+
+    def ridings_won_by(self, party: str,
+                       dates: Optional[List[date]] = None) -> List[str]:
+        """Return the ridings that <party> won outright in every election on
+        <dates> (every aligned election if None), in the order of
+        self.ridings.
+
+        Precondition: every date in <dates> is in self.dates.
+
+        >>> e1 = Election(date(2000, 2, 8))
+        >>> e1.update_results('r1', 'ndp', 3)
+        >>> e1.update_results('r2', 'ndp', 3)
+        >>> e2 = Election(date(2004, 5, 16))
+        >>> e2.update_results('r2', 'ndp', 3)
+        >>> a = AlignedElections([date(2000, 2, 8), date(2004, 5, 16)],
+        ...                      [e1, e2])
+        >>> a.ridings_won_by('ndp')
+        ['r2']
+        """
+        p = self._party_ids.get(party)
+        if p is None:
+            return []
+        if dates is None:
+            dates = self.dates
+        won = [True] * len(self.ridings)
+        for d in dates:
+            winners = self._winners[self._positions[d]]
+            won = [won[r] and winners[r] == p
+                   for r in range(len(self.ridings))]
+        return [self.ridings[r] for r in range(len(self.ridings)) if won[r]]
+
+    def _present_in_both(self, start: date, end: date) -> List[int]:
+        """Return the ids of the ridings recorded in both the election on
+        <start> and the election on <end>.
+        """
+        before = self._winners[self._positions[start]]
+        after = self._winners[self._positions[end]]
+        return [r for r in range(len(self.ridings))
+                if before[r] != _ABSENT and after[r] != _ABSENT]
+
+
+class _QueryCache:
+    """The cached results of the queries of a Jurisdiction.
+
+    === Attributes ===
+    entries: maps the query and arguments of each cached result to the
+        result, the time.monotonic() time after which it expires (or None if
+        it does not), and the first and last dates of the elections it
+        depends on (None for no bound).  The least recently used result
+        comes first.
+    size: the most results kept in self.entries.
+    ttl: the seconds a result is kept in self.entries, or None if results
+        are kept until they are evicted or invalidated.
+    stats: the number of cache hits, misses, evictions and expirations so
+        far.
+
+    === Representation Invariants ===
+    - len(self.entries) <= self.size
+    """
+    entries: OrderedDict
+    size: int
+    ttl: Optional[float]
+    stats: Dict[str, int]
+
+    def __init__(self, size: int, ttl: Optional[float]) -> None:
+        """Initialize an empty cache of at most <size> results, each kept for
+        at most <ttl> seconds if it is not None.
+        """
+        self.entries = OrderedDict()
+        self.size = size
+        self.ttl = ttl
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0,
+                      'expirations': 0}
+
+    def get(self, key: Tuple) -> Optional[Tuple]:
+        """Return the entry of the query <key> if it has a result that has not
+        expired, counting a hit, and otherwise return None, counting a miss.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[1] is None or time.monotonic() < entry[1]:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry
+            del self.entries[key]
+            self.stats['expirations'] += 1
+        self.stats['misses'] += 1
+        return None
+
+    def put(self, key: Tuple, value: Any, start: Optional[date],
+            end: Optional[date]) -> None:
+        """Keep <value> as the result of the query <key>, which depends only
+        on the elections held on or after <start> and on or before <end>,
+        evicting the least recently used result if this cache is full.
+        """
+        if self.size > 0:
+            expires = None if self.ttl is None \
+                else time.monotonic() + self.ttl
+            self.entries[key] = (value, expires, start, end)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self, d: date) -> None:
+        """Drop every result that depends on the election on <d>."""
+        for key in [key for key, (_, _, start, end) in self.entries.items()
+                    if (start is None or start <= d)
+                    and (end is None or d <= end)]:
+            del self.entries[key]
+
+
+class _PartyIndex:
+    """The popular vote share, seats and wins of each party in each of the
+    elections of a Jurisdiction, kept in order of date.
+
+    === Attributes ===
+    indexed: the elections this index was computed from.  Each key is a
+        date, and its value is the election on that date and its version at
+        the time.
+    dates: the dates in self.indexed, in increasing order.
+    shares: maps each party recorded in an indexed election to its fraction
+        of the popular vote in each election, in the order of self.dates.
+    seats: maps each such party to the number of seats it won in each
+        election, in the same order.
+    wins: maps each such party to 1 for each election it won, and 0 for each
+        election it did not, in the same order.
+
+    === Representation Invariants ===
+    - For every party p in self.shares, p is in self.seats and self.wins,
+      and len(self.shares[p]) == len(self.seats[p]) == len(self.wins[p])
+      == len(self.dates)
+    """
+    indexed: Dict[date, Tuple[Election, int]]
+    dates: List[date]
+    shares: Dict[str, array]
+    seats: Dict[str, array]
+    wins: Dict[str, array]
+
+    def __init__(self) -> None:
+        """Initialize an index of no elections."""
+        self.indexed = {}
+        self.dates = []
+        self.shares = {}
+        self.seats = {}
+        self.wins = {}
+
+    def clear(self) -> None:
+        """Forget every indexed election."""
+        self.indexed.clear()
+        self.dates.clear()
+        self.shares.clear()
+        self.seats.clear()
+        self.wins.clear()
+
+    def add(self, d: date, election: Election) -> None:
+        """Index <election>, held on <d>, in place of any election indexed on
+        that date.
+        """
+        if d in self.indexed:
+            i = bisect_left(self.dates, d)
+        else:
+            i = bisect_right(self.dates, d)
+            self.dates.insert(i, d)
+            for party in self.shares:
+                self.shares[party].insert(i, 0.0)
+                self.seats[party].insert(i, 0)
+                self.wins[party].insert(i, 0)
+        for party in self.shares:
+            self.shares[party][i] = 0.0
+            self.seats[party][i] = 0
+            self.wins[party][i] = 0
+
+        votes = election.popular_vote()
+        seats = election.party_seats()
+        total_votes = sum(votes.values())
+        n = len(self.dates)
+        for party in votes:
+            if party not in self.shares:
+                self.shares[party] = array('d', [0.0]) * n
+                self.seats[party] = array('l', [0]) * n
+                self.wins[party] = array('b', [0]) * n
+            if total_votes > 0:
+                self.shares[party][i] = votes[party] / total_votes
+            self.seats[party][i] = seats[party]
+        for party in election.election_winners():
+            self.wins[party][i] = 1
+        self.indexed[d] = (election, election.version())
+
+
+class _RidingMemberships:
+    """The ridings recorded in the elections of a Jurisdiction, as bitsets of
+    ids given to the ridings in the order they were first seen.
+
+    === Attributes ===
+    ids: maps the name of each riding recorded in any election whose
+        membership has been computed to its id.
+    names: the riding names in self.ids, indexed by id.
+    bitsets: maps the date of each election whose membership has been
+        computed to the election, the number of its ridings seen, and a
+        bitset of those ridings: bit i is set iff riding id i was recorded.
+
+    === Representation Invariants ===
+    - self.ids[self.names[i]] == i for every index i
+    """
+    ids: Dict[str, int]
+    names: List[str]
+    bitsets: Dict[date, Tuple[Election, int, int]]
+
+    def __init__(self) -> None:
+        """Initialize memberships of no elections."""
+        self.ids = {}
+        self.names = []
+        self.bitsets = {}
+
+    def membership(self, d: date, election: Election) -> int:
+        """Return the bitset of the ridings recorded in <election>, held on
+        <d>, giving an id to any riding not seen before.
+
+        Only the ridings recorded in the election since its bitset was last
+        computed are looked at.
+        """
+        ridings = election.ridings_recorded()
+        seen = self.bitsets.get(d)
+        if seen is not None and seen[0] is election \
+                and seen[1] <= len(ridings):
+            start, bits = seen[1], seen[2]
+        else:
+            start, bits = 0, 0
+
+        for riding in ridings[start:]:
+            i = self.ids.get(riding)
+            if i is None:
+                i = len(self.names)
+                self.ids[riding] = i
+                self.names.append(riding)
+            bits |= 1 << i
+        self.bitsets[d] = (election, len(ridings), bits)
+        return bits
+
+    def riding_set(self, bits: int) -> Set[str]:
+        """Return the names of the ridings in the bitset <bits>."""
+        return {self.names[i] for i in _bits_set(bits)}
 
 
 class Jurisdiction:
@@ -328,20 +1737,46 @@ class Jurisdiction:
     _name: the name of this jurisdiction.
     _elections: the election history for this jurisdiction.  Each key is a date,
         and its value holds the results of an election that was held on that
-        date.
-
-    === Representation Invariants ==
-    None.
+        date.  The dates are kept in increasing order.
+    _columnar: whether elections read into this jurisdiction are stored as
+        ArrayElections rather than as Elections.
+    _index: the per-party index of the elections in self._elections.
+    _changes: a one-item list whose item is the number of times votes have
+        been added to any election in self._index since it was indexed.
+    _synced: self._changes[0] and the version of self._elections when
+        self._index was last brought up to date.
+    _version: the number of times the elections of this jurisdiction have
+        been found to have been added, replaced, removed or changed.
+    _memberships: the ridings recorded in each election whose membership
+        has been computed.
+    _cache: the cached results of this jurisdiction's queries.
+    _riding_maps: the maps of the redistributions of the ridings of this
+        jurisdiction, keyed on the dates they took effect.
 
     === Sample Usage ===
     # See the method docstrings for sample usage.
     """
     _name: str
-    _elections: Dict[date, Election]
-
-    def __init__(self, name: str) -> None:
+    _elections: Timeline[Election]
+    _columnar: bool
+    _index: _PartyIndex
+    _changes: List[int]
+    _synced: Tuple[int, int]
+    _version: int
+    _memberships: _RidingMemberships
+    _cache: _QueryCache
+    _riding_maps: Timeline[RidingMap]
+
+    def __init__(self, name: str, columnar: bool = False,
+                 cache_size: int = DEFAULT_CACHE_SIZE,
+                 cache_ttl: Optional[float] = None) -> None:
         """Initialize this jurisdiction, with no elections so far.
 
+        If <columnar> is True, elections read into this jurisdiction keep their
+        vote counts in an ArrayElection's count matrix.  The results of up to
+        <cache_size> queries are cached, for at most <cache_ttl> seconds if it
+        is not None; a <cache_size> of 0 turns the cache off.
+
         >>> country = Jurisdiction('Canada')
         >>> country._name
         'Canada'
@@ -349,7 +1784,15 @@ class Jurisdiction:
         {}
         """
         self._name = name
-        self._elections = {}
+        self._elections = Timeline()
+        self._columnar = columnar
+        self._index = _PartyIndex()
+        self._changes = [0]
+        self._synced = (-1, -1)
+        self._version = 0
+        self._memberships = _RidingMemberships()
+        self._cache = _QueryCache(cache_size, cache_ttl)
+        self._riding_maps = Timeline()
 
     def read_results(self, year: int, month: int, day: int,
                      input_stream: TextIO) -> None:
@@ -363,20 +1806,251 @@ class Jurisdiction:
         """
         date_of_election = date(year, month, day)
 
-        # Add an election object to the dictionary with key date_of_election
-        # if an election does not already exist on that date
-        if date_of_election not in self._elections:
-            self._elections[date_of_election] = Election(date_of_election)
-
         # Now read the results to that election on that date.
-        self._elections[date_of_election].read_results(input_stream)
+        self._election_on(date_of_election).read_results(input_stream)
+
+    def read_many(self, year: int, month: int, day: int, paths: List[str],
+                  workers: Optional[int] = None) -> None:
+        """Read and record results for an election in this jurisdiction from
+        each of the csv files at <paths>.
+
+        The files are parsed with Election.read_mapped, in parallel by up to
+        <workers> processes (one per CPU if <workers> is None), each producing
+        a partial election.  The
+        partial elections are added to the election on this date in the order
+        of <paths>, so the result is the same as calling read_results on each
+        file in turn.
+
+        Precondition: each path in <paths> is a csv file, in the format
+        defined in the A0 handout.
+        """
+        date_of_election = date(year, month, day)
+        election = self._election_on(date_of_election)
 
-    def party_wins(self, party: str) -> List[date]:
+        if workers == 1 or len(paths) <= 1:
+            for path in paths:
+                election.read_mapped(path)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for partial in executor.map(_read_partial, paths,
+                                            repeat(date_of_election),
+                                            repeat(self._columnar)):
+                    election.merge(partial)
+
+    async def aread_results(self, year: int, month: int, day: int,
+                            input_stream: AsyncIterable[Line],
+                            executor: Optional[Executor] = None) -> None:
+        """Read and record results for an election in this jurisdiction from
+        the asynchronous stream of lines <input_stream>, without blocking the
+        event loop.
+
+        If there are already some results stored for an election on this date,
+        add to them.  Parsing is done by <executor>, as described in
+        Election.aread_results.
+
+        Precondition: the lines form a csv file in the format defined in the
+        A0 handout, with no line breaks inside quoted cells.
+        """
+        date_of_election = date(year, month, day)
+        await self._election_on(date_of_election).aread_results(input_stream,
+                                                                executor)
+
+    async def aread_many(self, year: int, month: int, day: int,
+                         sources: Iterable[Union[str, AsyncIterable[Line]]],
+                         max_concurrency: int = 8,
+                         executor: Optional[Executor] = None) -> None:
+        """Read and record results for an election in this jurisdiction from
+        each of <sources>, without blocking the event loop.
+
+        Each source is either the path of a csv file, which is read a block at
+        a time in the event loop's default executor, or an asynchronous stream
+        of lines.  Up to <max_concurrency> sources are read at once, each
+        into a partial election, with parsing done by <executor> as described
+        in Election.aread_results.  The partial elections are added to the
+        election on this date in the order of <sources>, so the result is the
+        same as calling read_results on each source in turn.
+
+        Sources are only started as earlier ones are added, so no more than
+        <max_concurrency> partial elections are held at once, however many
+        sources there are.
+
+        Precondition: each source is a csv file in the format defined in the
+        A0 handout, with no line breaks inside quoted cells.
+        max_concurrency >= 1
+        """
+        date_of_election = date(year, month, day)
+        election = self._election_on(date_of_election)
+        kind = type(election)
+
+        async def read_partial(source: Union[str, AsyncIterable]) -> Election:
+            """Return a new election holding the results in <source>."""
+            if isinstance(source, str):
+                source = _aread_lines(source)
+            partial = kind(date_of_election)
+            await partial.aread_results(source, executor)
+            return partial
+
+        running = deque()
+        try:
+            for source in sources:
+                if len(running) >= max_concurrency:
+                    election.merge(await running.popleft())
+                running.append(asyncio.ensure_future(read_partial(source)))
+            while running:
+                election.merge(await running.popleft())
+        finally:
+            for task in running:
+                task.cancel()
+
+    def save(self, path: str) -> None:
+        """Write the name and the elections of this jurisdiction to a snapshot
+        file at <path>, which can be read back with load.
+        """
+        write_snapshot(path, self._name,
+                       [self._elections[d].to_record()
+                        for d in self._elections])
+
+    @classmethod
+    def load(cls, path: str, columnar: bool = False) -> 'Jurisdiction':
+        """Return a new jurisdiction holding the name and the elections in the
+        snapshot file at <path>, written by Jurisdiction.save.
+
+        Raise ValueError if the file is not a snapshot, or is stale or
+        corrupt.
+
+        >>> import os, tempfile
+        >>> j = Jurisdiction('Canada')
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> j._elections[date(2000, 2, 8)] = e
+        >>> path = os.path.join(tempfile.mkdtemp(), 'j.snapshot')
+        >>> j.save(path)
+        >>> j2 = Jurisdiction.load(path, columnar=True)
+        >>> j2._name
+        'Canada'
+        >>> j2._elections[date(2000, 2, 8)].results_for('r1', 'ndp')
+        1
+        """
+        name, records = read_snapshot(path)
+        jurisdiction = cls(name, columnar)
+        for record in records:
+            if columnar:
+                election = ArrayElection.from_record(record)
+            else:
+                election = Election.from_record(record)
+            jurisdiction._elections[record.d] = election
+        return jurisdiction
+
+    def _election_on(self, d: date) -> Election:
+        """Return the election held on <d> in this jurisdiction, adding an
+        election with no votes recorded if there is not one already.
+        """
+        # Add an election object to the dictionary with key d if an election
+        # does not already exist on that date
+        if d not in self._elections:
+            if self._columnar:
+                self._elections[d] = ArrayElection(d)
+            else:
+                self._elections[d] = Election(d)
+        return self._elections[d]
+
+    def election(self, d: date) -> Election:
+        """Return the election held on <d> in this jurisdiction.  Raise
+        KeyError if there was none.
+
+        >>> j = Jurisdiction('Canada')
+        >>> e = Election(date(2000, 2, 8))
+        >>> j._elections[date(2000, 2, 8)] = e
+        >>> j.election(date(2000, 2, 8)) is e
+        True
+        """
+        return self._elections[d]
+
+    def parties(self) -> List[str]:
+        """Return the parties with votes recorded in any election in this
+        jurisdiction, in the order in which they first appear, going through
+        the elections in increasing order of date.
+
+        >>> j = Jurisdiction('Canada')
+        >>> e1 = Election(date(2004, 6, 28))
+        >>> e1.update_results('r1', 'lib', 1)
+        >>> e1.update_results('r1', 'ndp', 1)
+        >>> j._elections[date(2004, 6, 28)] = e1
+        >>> e2 = Election(date(2000, 11, 27))
+        >>> e2.update_results('r1', 'ndp', 1)
+        >>> j._elections[date(2000, 11, 27)] = e2
+        >>> j.parties()
+        ['ndp', 'lib']
+        """
+        parties = {}
+        for d in self._elections:
+            for party in self._elections[d].parties_recorded():
+                parties[party] = None
+        return list(parties)
+
+    def election_dates(self, start: Optional[date] = None,
+                       end: Optional[date] = None) -> List[date]:
+        """Return the dates of the elections in this jurisdiction, in
+        increasing order.
+
+        If <start> or <end> is given, include only elections held on or after
+        <start>, and on or before <end>.
+
+        >>> j = Jurisdiction('Canada')
+        >>> j._elections[date(2004, 6, 28)] = Election(date(2004, 6, 28))
+        >>> j._elections[date(2000, 11, 27)] = Election(date(2000, 11, 27))
+        >>> j.election_dates()
+        [datetime.date(2000, 11, 27), datetime.date(2004, 6, 28)]
+        >>> j.election_dates(start=date(2001, 1, 1))
+        [datetime.date(2004, 6, 28)]
+        """
+        return self._elections.between(start, end)
+
+    def previous_election(self, d: date) -> Optional[date]:
+        """Return the date of the last election in this jurisdiction before
+        <d>, or None if there was none.
+
+        >>> j = Jurisdiction('Canada')
+        >>> j._elections[date(2000, 11, 27)] = Election(date(2000, 11, 27))
+        >>> j.previous_election(date(2004, 6, 28))
+        datetime.date(2000, 11, 27)
+        >>> j.previous_election(date(2000, 11, 27)) is None
+        True
+        """
+        return self._elections.previous(d)
+
+    def next_election(self, d: date) -> Optional[date]:
+        """Return the date of the first election in this jurisdiction after
+        <d>, or None if there was none.
+
+        >>> j = Jurisdiction('Canada')
+        >>> j._elections[date(2004, 6, 28)] = Election(date(2004, 6, 28))
+        >>> j.next_election(date(2000, 11, 27))
+        datetime.date(2004, 6, 28)
+        """
+        return self._elections.next(d)
+
+    def nearest_election(self, d: date) -> Optional[date]:
+        """Return the date of the election in this jurisdiction closest to
+        <d>, the earlier of two that are equally close, or None if there have
+        been no elections.
+
+        >>> j = Jurisdiction('Canada')
+        >>> j._elections[date(2000, 11, 27)] = Election(date(2000, 11, 27))
+        >>> j._elections[date(2004, 6, 28)] = Election(date(2004, 6, 28))
+        >>> j.nearest_election(date(2004, 1, 1))
+        datetime.date(2004, 6, 28)
+        """
+        return self._elections.nearest(d)
+
+    def party_wins(self, party: str, start: Optional[date] = None,
+                   end: Optional[date] = None) -> List[date]:
         """Return a list of all dates on which <party> won an election in this
-        jurisdiction.
+        jurisdiction, in increasing order.
 
         If the party tied for most seats in an election, do include that date
-        in the result.
+        in the result.  If <start> or <end> is given, include only elections
+        held on or after <start>, and on or before <end>.
 
         >>> e1 = Election(date(2000, 2, 8))
         >>> e1.update_results('r1', 'ndp', 1)
@@ -402,21 +2076,33 @@ class Jurisdiction:
         >>> j._elections[date(2003, 6, 1)] = e3
         >>> j.party_wins('lib')
         [datetime.date(2003, 5, 16), datetime.date(2003, 6, 1)]
+        >>> j.party_wins('lib', end=date(2003, 5, 31))
+        [datetime.date(2003, 5, 16)]
         """
-        lst = []
-        for d in self._elections:
-            if party in self._elections[d].election_winners():
-                lst.append(d)
+        return self._cached(('party_wins', party, start, end), start, end,
+                            lambda: self._party_wins(party, start, end)).copy()
 
-        return lst
-
-    def party_history(self, party: str) -> Dict[date, float]:
+    def _party_wins(self, party: str, start: Optional[date],
+                    end: Optional[date]) -> List[date]:
+        """Return the result of party_wins(<party>, <start>, <end>), without
+        looking in the query cache.
+        """
+        wins = self._party_series(self._index.wins, party)
+        if wins is None:
+            return []
+        lo, hi = date_span(self._index.dates, start, end)
+        return [self._index.dates[i] for i in range(lo, hi) if wins[i]]
+
+    def party_history(self, party: str, start: Optional[date] = None,
+                      end: Optional[date] = None) -> Dict[date, float]:
         """Return this party's percentage of the popular vote in each election
         in this jurisdiction's history.
 
         Each key in the result is a date on which there was an election in
-        this jurisdiction.  Its value is the percentage of the popular vote
-        earned by party in that election.
+        this jurisdiction, in increasing order.  Its value is the percentage
+        of the popular vote earned by party in that election.  If <start> or
+        <end> is given, include only elections held on or after <start>, and
+        on or before <end>.
 
         >>> j = Jurisdiction('Canada')
         >>> e1 = Election(date(2000, 2, 8))
@@ -441,27 +2127,349 @@ class Jurisdiction:
         >>> j.party_history('lib') == {date(2000, 2, 8): 0.25, \
         date(2004, 5, 16): 0.2}
         True
+        >>> j.party_history('lib', start=date(2001, 1, 1))
+        {datetime.date(2004, 5, 16): 0.2}
+        """
+        return self._cached(('party_history', party, start, end), start, end,
+                            lambda: self._party_history(party, start,
+                                                        end)).copy()
+
+    def _party_history(self, party: str, start: Optional[date],
+                       end: Optional[date]) -> Dict[date, float]:
+        """Return the result of party_history(<party>, <start>, <end>),
+        without looking in the query cache.
         """
-        dic = {}  # Create return dictionary
+        shares = self._party_series(self._index.shares, party)
+        lo, hi = date_span(self._index.dates, start, end)
+        dic = {}
+        for i in range(lo, hi):
+            dic[self._index.dates[i]] = 0.0 if shares is None else shares[i]
+        return dic
 
-        # Parse through each date in this jurisdiction's history of elections.
-        # I will then calculate the party's popular vote percentage for each
-        # date and add the key-value pair to dic
-        for d in self._elections:
-            pop_vote = self._elections[d].popular_vote()
-            total_votes = 0
-            for _party in pop_vote:
-                total_votes += pop_vote[_party]
-            # It's possible no data is in self._elections[d], so treat the case
-            # where total_votes == 0 as a separate case.  Also, we can add in
-            # the case where party is not in pop_vote.
-            if total_votes == 0 or party not in pop_vote:
-                dic[d] = 0.0
-            else:
-                dic[d] = pop_vote[party] / total_votes
+    def party_seat_history(self, party: str, start: Optional[date] = None,
+                           end: Optional[date] = None) -> Dict[date, int]:
+        """Return the number of seats this party won in each election in this
+        jurisdiction's history, in increasing order of date.
+
+        If <start> or <end> is given, include only elections held on or after
+        <start>, and on or before <end>.
 
+        >>> j = Jurisdiction('Canada')
+        >>> e1 = Election(date(2000, 2, 8))
+        >>> e1.update_results('r1', 'ndp', 1)
+        >>> e1.update_results('r2', 'ndp', 5)
+        >>> j._elections[date(2000, 2, 8)] = e1
+        >>> e2 = Election(date(2004, 5, 16))
+        >>> e2.update_results('r1', 'lib', 40)
+        >>> j._elections[date(2004, 5, 16)] = e2
+        >>> j.party_seat_history('ndp') == {date(2000, 2, 8): 2, \
+        date(2004, 5, 16): 0}
+        True
+        """
+        return self._cached(('party_seat_history', party, start, end), start,
+                            end, lambda: self._party_seat_history(
+                                party, start, end)).copy()
+
+    def _party_seat_history(self, party: str, start: Optional[date],
+                            end: Optional[date]) -> Dict[date, int]:
+        """Return the result of party_seat_history(<party>, <start>, <end>),
+        without looking in the query cache.
+        """
+        seats = self._party_series(self._index.seats, party)
+        lo, hi = date_span(self._index.dates, start, end)
+        dic = {}
+        for i in range(lo, hi):
+            dic[self._index.dates[i]] = 0 if seats is None else seats[i]
         return dic
 
+    def add_riding_map(self, riding_map: RidingMap) -> None:
+        """Record the redistribution of ridings described by <riding_map>,
+        replacing any other map that took effect on the same date.
+
+        From now on, elections held before the map took effect are moved onto
+        its new ridings when they are aligned with elections held on or after
+        that date.
+        """
+        self._riding_maps[riding_map.effective] = riding_map
+        self._cache.entries.clear()
+
+    def transposed(self, d: date, boundaries: date) -> Election:
+        """Return the election on <d> with its results moved onto the
+        ridings in use on <boundaries>, through each redistribution that took
+        effect after <d> and on or before <boundaries>, in order.
+
+        Return the election itself if there are no such redistributions.
+
+        Precondition: there is an election in this jurisdiction on <d>.
+
+        >>> j = Jurisdiction('Canada')
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results("St. Paul's", 'lib', 3)
+        >>> j._elections[date(2000, 2, 8)] = e
+        >>> j.add_riding_map(RidingMap(date(2004, 5, 15), {
+        ...     "St. Paul's": {"Toronto--St. Paul's": 1.0}}))
+        >>> later = j.transposed(date(2000, 2, 8), date(2004, 6, 28))
+        >>> later.ridings_recorded()
+        ["Toronto--St. Paul's"]
+        >>> j.transposed(date(2000, 2, 8), date(2004, 5, 14)) is e
+        True
+        """
+        election = self._elections[d]
+        for effective in self._riding_maps.between(d + timedelta(days=1),
+                                                   boundaries):
+            election = election.transposed(self._riding_maps[effective])
+        return election
+
+    def aligned(self, dates: Optional[List[date]] = None) -> AlignedElections:
+        """Return the elections in this jurisdiction on <dates> (on every
+        date, if None) aligned on a shared index of ridings and parties.
+
+        Each election is first moved onto the ridings in use on the last of
+        the dates, through any redistributions added with add_riding_map.
+        The alignment is kept in the query cache, so repeated comparisons of
+        the same elections share it.  It must not be mutated.
+
+        Precondition: there is an election in this jurisdiction on every date
+        in <dates>.
+
+        >>> j = Jurisdiction('Canada')
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> j._elections[date(2000, 2, 8)] = e
+        >>> j.aligned().ridings
+        ['r1']
+        >>> j.aligned() is j.aligned()
+        True
+        """
+        if dates is None:
+            return self._cached(('aligned', None), None, None,
+                                lambda: self._align(list(self._elections)))
+        dates = sorted(set(dates))
+        return self._cached(('aligned', tuple(dates)),
+                            dates[0] if dates else None,
+                            dates[-1] if dates else None,
+                            lambda: self._align(dates))
+
+    def _align(self, dates: List[date]) -> AlignedElections:
+        """Return the elections on <dates>, which are in increasing order,
+        moved onto the ridings in use on the last of them and aligned on a
+        shared index of ridings and parties.
+        """
+        if not dates:
+            return AlignedElections(dates, [])
+        return AlignedElections(dates, [self.transposed(d, dates[-1])
+                                        for d in dates])
+
+    def share_changes(self, start: date, end: date,
+                      party: Optional[str] = None
+                      ) -> Union[Dict[str, Dict[str, float]],
+                                 Dict[str, float]]:
+        """Return the change in each party's share of the vote in each riding
+        from the election on <start> to the election on <end>, as given by
+        AlignedElections.share_changes.
+
+        Precondition: there are elections in this jurisdiction on <start> and
+        <end>.
+
+        >>> j = Jurisdiction('Canada')
+        >>> e1 = Election(date(2000, 2, 8))
+        >>> e1.update_results('r1', 'ndp', 1)
+        >>> e1.update_results('r1', 'lib', 1)
+        >>> j._elections[date(2000, 2, 8)] = e1
+        >>> e2 = Election(date(2004, 5, 16))
+        >>> e2.update_results('r1', 'lib', 1)
+        >>> e2.update_results('r2', 'lib', 1)
+        >>> j._elections[date(2004, 5, 16)] = e2
+        >>> j.share_changes(date(2000, 2, 8), date(2004, 5, 16)) == {
+        ...     'r1': {'ndp': -0.5, 'lib': 0.5}}
+        True
+        """
+        return self.aligned().share_changes(start, end, party)
+
+    def seat_flips(self, start: date, end: date) -> Dict[str, Tuple[str, str]]:
+        """Return each riding whose winner changed from the election on
+        <start> to the election on <end>, as given by
+        AlignedElections.seat_flips.
+
+        Precondition: there are elections in this jurisdiction on <start> and
+        <end>.
+        """
+        return self.aligned().seat_flips(start, end)
+
+    def ridings_won_by(self, party: str,
+                       dates: Optional[List[date]] = None) -> List[str]:
+        """Return the ridings that <party> won outright in every election on
+        <dates> (in every election, if None), as given by
+        AlignedElections.ridings_won_by.
+
+        Precondition: there is an election in this jurisdiction on every date
+        in <dates>.
+        """
+        return self.aligned().ridings_won_by(party, dates)
+
+    def seat_allocations(self, systems: Dict[str, SeatAllocation],
+                         start: Optional[date] = None,
+                         end: Optional[date] = None
+                         ) -> Dict[date, Dict[str, Dict[str, int]]]:
+        """Return, for each election in this jurisdiction, in increasing
+        order of date, the seats each party would have won in it under each
+        of <systems>, as given by Election.seat_allocations.
+
+        If <start> or <end> is given, include only elections held on or after
+        <start>, and on or before <end>.
+
+        >>> from allocation import FirstPastThePost, SainteLague
+        >>> j = Jurisdiction('Canada')
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 3)
+        >>> e.update_results('r1', 'lib', 2)
+        >>> e.update_results('r2', 'lib', 1)
+        >>> j._elections[date(2000, 2, 8)] = e
+        >>> j.seat_allocations({'fptp': FirstPastThePost(),
+        ...                     'pr': SainteLague(seats=6)}) == {
+        ...     date(2000, 2, 8): {'fptp': {'ndp': 1, 'lib': 1},
+        ...                        'pr': {'ndp': 3, 'lib': 3}}}
+        True
+        """
+        return {d: self._elections[d].seat_allocations(systems)
+                for d in self._elections.between(start, end)}
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Return the number of hits, misses, evictions and expirations of
+        this jurisdiction's query cache so far, and the number of results it
+        holds.
+
+        >>> j = Jurisdiction('Canada')
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> j._elections[date(2000, 2, 8)] = e
+        >>> j.party_wins('ndp')
+        [datetime.date(2000, 2, 8)]
+        >>> j.party_wins('ndp')
+        [datetime.date(2000, 2, 8)]
+        >>> j.cache_stats() == {'hits': 1, 'misses': 1, 'evictions': 0,
+        ...                     'expirations': 0, 'entries': 1}
+        True
+        """
+        stats = dict(self._cache.stats)
+        stats['entries'] = len(self._cache.entries)
+        return stats
+
+    def data_version(self) -> int:
+        """Return a number that changes whenever an election is added to,
+        replaced in or removed from this jurisdiction, or has votes added.
+
+        >>> j = Jurisdiction('Canada')
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> j._elections[date(2000, 2, 8)] = e
+        >>> version = j.data_version()
+        >>> version == j.data_version()
+        True
+        >>> e.update_results('r1', 'lib', 2)
+        >>> version == j.data_version()
+        False
+        """
+        self._update_index()
+        return self._version
+
+    def known_data_version(self) -> Optional[int]:
+        """Return data_version() if it is known without looking at any
+        election, as it is when no votes have been added to any election of
+        this jurisdiction, and no election has been added, replaced or
+        removed, since it was last worked out.  Otherwise return None.
+
+        Unlike data_version, this never changes this jurisdiction, so it can
+        be called while another thread is querying it.
+
+        >>> j = Jurisdiction('Canada')
+        >>> e = Election(date(2000, 2, 8))
+        >>> j._elections[date(2000, 2, 8)] = e
+        >>> j.known_data_version() is None
+        True
+        >>> version = j.data_version()
+        >>> j.known_data_version() == version
+        True
+        """
+        if self._synced != (self._changes[0], self._elections.version()):
+            return None
+        return self._version
+
+    def clear_query_cache(self) -> None:
+        """Forget every cached query result.  The statistics are kept."""
+        self._cache.entries.clear()
+
+    def _cached(self, key: Tuple, start: Optional[date], end: Optional[date],
+                compute: Callable[[], Any]) -> Any:
+        """Return the cached result of the query <key>, which depends only on
+        the elections held on or after <start> and on or before <end>, or
+        compute() if there is no such result.
+
+        The result is not copied: the caller must not return it as is if it
+        can be mutated.
+        """
+        # Bringing the index up to date drops the results that depend on an
+        # election that was added, replaced or changed since they were cached.
+        # If nothing has changed, that takes a single comparison.
+        self._update_index()
+        entry = self._cache.get(key)
+        if entry is not None:
+            return entry[0]
+        value = compute()
+        self._cache.put(key, value, start, end)
+        return value
+
+    def _update_index(self) -> None:
+        """Bring the per-party index up to date with self._elections.
+
+        If no indexed election has had votes added, and self._elections has
+        not changed, since the last call, nothing is looked at.  Otherwise
+        only the elections that were added, replaced or had votes added since
+        they were last indexed are looked at again.
+        """
+        synced = (self._changes[0], self._elections.version())
+        if synced == self._synced:
+            return
+
+        stale = []
+        still_indexed = 0
+        for d in self._elections:
+            election = self._elections[d]
+            seen = self._index.indexed.get(d)
+            if seen is None or seen[0] is not election \
+                    or seen[1] != election.version():
+                stale.append(d)
+            if seen is not None:
+                still_indexed += 1
+
+        if still_indexed < len(self._index.indexed):
+            # An election was removed, so start again from scratch
+            self._index.clear()
+            self._cache.entries.clear()
+            self._version += 1
+            stale = list(self._elections)
+
+        for d in stale:
+            self._cache.invalidate(d)
+            election = self._elections[d]
+            election.watch(self._changes)
+            self._index.add(d, election)
+        if stale:
+            self._version += 1
+        self._synced = synced
+
+    def _party_series(self, series: Dict[str, array],
+                      party: str) -> Optional[array]:
+        """Return the values of <party> in <series>, one of the per-party
+        index's series, after bringing the index up to date.  Return None if
+        <party> has no votes recorded in any election.
+
+        <series> must be an attribute of self._index, which is updated in
+        place.
+        """
+        self._update_index()
+        return series.get(party)
+
     def riding_changes(self) -> List[Tuple[Set[str], Set[str]]]:
         """Return the changes in ridings across elections in this jurisdiction.
 
@@ -489,40 +2497,94 @@ class Jurisdiction:
         >>> j.riding_changes() == [({'r2'}, {'r3'})]
         True
         """
+        changes = self._cached(('riding_changes',), None, None,
+                               self._riding_changes)
+        return [(removed.copy(), added.copy()) for removed, added in changes]
+
+    def _riding_changes(self) -> List[Tuple[Set[str], Set[str]]]:
+        """Return the result of riding_changes(), without looking in the
+        query cache.
+        """
+        # The elections are kept in date order, so adjacent pairs of dates
+        # need no sorting.  Each difference of riding sets is taken a machine
+        # word at a time on the elections' bitsets.
         lst = []
-        if len(self._elections) == 1:
-            # This covers the case where jurisdiction only has 1 election date
-            return lst
-        else:
-            # Now we can assume jurisdiction has at least 2 election dates
-
-            # This gets us a list of all the keys (so dates of elections in this
-            # case) of self._elections.
-            election_dates = list(self._elections)
-
-            # Sort the election_dates by date in increasing order
-            election_dates.sort()
-
-            # Since we need to count every 2 consecutive election dates, we
-            # will parse through from the first index to the 2nd last index of
-            # election_dates
-            for i in range(len(election_dates) - 1):
-                ridings_start = set(
-                    self._elections[election_dates[i]].ridings_recorded())
-                ridings_end = set(
-                    self._elections[election_dates[i + 1]].ridings_recorded())
-                lst.append((ridings_start - ridings_end, ridings_end
-                            - ridings_start))
+        for d1, d2 in self._elections.pairs():
+            ridings_start = self._membership(d1)
+            ridings_end = self._membership(d2)
+            lst.append((
+                self._memberships.riding_set(ridings_start & ~ridings_end),
+                self._memberships.riding_set(ridings_end & ~ridings_start)))
 
         return lst
 
+    def riding_change_matrix(self) -> Tuple[List[date], List[str],
+                                            List[List[int]]]:
+        """Return the changes in ridings across all elections in this
+        jurisdiction, as a matrix.
+
+        Return the dates of the elections in increasing order, every riding
+        recorded in any of them, and a row for each of those ridings.  Column
+        k of a riding's row is 1 if the riding was added between elections k
+        and k + 1, -1 if it was removed, and 0 if neither.
+
+        >>> j = Jurisdiction('Canada')
+        >>> e1 = Election(date(2000, 2, 8))
+        >>> e1.update_results('r1', 'ndp', 1)
+        >>> e1.update_results('r2', 'pc', 1)
+        >>> j._elections[date(2000, 2, 8)] = e1
+        >>> e2 = Election(date(2004, 5, 16))
+        >>> e2.update_results('r1', 'ndp', 1)
+        >>> e2.update_results('r3', 'pc', 1)
+        >>> j._elections[date(2004, 5, 16)] = e2
+        >>> dates, ridings, matrix = j.riding_change_matrix()
+        >>> ridings
+        ['r1', 'r2', 'r3']
+        >>> matrix
+        [[0], [-1], [1]]
+        """
+        dates = self._elections.dates()
+        bitsets = [self._membership(d) for d in dates]
+        ridings = self._memberships.names.copy()
+        matrix = [[0] * (len(dates) - 1) for _ in ridings]
+        for k in range(len(dates) - 1):
+            for i in _bits_set(bitsets[k + 1] & ~bitsets[k]):
+                matrix[i][k] = 1
+            for i in _bits_set(bitsets[k] & ~bitsets[k + 1]):
+                matrix[i][k] = -1
+        return dates, ridings, matrix
+
+    def _membership(self, d: date) -> int:
+        """Return the bitset of the ridings recorded in the election on <d>,
+        as computed by _RidingMemberships.membership.
+        """
+        return self._memberships.membership(d, self._elections[d])
+
+
+def _bits_set(bits: int) -> Iterator[int]:
+    """Yield the index of each bit set in <bits>, from lowest to highest.
+
+    >>> list(_bits_set(0b10110))
+    [1, 2, 4]
+    """
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
 
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
-        'allowed-io': ['Election.read_results', 'Jurisdiction.read_results'],
+        'allowed-io': ['Election.read_results', 'Election.read_mapped',
+                       'Election._read_results_legacy',
+                       'Jurisdiction.read_results', 'Jurisdiction.read_many',
+                       '_read_partial', '_aread_lines'],
         'allowed-import-modules': [
-            'doctest', 'python_ta', 'datetime', 'typing'
+            'doctest', 'python_ta', 'allocation', 'array', 'asyncio',
+            'bisect', 'collections', 'concurrent.futures', 'datetime',
+            'itertools', 'operator', 'time', 'typing', 'ingest', 'polls',
+            'redistribution', 'snapshot', 'timeline'
         ],
         'max-attributes': 15
     })
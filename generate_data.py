@@ -0,0 +1,240 @@
+"""Generate synthetic csv files of election results, in exactly the layout of
+the Elections Canada files in data/, for load and soak testing.
+
+The files start with a byte order mark and the same bilingual header, quote
+text cells the same way, and include void polls, polls merged with another
+poll (which record no votes) and rows with no votes.  Output is written one
+riding at a time, so memory use depends only on the number of polls and
+parties in a riding, not on the size of the files.  The same arguments and
+seed always give the same files.
+
+    python generate_data.py --ridings 338 --polls 200 --elections 20 out/
+"""
+import argparse
+import os
+import random
+from datetime import date
+from typing import List, Optional, TextIO, Tuple
+
+from ingest import BOM
+
+HEADER = (
+    'Electoral District Number/Numéro de circonscription,'
+    'Electoral District Name_English/Nom de circonscription_Anglais,'
+    'Electoral District Name_French/Nom de circonscription_Français,'
+    'Polling Station Number/Numéro du bureau de scrutin,'
+    'Polling Station Name/Nom du bureau de scrutin,'
+    'Void Poll Indicator/Indicateur de bureau supprimé,'
+    'No Poll Held Indicator/Indicateur de bureau sans scrutin,'
+    'Merge With/Fusionné avec,'
+    'Rejected Ballots for Polling Station/Bulletins rejetés du bureau,'
+    'Electors for Polling Station/Électeurs du bureau,'
+    'Candidate’s Family Name/Nom de famille du candidat,'
+    'Candidate’s Middle Name/Second prénom du candidat,'
+    'Candidate’s First Name/Prénom du candidat,'
+    'Political Affiliation Name_English/Appartenance politique_Anglais,'
+    'Political Affiliation Name_French/Appartenance politique_Français,'
+    'Incumbent Indicator/Indicateur_Candidat sortant,'
+    'Elected Candidate Indicator/Indicateur du candidat élu,'
+    'Candidate Poll Votes Count/Votes du candidat pour le bureau'
+)
+
+# English and French party names, in the order parties are added.
+PARTIES = [
+    ('Liberal', 'Libéral'),
+    ('Conservative', 'Conservateur'),
+    ('NDP-New Democratic Party', 'NPD-Nouveau Parti démocratique'),
+    ('Green Party', 'Parti Vert'),
+    ('Bloc Québécois', 'Bloc Québécois'),
+    ('Libertarian', 'Libertarien'),
+    ('Marxist-Leninist', 'Marxiste-Léniniste'),
+    ('Christian Heritage Party', "Parti de l'Héritage Chrétien"),
+    ('Communist', 'Communiste'),
+    ('Rhinoceros', 'Rhinocéros'),
+    ('Radical Marijuana', 'Radical Marijuana'),
+    ('Independent', 'Indépendant'),
+]
+
+_PLACES = ['Toronto', 'Brampton', 'Medicine Hat', 'Iqaluit', 'Happy Valley',
+           "Norman's Bay", 'Parkdale', 'Rosedale', 'High Park', 'Igloolik']
+_FAMILY_NAMES = ['Bennett', 'Allen', 'Jones', 'Nash', 'Farmer', 'Tremblay',
+                 'Roy', 'Gagnon', 'Smith', 'Brown', 'Wilson', 'Martin']
+_FIRST_NAMES = ['Carolyn', 'Ian', 'Yvonne', 'Peggy', 'Kevin', 'Leona',
+                'Jack', 'Mark', 'Chrystia', 'David', 'Marie', 'Luc']
+
+# The fraction of polls that are void, and that are merged with the poll
+# before them.
+VOID_RATE = 0.01
+MERGE_RATE = 0.03
+
+
+def party_names(parties: int) -> List[Tuple[str, str]]:
+    """Return the English and French names of <parties> parties.
+
+    >>> party_names(2)
+    [('Liberal', 'Libéral'), ('Conservative', 'Conservateur')]
+    >>> party_names(14)[-1]
+    ('Party 14', 'Parti 14')
+    """
+    names = PARTIES[:parties]
+    for i in range(len(PARTIES), parties):
+        names.append(('Party {}'.format(i + 1), 'Parti {}'.format(i + 1)))
+    return names
+
+
+def riding_name(number: int, election: int) -> str:
+    """Return the name of riding <number> in election <election>.
+
+    Every five elections, the boundaries of one riding in ten are redrawn
+    and it is renamed, or given back its old name, so that riding_changes
+    has something to find.
+
+    >>> riding_name(3, 0)
+    'Iqaluit 3'
+    >>> riding_name(10, 5)
+    'Toronto--Toronto 10'
+    """
+    place = _PLACES[number % len(_PLACES)]
+    if number % 10 == 0 and election // 5 % 2 == 1:
+        return '{}--{} {}'.format(place, place, number)
+    return '{} {}'.format(place, number)
+
+
+def _quote(cell: str) -> str:
+    """Return <cell> quoted as in the Elections Canada files."""
+    return '"' + cell.replace('"', '""') + '"'
+
+
+def write_riding(output: TextIO, rng: random.Random, number: int,
+                 election: int, polls: int, parties: int,
+                 quoted_commas: bool = True) -> int:
+    """Write the rows of riding <number> in election <election> to <output>,
+    and return the number of rows written.
+
+    If <quoted_commas> is True, some poll names contain a comma inside their
+    quotes, as in "Smith, John School".
+    """
+    name = riding_name(number, election)
+    candidates = []
+    for english, french in party_names(parties):
+        candidates.append((rng.choice(_FAMILY_NAMES), rng.choice(_FIRST_NAMES),
+                           english, french, rng.random() < 0.1))
+    strengths = [rng.expovariate(1.0) for _ in range(parties)]
+    total_strength = sum(strengths)
+
+    # Votes for each poll and party are drawn before any row is written, so
+    # that the elected candidate is known.
+    poll_rows = []
+    totals = [0] * parties
+    for poll in range(1, polls + 1):
+        electors = rng.randint(50, 800)
+        void = rng.random() < VOID_RATE
+        merged = poll > 1 and not void and rng.random() < MERGE_RATE
+        if void or merged:
+            votes = [0] * parties
+            rejected = 0
+        else:
+            ballots = int(electors * rng.uniform(0.3, 0.85))
+            votes = [int(ballots * strength / total_strength
+                         * rng.uniform(0.6, 1.4)) for strength in strengths]
+            rejected = rng.randint(0, 5)
+        for p in range(parties):
+            totals[p] += votes[p]
+
+        place = _PLACES[(number + poll) % len(_PLACES)]
+        if quoted_commas and poll % 25 == 0:
+            place = '{}, {} School'.format(rng.choice(_FAMILY_NAMES), place)
+        poll_rows.append((' {}'.format(poll), place, void,
+                          str(poll - 1) if merged else '', rejected,
+                          electors, votes))
+
+    elected = totals.index(max(totals))
+    lines = []
+    for number_cell, place, void, merge_with, rejected, electors, votes \
+            in poll_rows:
+        prefix = ','.join([
+            str(10000 + number), _quote(name), _quote(name),
+            _quote(number_cell), _quote(place), 'Y' if void else 'N', 'N',
+            _quote(merge_with), str(rejected), str(electors)])
+        for p in range(parties):
+            family, first, english, french, incumbent = candidates[p]
+            lines.append(','.join([
+                prefix, _quote(family), '""', _quote(first), _quote(english),
+                _quote(french), 'Y' if incumbent else 'N',
+                'Y' if p == elected else 'N', str(votes[p])]) + '\n')
+    output.writelines(lines)
+    return len(lines)
+
+
+def write_election(output: TextIO, ridings: int, polls: int, parties: int,
+                   seed: int, election: int = 0,
+                   quoted_commas: bool = True) -> int:
+    """Write a whole csv file holding election <election> to <output>, with
+    its byte order mark and header, and return the number of rows written.
+
+    >>> from io import StringIO
+    >>> out = StringIO()
+    >>> write_election(out, 2, 3, 4, seed=1)
+    24
+    >>> out.getvalue().startswith('\\ufeffElectoral District Number')
+    True
+    """
+    rng = random.Random('{}/{}'.format(seed, election))
+    output.write(BOM + HEADER + '\n')
+    rows = 0
+    for number in range(1, ridings + 1):
+        rows += write_riding(output, rng, number, election, polls, parties,
+                             quoted_commas)
+    return rows
+
+
+def election_date(election: int) -> date:
+    """Return the date of election <election>: one every four years from
+    2000.
+
+    >>> election_date(2)
+    datetime.date(2008, 10, 19)
+    """
+    return date(2000 + 4 * election, 10, 19)
+
+
+def write_elections(directory: str, ridings: int, polls: int, parties: int,
+                    elections: int, seed: int,
+                    quoted_commas: bool = True) -> List[str]:
+    """Write one csv file for each of <elections> elections to <directory>,
+    named after its date, and return their paths.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for election in range(elections):
+        path = os.path.join(directory, '{}.csv'.format(
+            election_date(election).isoformat()))
+        with open(path, 'w', encoding='utf-8', newline='') as output:
+            write_election(output, ridings, polls, parties, seed, election,
+                           quoted_commas)
+        paths.append(path)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Generate the files described by the command line arguments <argv>."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('directory')
+    parser.add_argument('--ridings', type=int, default=338)
+    parser.add_argument('--polls', type=int, default=200)
+    parser.add_argument('--parties', type=int, default=8)
+    parser.add_argument('--elections', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-quoted-commas', dest='quoted_commas',
+                        action='store_false',
+                        help='keep commas out of quoted cells, so that the '
+                             'files can be read by clean_line')
+    args = parser.parse_args(argv)
+    for path in write_elections(args.directory, args.ridings, args.polls,
+                                args.parties, args.elections, args.seed,
+                                args.quoted_commas):
+        print(path, os.path.getsize(path))
+
+
+if __name__ == '__main__':
+    main()
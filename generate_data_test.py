@@ -0,0 +1,83 @@
+import csv
+from datetime import date
+from io import StringIO
+
+from elections import Election, clean_line
+from generate_data import HEADER, write_election, write_elections
+from ingest import BOM
+
+
+def generate(**kwargs: object) -> str:
+    """Return the text of a small generated csv file."""
+    output = StringIO()
+    write_election(output, 12, 30, 5, seed=7, **kwargs)
+    return output.getvalue()
+
+
+def test_deterministic() -> None:
+    """Test that the same seed gives the same file, and another seed or
+    election gives a different one."""
+    assert generate() == generate()
+    assert generate() != generate(election=1)
+    other = StringIO()
+    write_election(other, 12, 30, 5, seed=8)
+    assert generate() != other.getvalue()
+
+
+def test_layout_matches_data_files() -> None:
+    """Test that the generated files have the byte order mark, header and
+    columns of the Elections Canada files, including void and merged polls
+    and rows with no votes."""
+    with open('data/parkdale-highpark.csv', encoding='utf-8') as file:
+        assert file.readline().rstrip('\n') == BOM + HEADER
+
+    text = generate()
+    assert text.startswith(BOM + HEADER + '\n')
+    rows = list(csv.reader(StringIO(text[len(BOM):])))[1:]
+    assert len(rows) == 12 * 30 * 5
+    assert all(len(row) == 18 for row in rows)
+    assert any(row[5] == 'Y' and row[17] == '0' for row in rows)
+    assert any(row[7] != '' and row[17] == '0' for row in rows)
+    assert any(',' in row[4] for row in rows)
+    # One candidate is elected in each riding.
+    elected = {(row[1], row[13]) for row in rows if row[16] == 'Y'}
+    assert len(elected) == len({riding for riding, _ in elected}) == 12
+
+
+def test_read_results() -> None:
+    """Test that Election.read_results reads the generated files, and that
+    the elected flag matches the winner it finds."""
+    text = generate()
+    e = Election(date(2000, 10, 19))
+    e.read_results(StringIO(text))
+    assert len(e._ridings) == 12
+    assert len(e._parties) == 5
+    assert sum(e.party_seats().values()) == 12
+
+    elected = {}
+    for row in csv.reader(StringIO(text[len(BOM):])):
+        if row[16] == 'Y':
+            elected[row[2]] = row[13]
+    winners = e.riding_winners
+    assert all(winners(riding) == [elected[riding]] for riding in elected)
+
+
+def test_no_quoted_commas() -> None:
+    """Test that files without commas in quoted cells can be read by
+    clean_line, giving the same results."""
+    text = generate(quoted_commas=False)
+    for line in text.splitlines()[1:]:
+        assert len(clean_line(line)) == 18
+    fast = Election(date(2000, 10, 19))
+    fast.read_results(StringIO(text))
+    legacy = Election(date(2000, 10, 19))
+    legacy.read_results(StringIO(text), legacy=True)
+    assert fast._results == legacy._results
+
+
+def test_write_elections(tmp_path: object) -> None:
+    """Test that write_elections writes one file per election, named after
+    its date."""
+    paths = write_elections(str(tmp_path), 2, 3, 2, 3, seed=0)
+    assert [path[-14:] for path in paths] == \
+        ['2000-10-19.csv', '2004-10-19.csv', '2008-10-19.csv']
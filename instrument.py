@@ -0,0 +1,268 @@
+"""Opt-in instrumentation of the hot paths of elections.py.
+
+While instrumentation is enabled, each function in INSTRUMENTED is replaced
+by a wrapper that counts its calls and the time spent in them, and optionally
+the change in the number of memory blocks allocated by the interpreter during
+them.  Times include the time spent in any instrumented functions they call.
+Disabling instrumentation puts the original functions back, so when it is
+disabled it costs nothing at all.
+
+When enabled, the wrapper adds about 0.7 microseconds to each call.  Counting
+allocated blocks is off by default, because sys.getallocatedblocks takes time
+proportional to the size of the heap: about 0.15 microseconds on a small
+heap, but 40 microseconds with a million objects alive.
+
+Counts are kept by an Instrumenter, for the current process only; elections
+read by the worker processes of Jurisdiction.read_many are not counted.
+Latencies measured elsewhere, as by benchmark.py and server.py, are
+summarized by percentiles.
+
+    >>> from datetime import date
+    >>> from elections import Election
+    >>> instrumenter = Instrumenter()
+    >>> instrumenter.enable()
+    >>> e = Election(date(2000, 2, 8))
+    >>> e.update_results('r1', 'ndp', 1)
+    >>> e.party_seats() == {'ndp': 1}
+    True
+    >>> instrumenter.disable()
+    >>> instrumenter.report()['Election.update_results']['calls']
+    1
+"""
+import functools
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import elections
+
+# The functions that are instrumented, as (owner, attribute name) pairs.
+# Subclasses that override an instrumented method are listed separately.
+INSTRUMENTED = [
+    (elections, 'clean_line'),
+    (elections.Election, 'update_results'),
+    (elections.ArrayElection, 'update_results'),
+    (elections.Election, 'read_results'),
+    (elections.Election, 'read_mapped'),
+    (elections.Election, 'riding_winners'),
+    (elections.Election, 'party_seats'),
+    (elections.Election, 'election_winners'),
+    (elections.Jurisdiction, 'read_results'),
+    (elections.Jurisdiction, 'party_wins'),
+    (elections.Jurisdiction, 'party_history'),
+    (elections.Jurisdiction, 'party_seat_history'),
+    (elections.Jurisdiction, 'riding_changes'),
+    (elections.Jurisdiction, 'riding_change_matrix'),
+]
+
+def _qualified_name(owner: Any, name: str) -> str:
+    """Return the name under which calls to <owner>.<name> are recorded.
+
+    >>> _qualified_name(elections.Election, 'party_seats')
+    'Election.party_seats'
+    >>> _qualified_name(elections, 'clean_line')
+    'clean_line'
+    """
+    if isinstance(owner, type):
+        return owner.__name__ + '.' + name
+    return name
+
+
+def _wrap(func: Callable, stats: List, allocations: bool) -> Callable:
+    """Return a wrapper of <func> that adds each call and its duration to
+    <stats>, and the net number of blocks it allocated if <allocations> is
+    True.
+    """
+    clock = time.perf_counter
+    blocks = sys.getallocatedblocks
+
+    @functools.wraps(func)
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        """Call the wrapped function, recording the call."""
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats[1] += clock() - start
+            stats[0] += 1
+
+    @functools.wraps(func)
+    def counted(*args: Any, **kwargs: Any) -> Any:
+        """Call the wrapped function, recording the call and the blocks it
+        allocated.
+        """
+        start_blocks = blocks()
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats[1] += clock() - start
+            stats[2] += blocks() - start_blocks
+            stats[0] += 1
+
+    return counted if allocations else timed
+
+
+class Instrumenter:
+    """The calls recorded to the functions in INSTRUMENTED.
+
+    While an instrumenter is enabled, it has replaced each of those functions
+    with a wrapper that records calls to it.  If several instrumenters are
+    enabled at once, each records the calls made while it is enabled, and
+    they must be disabled in the reverse of the order they were enabled in.
+
+    === Private Attributes ===
+    _originals: the function each wrapper of this instrumenter replaced,
+        keyed on its (owner, attribute name) pair.  Empty unless this
+        instrumenter is enabled.
+    _stats: the calls, seconds and net allocated blocks recorded for each
+        function, keyed on its qualified name.
+    """
+    _originals: Dict[Tuple[Any, str], Callable]
+    _stats: Dict[str, List]
+
+    def __init__(self) -> None:
+        """Initialize a disabled instrumenter that has recorded no calls."""
+        self._originals = {}
+        self._stats = {}
+
+    def enable(self, allocations: bool = False) -> None:
+        """Start recording calls to the functions in INSTRUMENTED, and the
+        net number of memory blocks they allocate if <allocations> is True.
+        Counts recorded earlier are kept.
+
+        If this instrumenter is already enabled, it is first disabled.
+        """
+        self.disable()
+        for owner, name in INSTRUMENTED:
+            original = vars(owner)[name]
+            stats = self._stats.setdefault(_qualified_name(owner, name),
+                                           [0, 0.0, 0])
+            self._originals[(owner, name)] = original
+            setattr(owner, name, _wrap(original, stats, allocations))
+
+    def disable(self) -> None:
+        """Stop recording calls, putting back the functions this
+        instrumenter replaced.  Counts recorded so far are kept.
+        """
+        for (owner, name), original in self._originals.items():
+            setattr(owner, name, original)
+        self._originals.clear()
+
+    def is_enabled(self) -> bool:
+        """Return whether this instrumenter is recording calls."""
+        return bool(self._originals)
+
+    def reset(self) -> None:
+        """Set all counts recorded by this instrumenter back to zero."""
+        for stats in self._stats.values():
+            stats[0], stats[1], stats[2] = 0, 0.0, 0
+
+    @contextmanager
+    def instrumented(self, allocations: bool = False) -> Iterator[None]:
+        """Return a context manager that records calls, and the blocks they
+        allocate if <allocations> is True, while it is active.  Afterwards
+        calls are no longer recorded, unless they were being recorded before.
+
+        >>> instrumenter = Instrumenter()
+        >>> with instrumenter.instrumented():
+        ...     _ = elections.clean_line('1,"r1"')
+        >>> instrumenter.report()['clean_line']['calls']
+        1
+        >>> instrumenter.is_enabled()
+        False
+        """
+        was_enabled = self.is_enabled()
+        if not was_enabled:
+            self.enable(allocations)
+        try:
+            yield
+        finally:
+            if not was_enabled:
+                self.disable()
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Return, for each instrumented function that has been called, its
+        call count, total seconds, mean seconds per call and net allocated
+        blocks (0 unless they were being counted).
+        """
+        result = {}
+        for name, (calls, seconds, blocks) in self._stats.items():
+            if calls > 0:
+                result[name] = {'calls': calls, 'seconds': seconds,
+                                'mean_seconds': seconds / calls,
+                                'allocated_blocks': blocks}
+        return result
+
+    def prometheus(self, prefix: str = 'elections') -> str:
+        """Return the recorded counts in the Prometheus text exposition
+        format, with metric names starting with <prefix>.
+
+        >>> instrumenter = Instrumenter()
+        >>> with instrumenter.instrumented():
+        ...     _ = elections.clean_line('1,"r1"')
+        ...     _ = elections.clean_line('2,"r2"')
+        >>> print(instrumenter.prometheus())  # doctest: +ELLIPSIS
+        # HELP elections_calls_total Calls to each instrumented function.
+        # TYPE elections_calls_total counter
+        elections_calls_total{function="clean_line"} 2
+        # HELP elections_seconds_total Seconds spent in each instrumented \
+function.
+        # TYPE elections_seconds_total counter
+        elections_seconds_total{function="clean_line"} ...
+        # HELP elections_allocated_blocks Net memory blocks allocated by \
+each instrumented function.
+        # TYPE elections_allocated_blocks gauge
+        elections_allocated_blocks{function="clean_line"} 0
+        <BLANKLINE>
+        """
+        stats = self.report()
+        lines = []
+        for metric, kind, field, description in [
+                ('calls_total', 'counter', 'calls',
+                 'Calls to each instrumented function.'),
+                ('seconds_total', 'counter', 'seconds',
+                 'Seconds spent in each instrumented function.'),
+                ('allocated_blocks', 'gauge', 'allocated_blocks',
+                 'Net memory blocks allocated by each instrumented '
+                 'function.')]:
+            full_name = prefix + '_' + metric
+            lines.append('# HELP {} {}'.format(full_name, description))
+            lines.append('# TYPE {} {}'.format(full_name, kind))
+            for name in stats:
+                lines.append('{}{{function="{}"}} {}'.format(
+                    full_name, name, stats[name][field]))
+        return '\n'.join(lines) + '\n'
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Return the minimum, 50th, 90th and 99th percentiles and maximum of
+    <samples>, in milliseconds.
+
+    >>> percentiles([0.001, 0.002, 0.003]) == {
+    ...     'min': 1.0, 'p50': 2.0, 'p90': 3.0, 'p99': 3.0, 'max': 3.0}
+    True
+    """
+    ordered = sorted(samples)
+
+    def at(fraction: float) -> float:
+        """Return the sample at <fraction> of the way through ordered."""
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return round(ordered[index] * 1000, 4)
+
+    return {'min': at(0.0), 'p50': at(0.5), 'p90': at(0.9), 'p99': at(0.99),
+            'max': at(1.0)}
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'contextlib', 'functools', 'sys', 'time',
+            'typing', 'elections'
+        ]
+    })
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,67 @@
+from datetime import date
+
+import elections
+import instrument
+from elections import ArrayElection, Election, Jurisdiction
+
+
+def test_disabled_leaves_functions_alone() -> None:
+    """Test that enabling and then disabling instrumentation puts back the
+    very same functions, so that it costs nothing when disabled."""
+    update_results = Election.__dict__['update_results']
+    party_wins = Jurisdiction.__dict__['party_wins']
+    instrumenter = instrument.Instrumenter()
+    instrumenter.enable()
+    assert Election.__dict__['update_results'] is not update_results
+    assert instrumenter.is_enabled()
+    instrumenter.disable()
+    assert Election.__dict__['update_results'] is update_results
+    assert Jurisdiction.__dict__['party_wins'] is party_wins
+    assert not instrumenter.is_enabled()
+
+
+def test_counts_hot_paths() -> None:
+    """Test that calls to the hot paths are counted, including those made
+    from other instrumented functions and by subclasses."""
+    instrumenter = instrument.Instrumenter()
+    with instrumenter.instrumented(allocations=True):
+        j = Jurisdiction('Canada')
+        with open('data/nunavut.csv', encoding='utf-8') as file:
+            j.read_results(2015, 10, 19, file)
+        e = ArrayElection(date(2015, 10, 19))
+        with open('data/nunavut.csv', encoding='utf-8') as file:
+            e.read_results(file, legacy=True)
+        j.party_wins('Liberal')
+        j.party_history('Liberal')
+    stats = instrumenter.report()
+    assert stats['Jurisdiction.read_results']['calls'] == 1
+    assert stats['Election.read_results']['calls'] == 2
+    assert stats['Election.update_results']['calls'] == 205
+    assert stats['ArrayElection.update_results']['calls'] == 205
+    assert stats['clean_line']['calls'] == 244
+    assert stats['Jurisdiction.party_wins']['calls'] == 1
+    assert stats['Election.party_seats']['calls'] >= 1
+    assert stats['Election.read_results']['seconds'] >= \
+        stats['Election.read_results']['mean_seconds'] > 0
+
+    dump = instrumenter.prometheus()
+    assert 'elections_calls_total{function="clean_line"} 244\n' in dump
+    assert '# TYPE elections_seconds_total counter\n' in dump
+    instrumenter.reset()
+    assert instrumenter.report() == {}
+
+
+def test_instrumenters_keep_their_own_counts() -> None:
+    """Test that two instrumenters enabled one inside the other each count
+    only the calls made while they are enabled, and put back the original
+    functions once both are disabled."""
+    clean_line = vars(elections)['clean_line']
+    outer = instrument.Instrumenter()
+    inner = instrument.Instrumenter()
+    with outer.instrumented():
+        elections.clean_line('1,"r1"')
+        with inner.instrumented():
+            elections.clean_line('2,"r2"')
+    assert outer.report()['clean_line']['calls'] == 2
+    assert inner.report()['clean_line']['calls'] == 1
+    assert vars(elections)['clean_line'] is clean_line
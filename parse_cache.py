@@ -0,0 +1,198 @@
+"""An on-disk cache of the vote counts parsed from csv files of election
+results, for jobs that read the same files over and over.
+
+Each entry holds the per-riding, per-party counts of one file, stored as a
+snapshot (see snapshot.py) named after a SHA-256 hash of the file's contents.
+An index maps each file path, size and modification time to the hash of its
+contents, so a file that has not changed is not hashed again.  When the
+entries take up more than the cache's size limit, the least recently used
+ones are removed.
+"""
+import hashlib
+import json
+import os
+from datetime import date
+from typing import Dict, List, Optional
+
+from elections import Election
+
+# The number of bytes read at a time when hashing a file.
+_HASH_CHUNK_SIZE = 1 << 20
+
+# The name of the index file in a cache directory.
+_INDEX_NAME = 'index.json'
+
+
+class ParseCache:
+    """An on-disk cache of the vote counts in csv files of election results.
+
+    === Public Attributes ===
+    hits: the number of files whose counts were found in this cache.
+    misses: the number of files that had to be parsed.
+    evictions: the number of entries removed to keep this cache within its
+        size limit.
+
+    === Private Attributes ===
+    _directory: the directory holding the entries and the index.
+    _max_bytes: the most space, in bytes, that the entries may take up.
+    _index: maps the absolute path of each file read through this cache to
+        [size, modification time in nanoseconds, content hash] for the file
+        as it was when it was last read.
+
+    === Representation Invariants ===
+    - self._max_bytes >= 0
+    - self.hits, self.misses and self.evictions are >= 0
+    """
+    hits: int
+    misses: int
+    evictions: int
+    _directory: str
+    _max_bytes: int
+    _index: Dict[str, List]
+
+    def __init__(self, directory: str, max_bytes: int = 256 << 20) -> None:
+        """Initialize a cache stored in <directory>, whose entries take up at
+        most <max_bytes> bytes.  The directory is created if need be, and any
+        entries already in it are reused.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        try:
+            with open(os.path.join(directory, _INDEX_NAME)) as index_file:
+                self._index = json.load(index_file)
+        except (OSError, ValueError):
+            self._index = {}
+
+    def read_results(self, election: Election, path: str) -> None:
+        """Update <election> with the results in the csv file at <path>, using
+        the counts in this cache if the file's contents have been read before.
+
+        Precondition: <path> is a csv file, in the format defined in the A0
+        handout.
+        """
+        digest = self._digest(path)
+        entry_path = self._entry_path(digest)
+        try:
+            # The date of a cached election is not used, since only its
+            # counts are added to <election>.
+            partial = Election.load(entry_path)
+            os.utime(entry_path)
+            self.hits += 1
+        except (OSError, ValueError):
+            partial = Election(date.min)
+            partial.read_mapped(path)
+            partial.save(entry_path)
+            self.misses += 1
+            self._evict()
+
+        election.merge(partial)
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Remove the entry for the file at <path> from this cache, or every
+        entry if <path> is None.
+        """
+        if path is None:
+            digests = {name[:-len('.snapshot')]
+                       for name in os.listdir(self._directory)
+                       if name.endswith('.snapshot')}
+            self._index = {}
+        else:
+            entry = self._index.pop(os.path.abspath(path), None)
+            digests = set() if entry is None else {entry[2]}
+
+        for digest in digests:
+            try:
+                os.remove(self._entry_path(digest))
+            except FileNotFoundError:
+                pass
+        self._save_index()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit, miss and eviction counts of this cache, together
+        with the number of entries and the bytes they take up.
+        """
+        sizes = self._entry_sizes()
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'entries': len(sizes),
+                'bytes': sum(sizes.values())}
+
+    def _digest(self, path: str) -> str:
+        """Return the content hash of the file at <path>, hashing the file
+        only if its size or modification time has changed since it was last
+        read through this cache.
+        """
+        key = os.path.abspath(path)
+        status = os.stat(path)
+        entry = self._index.get(key)
+        if entry is not None and entry[0] == status.st_size \
+                and entry[1] == status.st_mtime_ns:
+            return entry[2]
+
+        sha = hashlib.sha256()
+        with open(path, 'rb') as input_file:
+            chunk = input_file.read(_HASH_CHUNK_SIZE)
+            while chunk:
+                sha.update(chunk)
+                chunk = input_file.read(_HASH_CHUNK_SIZE)
+        digest = sha.hexdigest()
+        self._index[key] = [status.st_size, status.st_mtime_ns, digest]
+        self._save_index()
+        return digest
+
+    def _entry_path(self, digest: str) -> str:
+        """Return the path of the entry for the contents with hash <digest>.
+        """
+        return os.path.join(self._directory, digest + '.snapshot')
+
+    def _entry_sizes(self) -> Dict[str, int]:
+        """Return the size in bytes of each entry file in this cache."""
+        sizes = {}
+        for name in os.listdir(self._directory):
+            if name.endswith('.snapshot'):
+                sizes[name] = os.path.getsize(
+                    os.path.join(self._directory, name))
+        return sizes
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries of this cache until they
+        take up at most self._max_bytes bytes.
+        """
+        sizes = self._entry_sizes()
+        total = sum(sizes.values())
+        if total <= self._max_bytes:
+            return
+
+        by_last_use = sorted(sizes, key=lambda name: os.path.getmtime(
+            os.path.join(self._directory, name)))
+        for name in by_last_use:
+            if total <= self._max_bytes:
+                break
+            os.remove(os.path.join(self._directory, name))
+            total -= sizes[name]
+            self.evictions += 1
+
+    def _save_index(self) -> None:
+        """Write self._index to the index file of this cache."""
+        index_path = os.path.join(self._directory, _INDEX_NAME)
+        with open(index_path + '.tmp', 'w') as index_file:
+            json.dump(self._index, index_file)
+        os.replace(index_path + '.tmp', index_path)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-io': ['ParseCache.__init__', 'ParseCache._digest',
+                       'ParseCache._save_index'],
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'datetime', 'hashlib', 'json', 'os',
+            'typing', 'elections'
+        ]
+    })
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,78 @@
+import os
+import shutil
+from datetime import date
+
+from elections import ArrayElection, Election
+from parse_cache import ParseCache
+
+
+def read_directly(path: str) -> Election:
+    """Return an Election holding the results in the csv file at <path>."""
+    e = Election(date(2015, 10, 19))
+    with open(path, encoding='utf-8') as file:
+        e.read_results(file)
+    return e
+
+
+def test_hit_after_miss(tmp_path) -> None:
+    """Test that the second read of a file is a hit with the same results."""
+    cache = ParseCache(str(tmp_path / 'cache'))
+    e1 = Election(date(2015, 10, 19))
+    cache.read_results(e1, 'data/nunavut.csv')
+    e2 = ArrayElection(date(2015, 10, 19))
+    cache.read_results(e2, 'data/nunavut.csv')
+    assert cache.hits == 1 and cache.misses == 1
+    assert e1._results == read_directly('data/nunavut.csv')._results
+    assert e2.summary() == e1.summary()
+
+
+def test_persists_between_caches(tmp_path) -> None:
+    """Test that a new cache on the same directory reuses its entries."""
+    ParseCache(str(tmp_path / 'cache')).read_results(
+        Election(date(2015, 10, 19)), 'data/labrador.csv')
+    cache = ParseCache(str(tmp_path / 'cache'))
+    cache.read_results(Election(date(2015, 10, 19)), 'data/labrador.csv')
+    assert cache.stats()['hits'] == 1
+
+
+def test_changed_file(tmp_path) -> None:
+    """Test that touching a file still hits, but changing it misses."""
+    path = str(tmp_path / 'small.csv')
+    shutil.copy('data/small_data.csv', path)
+    cache = ParseCache(str(tmp_path / 'cache'))
+    cache.read_results(Election(date(2015, 10, 19)), path)
+    os.utime(path, ns=(0, 0))
+    cache.read_results(Election(date(2015, 10, 19)), path)
+    assert cache.hits == 1
+
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('35090,"Toronto--St. Paul\'s","Toronto--St. Paul\'s"," 1",'
+                   '"Toronto",N,N,"",1,367,"A","","B","Liberal","Libéral",'
+                   'Y,Y,1000\n')
+    e = Election(date(2015, 10, 19))
+    cache.read_results(e, path)
+    assert cache.misses == 2
+    assert e.popular_vote()['Liberal'] == 3940
+
+
+def test_eviction_and_invalidate(tmp_path) -> None:
+    """Test that a small cache evicts its least recently used entries, and
+    that invalidate removes entries."""
+    cache = ParseCache(str(tmp_path / 'cache'), max_bytes=0)
+    cache.read_results(Election(date(2015, 10, 19)), 'data/nunavut.csv')
+    assert cache.stats()['entries'] == 0
+    assert cache.evictions == 1
+
+    cache = ParseCache(str(tmp_path / 'cache'))
+    cache.read_results(Election(date(2015, 10, 19)), 'data/nunavut.csv')
+    cache.read_results(Election(date(2015, 10, 19)), 'data/labrador.csv')
+    assert cache.stats()['entries'] == 2
+    cache.invalidate('data/nunavut.csv')
+    assert cache.stats()['entries'] == 1
+    cache.invalidate()
+    assert cache.stats()['entries'] == 0
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main(['parse_cache_test.py'])
@@ -0,0 +1,386 @@
+"""Poll-level (polling station) results, kept in compact arrays.
+
+Election only keeps the total votes for each party in each riding.  A
+PollStore keeps what the csv files record for each polling station as well:
+its name, whether it was void or had no poll held, the poll it was merged
+with, its rejected ballots and its electors, and the votes for each party at
+that station.
+
+=== Memory ===
+Every string (riding, poll number, poll name, party) is interned, so each
+distinct string is stored once no matter how many rows repeat it.  Each row
+(one party at one polling station) takes 12 bytes: the poll's index, the
+party's id and the votes, each a 32-bit integer.  Each polling station takes
+25 bytes: its riding, number, name and merge-with string ids, its rejected
+ballots and electors (32-bit integers each), and one byte of flags.
+
+The Elections Canada files have one row per candidate at each polling
+station.  Measured on a million rows built from the files in data/ (about 7
+rows per polling station, 145,000 polling stations), a PollStore takes about
+31 MB in total: 15.7 MB of arrays, and the rest for the dictionary that finds
+a polling station by riding and number.  The first query by polling station
+adds a 4.6 MB index of the rows.  The same rows kept as lists of 18 Python
+strings take about 870 MB.
+"""
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Column numbers, in the csv files containing election results, of the values
+# kept for each polling station and each row.
+RIDING = 1
+POLL_NUMBER = 3
+POLL_NAME = 4
+VOID_POLL = 5
+NO_POLL_HELD = 6
+MERGE_WITH = 7
+REJECTED = 8
+ELECTORS = 9
+PARTY = 13
+VOTES = 17
+
+# Bits of the flags kept for each polling station.
+VOID_FLAG = 1
+NO_POLL_FLAG = 2
+
+
+def _poll_key(riding_id: int, number_id: int) -> int:
+    """Return the key of the polling station with the given riding and poll
+    number string ids.  A single int takes less memory than a tuple.
+    """
+    return (riding_id << 32) | number_id
+
+
+class _PollColumns:
+    """The details of each polling station in a PollStore, one array per
+    detail.  Polling station i has the i-th item of every array.
+
+    === Attributes ===
+    riding, number, name, merge_with: the string ids of each polling
+        station's riding, number, name and the number of the poll it was
+        merged with ('' if none).
+    rejected, electors: each polling station's rejected ballots and
+        electors.
+    flags: each polling station's VOID_FLAG and NO_POLL_FLAG bits.
+
+    === Representation Invariants ===
+    - All the arrays have the same length.
+    """
+    riding: array
+    number: array
+    name: array
+    merge_with: array
+    rejected: array
+    electors: array
+    flags: array
+
+    def __init__(self) -> None:
+        """Initialize columns with no polling stations."""
+        self.riding = array('I')
+        self.number = array('I')
+        self.name = array('I')
+        self.merge_with = array('I')
+        self.rejected = array('I')
+        self.electors = array('I')
+        self.flags = array('B')
+
+    def __len__(self) -> int:
+        """Return the number of polling stations in these columns."""
+        return len(self.riding)
+
+    def arrays(self) -> List[array]:
+        """Return every array of these columns."""
+        return [self.riding, self.number, self.name, self.merge_with,
+                self.rejected, self.electors, self.flags]
+
+
+class _RowColumns:
+    """The rows of a PollStore, one array per value.  Row i has the i-th
+    item of every array.
+
+    === Attributes ===
+    poll: the index of each row's polling station.
+    party: the string id of each row's party.
+    votes: each row's votes.
+
+    === Representation Invariants ===
+    - All the arrays have the same length.
+    """
+    poll: array
+    party: array
+    votes: array
+
+    def __init__(self) -> None:
+        """Initialize columns with no rows."""
+        self.poll = array('I')
+        self.party = array('I')
+        self.votes = array('I')
+
+    def __len__(self) -> int:
+        """Return the number of rows in these columns."""
+        return len(self.votes)
+
+    def arrays(self) -> List[array]:
+        """Return every array of these columns."""
+        return [self.poll, self.party, self.votes]
+
+
+class PollStore:
+    """The results at each polling station in an election.
+
+    === Private Attributes ===
+    _strings: every interned string, indexed by its id.
+    _string_ids: maps each string in self._strings to its id.
+    _poll_ids: maps _poll_key(riding id, poll number id) to the index of
+        that polling station in the per-poll arrays.
+    _riding_polls: maps each riding id to the indexes of its polling stations,
+        in the order in which they were first read.
+    _polls: the details of each polling station, indexed as in
+        self._poll_ids.
+    _rows: the polling station, party and votes of each row.
+    _row_index: None if rows have been added since it was last built.
+        Otherwise a pair (offsets, rows): the rows of polling station i are
+        rows[offsets[i]] to rows[offsets[i + 1] - 1].
+
+    === Representation Invariants ===
+    - self._string_ids[self._strings[i]] == i for every index i
+    """
+    _strings: List[str]
+    _string_ids: Dict[str, int]
+    _poll_ids: Dict[int, int]
+    _riding_polls: Dict[int, array]
+    _polls: _PollColumns
+    _rows: _RowColumns
+    _row_index: Optional[Tuple[array, array]]
+
+    def __init__(self) -> None:
+        """Initialize a store with no polling stations."""
+        self._strings = []
+        self._string_ids = {}
+        self._poll_ids = {}
+        self._riding_polls = {}
+        self._polls = _PollColumns()
+        self._rows = _RowColumns()
+        self._row_index = None
+
+    def __len__(self) -> int:
+        """Return the number of rows in this store."""
+        return len(self._rows)
+
+    def _intern(self, s: str) -> int:
+        """Return the id of <s>, interning it if need be."""
+        i = self._string_ids.get(s)
+        if i is None:
+            i = len(self._strings)
+            self._string_ids[s] = i
+            self._strings.append(s)
+        return i
+
+    def add_row(self, row: Sequence[str]) -> None:
+        """Add one row of a csv file, given as the list of its cells, to this
+        store.  A polling station's details are taken from its first row.
+
+        >>> store = PollStore()
+        >>> store.add_row(['1', 'r1', 'r1', ' 1', 'School', 'N', 'N', '',
+        ...                '2', '50', 'A', '', 'B', 'ndp', 'npd', 'N', 'N',
+        ...                '30'])
+        >>> len(store)
+        1
+        """
+        riding = self._intern(row[RIDING])
+        number = self._intern(row[POLL_NUMBER].strip())
+        poll = self._poll_ids.get(_poll_key(riding, number))
+        if poll is None:
+            poll = len(self._polls)
+            self._poll_ids[_poll_key(riding, number)] = poll
+            self._riding_polls.setdefault(riding, array('I')).append(poll)
+            self._polls.riding.append(riding)
+            self._polls.number.append(number)
+            self._polls.name.append(self._intern(row[POLL_NAME]))
+            self._polls.merge_with.append(
+                self._intern(row[MERGE_WITH].strip()))
+            self._polls.rejected.append(int(row[REJECTED] or 0))
+            self._polls.electors.append(int(row[ELECTORS] or 0))
+            flags = 0
+            if row[VOID_POLL] == 'Y':
+                flags |= VOID_FLAG
+            if row[NO_POLL_HELD] == 'Y':
+                flags |= NO_POLL_FLAG
+            self._polls.flags.append(flags)
+
+        self._rows.poll.append(poll)
+        self._rows.party.append(self._intern(row[PARTY]))
+        self._rows.votes.append(int(row[VOTES]))
+        self._row_index = None
+
+    def _rows_of(self, poll: int) -> array:
+        """Return the indexes of the rows of the polling station with index
+        <poll>, building self._row_index first if need be.
+        """
+        if self._row_index is None:
+            # Count the rows of each polling station, then place each row
+            # after those of the polling stations before it.
+            offsets = array('I', [0]) * (len(self._polls) + 1)
+            for i in self._rows.poll:
+                offsets[i + 1] += 1
+            for i in range(len(self._polls)):
+                offsets[i + 1] += offsets[i]
+            rows = array('I', [0]) * len(self._rows)
+            next_slot = offsets[:-1]
+            for row in range(len(self._rows)):
+                i = self._rows.poll[row]
+                rows[next_slot[i]] = row
+                next_slot[i] += 1
+            self._row_index = (offsets, rows)
+
+        offsets, rows = self._row_index
+        return rows[offsets[poll]:offsets[poll + 1]]
+
+    def _results_of(self, poll: int) -> Dict[str, int]:
+        """Return the votes for each party at the polling station with index
+        <poll>.
+        """
+        results = {}
+        for row in self._rows_of(poll):
+            party = self._strings[self._rows.party[row]]
+            results[party] = results.get(party, 0) + self._rows.votes[row]
+        return results
+
+    def _poll(self, riding: str, poll: str) -> Optional[int]:
+        """Return the index of polling station <poll> in <riding>, or None if
+        it is not in this store.
+        """
+        riding_id = self._string_ids.get(riding)
+        number_id = self._string_ids.get(poll.strip())
+        if riding_id is None or number_id is None:
+            return None
+        return self._poll_ids.get(_poll_key(riding_id, number_id))
+
+    def ridings(self) -> List[str]:
+        """Return the ridings with polling stations in this store."""
+        return [self._strings[riding] for riding in self._riding_polls]
+
+    def polls(self, riding: str) -> List[str]:
+        """Return the numbers of the polling stations in <riding>, in the
+        order in which they were first read.
+
+        >>> store = PollStore()
+        >>> for number in [' 1', ' 2', ' 1']:
+        ...     store.add_row(['1', 'r1', 'r1', number, 'School', 'N', 'N',
+        ...                    '', '0', '50', 'A', '', 'B', 'ndp', 'npd',
+        ...                    'N', 'N', '10'])
+        >>> store.polls('r1')
+        ['1', '2']
+        """
+        riding_id = self._string_ids.get(riding)
+        if riding_id is None or riding_id not in self._riding_polls:
+            return []
+        return [self._strings[self._polls.number[poll]]
+                for poll in self._riding_polls[riding_id]]
+
+    def poll_info(self, riding: str, poll: str) -> Optional[Dict]:
+        """Return the details of polling station <poll> in <riding>, or None
+        if it is not in this store.
+
+        The keys of the result are 'name', 'void', 'no_poll_held',
+        'merge_with', 'rejected' and 'electors'.
+
+        >>> store = PollStore()
+        >>> store.add_row(['1', 'r1', 'r1', ' 6B', 'School', 'N', 'N', '7',
+        ...                '0', '38', 'A', '', 'B', 'ndp', 'npd', 'N', 'N',
+        ...                '0'])
+        >>> store.poll_info('r1', '6B') == {
+        ...     'name': 'School', 'void': False, 'no_poll_held': False,
+        ...     'merge_with': '7', 'rejected': 0, 'electors': 38}
+        True
+        """
+        i = self._poll(riding, poll)
+        if i is None:
+            return None
+        polls = self._polls
+        return {'name': self._strings[polls.name[i]],
+                'void': bool(polls.flags[i] & VOID_FLAG),
+                'no_poll_held': bool(polls.flags[i] & NO_POLL_FLAG),
+                'merge_with': self._strings[polls.merge_with[i]],
+                'rejected': polls.rejected[i],
+                'electors': polls.electors[i]}
+
+    def poll_results(self, riding: str, poll: str) -> Dict[str, int]:
+        """Return the votes for each party at polling station <poll> in
+        <riding>, including parties with no votes there.
+
+        The first query after rows are added indexes the rows by polling
+        station, in time proportional to the number of rows.
+
+        >>> store = PollStore()
+        >>> rows = [(' 1', 'ndp', '3'), (' 2', 'ndp', '5'), (' 1', 'lib', '0')]
+        >>> for number, party, votes in rows:
+        ...     store.add_row(['1', 'r1', 'r1', number, 'School', 'N', 'N',
+        ...                    '', '0', '50', 'A', '', 'B', party, '', 'N',
+        ...                    'N', votes])
+        >>> store.poll_results('r1', '1') == {'ndp': 3, 'lib': 0}
+        True
+        """
+        i = self._poll(riding, poll)
+        if i is None:
+            return {}
+        return self._results_of(i)
+
+    def results_by_poll(self, riding: str) -> Dict[str, Dict[str, int]]:
+        """Return the votes for each party at each polling station in
+        <riding>, keyed by poll number.
+
+        >>> store = PollStore()
+        >>> rows = [(' 1', 'ndp', '3'), (' 1', 'lib', '4'), (' 2', 'ndp', '5')]
+        >>> for number, party, votes in rows:
+        ...     store.add_row(['1', 'r1', 'r1', number, 'School', 'N', 'N',
+        ...                    '', '0', '50', 'A', '', 'B', party, '', 'N',
+        ...                    'N', votes])
+        >>> store.results_by_poll('r1') == {'1': {'ndp': 3, 'lib': 4},
+        ...                                 '2': {'ndp': 5}}
+        True
+        """
+        riding_id = self._string_ids.get(riding)
+        if riding_id is None or riding_id not in self._riding_polls:
+            return {}
+        return {self._strings[self._polls.number[poll]]: self._results_of(poll)
+                for poll in self._riding_polls[riding_id]}
+
+    def turnout(self, riding: str) -> Dict[str, Optional[float]]:
+        """Return the turnout at each polling station in <riding>, keyed by
+        poll number: the votes cast plus the rejected ballots, as a fraction
+        of its electors.  The turnout is None for a polling station that was
+        void, had no poll held, was merged with another, or has no electors.
+        """
+        by_poll = self.results_by_poll(riding)
+        polls = self._polls
+        turnout = {}
+        for number in by_poll:
+            i = self._poll(riding, number)
+            if polls.electors[i] == 0 or polls.flags[i] != 0 \
+                    or self._strings[polls.merge_with[i]] != '':
+                turnout[number] = None
+            else:
+                ballots = sum(by_poll[number].values()) + polls.rejected[i]
+                turnout[number] = ballots / polls.electors[i]
+        return turnout
+
+    def nbytes(self) -> int:
+        """Return the number of bytes used by the arrays of this store, not
+        counting the interned strings.
+        """
+        arrays = self._polls.arrays() + self._rows.arrays()
+        if self._row_index is not None:
+            arrays.extend(self._row_index)
+        return sum(a.itemsize * len(a) for a in arrays)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'array', 'typing'
+        ]
+    })
+
+    import doctest
+    doctest.testmod()
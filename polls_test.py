@@ -0,0 +1,66 @@
+from datetime import date
+
+from elections import ArrayElection, Election
+
+
+def read_with_polls(path: str) -> Election:
+    """Return an Election keeping poll-level results, read from <path>."""
+    e = Election(date(2015, 10, 19))
+    e.keep_polls()
+    with open(path, encoding='utf-8') as file:
+        e.read_results(file)
+    return e
+
+
+def test_riding_totals_match() -> None:
+    """Test that the poll-level results add up to the riding results, and
+    that keeping them does not change the riding results."""
+    e = read_with_polls('data/parkdale-highpark.csv')
+    plain = Election(date(2015, 10, 19))
+    with open('data/parkdale-highpark.csv', encoding='utf-8') as file:
+        plain.read_results(file)
+    assert e._results == plain._results
+
+    totals = {}
+    store = e.polls()
+    for poll, results in store.results_by_poll('Parkdale--High Park').items():
+        assert store.poll_results('Parkdale--High Park', poll) == results
+        for party in results:
+            totals[party] = totals.get(party, 0) + results[party]
+    assert {party: n for party, n in totals.items() if n > 0} == \
+        e._results['Parkdale--High Park']
+    assert len(store) == 1848
+
+
+def test_merged_poll() -> None:
+    """Test the details and turnout of a polling station merged with another.
+    """
+    store = read_with_polls('data/parkdale-highpark.csv').polls()
+    info = store.poll_info('Parkdale--High Park', '6B')
+    assert info == {'name': 'Toronto', 'void': False, 'no_poll_held': False,
+                    'merge_with': '7', 'rejected': 0, 'electors': 38}
+    turnout = store.turnout('Parkdale--High Park')
+    assert turnout['6B'] is None
+    assert turnout['1'] == (sum(store.poll_results(
+        'Parkdale--High Park', '1').values()) + 2) / 357
+    assert store.poll_info('Parkdale--High Park', 'no such poll') is None
+
+
+def test_polls_across_ridings() -> None:
+    """Test that polls with the same number in different ridings are kept
+    apart, in an ArrayElection."""
+    e = ArrayElection(date(2015, 10, 19))
+    store = e.keep_polls()
+    for path in ['data/nunavut.csv', 'data/labrador.csv']:
+        with open(path, encoding='utf-8') as file:
+            e.read_results(file)
+    assert store.ridings() == ['Nunavut', 'Labrador']
+    assert store.polls('Nunavut')[0] == store.polls('Labrador')[0] == '1'
+    assert store.poll_results('Nunavut', '1') != \
+        store.poll_results('Labrador', '1')
+    assert Election(date(2015, 10, 19)).polls() is None
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main(['polls_test.py'])
@@ -0,0 +1,219 @@
+"""Maps from the ridings of one redistribution to those of the next, so that
+elections held on different boundaries can be compared.
+
+When riding boundaries are redrawn, a riding may simply be renamed (St.
+Paul's became Toronto--St. Paul's), or its polls may be split among several
+new ridings, or merged with those of others.  A RidingMap records, for each
+old riding, the fraction of its votes that falls in each new riding.
+Transposing an election's results onto the new boundaries gives each new
+riding that fraction of each party's votes in each old riding, rounded so
+that no vote is lost or made up.
+
+The map is compiled once into index arrays, in the manner of a sparse matrix
+stored row by row: for old riding i, entries offsets[i] to offsets[i + 1] - 1
+give the new ridings it maps to and the weight of each.  Transposing an
+election then visits each entry once, adding a whole row of party votes at a
+time, rather than looking up each riding and party by name.
+
+Each party's votes in an old riding are shared among its new ridings by the
+largest remainder method: each new riding gets the whole part of its share,
+and the votes left over go one each to the new ridings with the largest
+fractional parts.  So each party keeps exactly its votes in each old riding
+whose weights add up to 1, and a party with any votes there keeps at least
+one of them.
+"""
+from array import array
+from datetime import date
+from operator import add
+from typing import Dict, Iterable, List, Tuple, TextIO
+
+from ingest import read_rows
+
+# The amount by which the weights of an old riding may add up to more than 1,
+# to allow for rounding in the files they are read from.
+_WEIGHT_TOLERANCE = 1e-9
+
+
+class RidingMap:
+    """A weighted, many-to-many map from the ridings in use before a
+    redistribution to those in use from its effective date.
+
+    Ridings not in the map are taken to be unchanged.
+
+    === Public Attributes ===
+    effective: the date from which the new ridings are in use.  Elections
+        held before it are on the old ridings.
+
+    === Private Attributes ===
+    _old_ids: maps each old riding in the map to its index.
+    _new: the new ridings in the map, in the order they were first given.
+    _offsets: the entries for old riding i are entries _offsets[i] to
+        _offsets[i + 1] - 1 of _targets and _weights.
+    _targets: for each entry, the index in _new of its new riding.
+    _weights: for each entry, the fraction of the old riding's votes that
+        fall in its new riding.
+
+    === Representation Invariants ===
+    - len(self._offsets) == len(self._old_ids) + 1 and self._offsets[0] == 0
+    - len(self._targets) == len(self._weights) == self._offsets[-1]
+    - every weight is > 0, and the weights of each old riding add up to at
+      most 1
+
+    === Sample Usage ===
+    >>> m = RidingMap(date(2004, 5, 15), {
+    ...     "St. Paul's": {"Toronto--St. Paul's": 1.0},
+    ...     'Old Riding': {'North': 0.25, 'South': 0.75}})
+    >>> m.transpose([('Old Riding', {'lib': 100, 'ndp': 40})],
+    ...             ['lib', 'ndp'])
+    {'North': {'lib': 25, 'ndp': 10}, 'South': {'lib': 75, 'ndp': 30}}
+    """
+    effective: date
+    _old_ids: Dict[str, int]
+    _new: List[str]
+    _offsets: array
+    _targets: array
+    _weights: array
+
+    def __init__(self, effective: date,
+                 mapping: Dict[str, Dict[str, float]]) -> None:
+        """Initialize a map, effective from <effective>, in which each old
+        riding in <mapping> maps to new ridings with the given weights.
+
+        Raise ValueError if a weight is not positive, or the weights of an
+        old riding add up to more than 1.
+        """
+        self.effective = effective
+        self._old_ids = {}
+        self._new = []
+        new_ids = {}
+        self._offsets = array('l', [0])
+        self._targets = array('l')
+        self._weights = array('d')
+        for old, targets in mapping.items():
+            if any(weight <= 0 for weight in targets.values()) or \
+                    sum(targets.values()) > 1 + _WEIGHT_TOLERANCE:
+                raise ValueError('bad weights for riding {!r}: {}'.format(
+                    old, targets))
+            self._old_ids[old] = len(self._old_ids)
+            for new, weight in targets.items():
+                if new not in new_ids:
+                    new_ids[new] = len(self._new)
+                    self._new.append(new)
+                self._targets.append(new_ids[new])
+                self._weights.append(weight)
+            self._offsets.append(len(self._targets))
+
+    @classmethod
+    def read(cls, effective: date, input_stream: TextIO) -> 'RidingMap':
+        """Return the map, effective from <effective>, in the csv file
+        <input_stream>.
+
+        After a header line, each line of the file holds an old riding, a
+        new riding, and the fraction of the old riding's votes that fall in
+        the new one.  If the fraction is left out, it is 1.
+
+        Raise ValueError as described in __init__, or if a fraction is not
+        a number.
+
+        >>> from io import StringIO
+        >>> m = RidingMap.read(date(2004, 5, 15), StringIO(
+        ...     'old,new,weight\\n"St. Paul\\'s","Toronto--St. Paul\\'s"\\n'))
+        >>> m.transpose([("St. Paul's", {'lib': 3})], ['lib'])
+        {"Toronto--St. Paul's": {'lib': 3}}
+        """
+        mapping = {}
+        for row in read_rows(input_stream):
+            if len(row) >= 2:
+                weight = float(row[2]) if len(row) > 2 and row[2] else 1.0
+                mapping.setdefault(row[0], {})[row[1]] = weight
+        return cls(effective, mapping)
+
+    def transpose(self, riding_results: Iterable[Tuple[str, Dict[str, int]]],
+                  parties: List[str]) -> Dict[str, Dict[str, int]]:
+        """Return the votes of each party in <parties> in each riding, when
+        <riding_results>, pairs of a riding on the old boundaries and the
+        votes of each party in it, are moved onto the new boundaries.
+
+        Each party's votes in an old riding are shared among its new ridings
+        by the largest remainder method, ties going to the new riding given
+        first, so that they add up to the party's votes there times the sum
+        of the old riding's weights, rounded.  A party is only included in a
+        riding if it has at least one vote there.  The ridings are in the
+        order in which they first receive votes.
+
+        >>> m = RidingMap(date(2004, 5, 15), {'r1': {'a': 0.5, 'b': 0.5}})
+        >>> m.transpose([('r1', {'lib': 5, 'ndp': 1})], ['lib', 'ndp'])
+        {'a': {'lib': 3, 'ndp': 1}, 'b': {'lib': 2}}
+        """
+        rows = {}
+        for riding, results in riding_results:
+            row = [results.get(party, 0) for party in parties]
+            i = self._old_ids.get(riding)
+            if i is None:
+                # An unchanged riding keeps all of its votes
+                _add_row(rows, riding, row)
+                continue
+            start, end = self._offsets[i], self._offsets[i + 1]
+            shares = _share_row(row, self._weights[start:end])
+            for k in range(start, end):
+                _add_row(rows, self._new[self._targets[k]], shares[k - start])
+
+        transposed = {}
+        for riding, row in rows.items():
+            votes = {parties[p]: row[p] for p in range(len(parties))
+                     if row[p] > 0}
+            if votes:
+                transposed[riding] = votes
+        return transposed
+
+
+def _share_row(row: List[int], weights: array) -> List[List[int]]:
+    """Return the votes in <row> shared among new ridings with the given
+    <weights> by the largest remainder method, as described in
+    RidingMap.transpose: the i-th row of the result holds the votes given to
+    the new riding with weight weights[i].
+
+    >>> _share_row([5, 1, 0], array('d', [0.5, 0.5]))
+    [[3, 1, 0], [2, 0, 0]]
+    >>> _share_row([501], array('d', [0.6, 0.4]))
+    [[301], [200]]
+    """
+    shares = [[0] * len(row) for _ in weights]
+    total_weight = sum(weights)
+    for p in range(len(row)):
+        if row[p] == 0:
+            continue
+        quotas = [row[p] * weight for weight in weights]
+        left = round(row[p] * total_weight)
+        remainders = []
+        for k in range(len(weights)):
+            shares[k][p] = int(quotas[k])
+            left -= shares[k][p]
+            remainders.append(quotas[k] - shares[k][p])
+        # sorted is stable, even in reverse, so equal remainders go to the
+        # earlier riding
+        by_remainder = sorted(range(len(weights)),
+                              key=remainders.__getitem__, reverse=True)
+        for k in by_remainder[:left]:
+            shares[k][p] += 1
+    return shares
+
+
+def _add_row(rows: Dict[str, List[int]], riding: str,
+             row: List[int]) -> None:
+    """Add <row> to the row of <riding> in <rows>, element by element."""
+    total = rows.get(riding)
+    rows[riding] = row if total is None else list(map(add, total, row))
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'array', 'datetime', 'operator', 'typing',
+            'ingest'
+        ]
+    })
+
+    import doctest
+    doctest.testmod()
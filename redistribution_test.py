@@ -0,0 +1,88 @@
+from datetime import date
+from io import StringIO
+
+import pytest
+
+from elections import ArrayElection, Election, Jurisdiction
+from redistribution import RidingMap
+
+# One row of the results in St. Paul's, before it became Toronto--St. Paul's.
+ST_PAULS = 'header\n' + ','.join([
+    '35090', '"St. Paul\'s"', '"St. Paul\'s"', '" 1"', '"Toronto"', 'N', 'N',
+    '""', '1', '367', '"Bennett"', '""', '"Carolyn"', '"Liberal"',
+    '"Liberal"', 'Y', 'Y', '113'])
+
+
+def test_many_to_many_keeps_votes() -> None:
+    """Test that splitting and merging ridings keeps every vote, and leaves
+    ridings not in the map alone."""
+    m = RidingMap.read(date(2015, 10, 19), StringIO(
+        'old,new,weight\n'
+        'A,North,0.6\n'
+        'A,South,0.4\n'
+        'B,South,1\n'
+        '"C, East",East\n'))
+    for kind in [Election, ArrayElection]:
+        e = kind(date(2011, 5, 2))
+        for riding, party, votes in [('A', 'lib', 1000), ('A', 'ndp', 501),
+                                     ('B', 'lib', 10), ('B', 'pc', 300),
+                                     ('C, East', 'pc', 7), ('D', 'ndp', 9)]:
+            e.update_results(riding, party, votes)
+        moved = e.transposed(m)
+        assert type(moved) is kind
+        assert moved.ridings_recorded() == ['North', 'South', 'East', 'D']
+        assert moved.results_for('North', 'lib') == 600
+        assert moved.results_for('South', 'lib') == 410
+        assert moved.results_for('South', 'pc') == 300
+        assert moved.results_for('East', 'pc') == 7
+        assert moved.results_for('D', 'ndp') == 9
+        assert moved.popular_vote() == e.popular_vote()
+        assert moved.party_seats() == {'lib': 2, 'ndp': 1, 'pc': 1}
+
+
+def test_split_keeps_popular_vote() -> None:
+    """Test that rounding the votes of split ridings neither loses nor makes
+    up votes, and keeps parties with a single vote."""
+    m = RidingMap(date(2015, 10, 19), {
+        'r1': {'a': 0.5, 'b': 0.5},
+        'r2': {'a': 1 / 3, 'b': 1 / 3, 'c': 1 / 3}})
+    for kind in [Election, ArrayElection]:
+        e = kind(date(2011, 5, 2))
+        for riding, party, votes in [('r1', 'lib', 5), ('r1', 'ndp', 1),
+                                     ('r2', 'lib', 7), ('r2', 'pc', 2),
+                                     ('r2', 'ndp', 1)]:
+            e.update_results(riding, party, votes)
+        moved = e.transposed(m)
+        assert moved.popular_vote() == e.popular_vote()
+        assert moved.results_for('a', 'lib') == 3 + 3
+        assert moved.results_for('b', 'lib') == 2 + 2
+        assert moved.results_for('c', 'lib') == 2
+        assert moved.results_for('a', 'ndp') == 2
+
+
+def test_bad_weights() -> None:
+    """Test that weights that are not positive, or that give away more than
+    all of a riding's votes, are refused."""
+    with pytest.raises(ValueError):
+        RidingMap(date(2015, 10, 19), {'A': {'North': 0.7, 'South': 0.4}})
+    with pytest.raises(ValueError):
+        RidingMap(date(2015, 10, 19), {'A': {'North': 0.0}})
+
+
+def test_jurisdiction_comparisons_across_redistribution() -> None:
+    """Test that comparisons line up ridings across a redistribution once
+    its map is added, and that riding_changes still shows the raw names."""
+    j = Jurisdiction('Canada')
+    j.read_results(2000, 1, 2, StringIO(ST_PAULS))
+    with open('data/toronto-stpauls.csv', encoding='utf-8') as file:
+        j.read_results(2004, 5, 15, file)
+    first, second = date(2000, 1, 2), date(2004, 5, 15)
+    assert j.share_changes(first, second) == {}
+
+    j.add_riding_map(RidingMap(second, {
+        "St. Paul's": {"Toronto--St. Paul's": 1.0}}))
+    changes = j.share_changes(first, second, 'Liberal')
+    assert list(changes) == ["Toronto--St. Paul's"]
+    assert -1.0 < changes["Toronto--St. Paul's"] < 0.0
+    assert j.riding_changes() == [({"St. Paul's"}, {"Toronto--St. Paul's"})]
+    assert j.aligned([first]).ridings == ["St. Paul's"]
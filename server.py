@@ -0,0 +1,428 @@
+"""A local HTTP server answering queries on a Jurisdiction held in memory.
+
+The jurisdiction is read once, from csv files or a snapshot written by
+Jurisdiction.save, and its queries are answered as JSON:
+
+    python server.py --election 2015-10-19 data/*.csv --port 8000
+    curl 'http://127.0.0.1:8000/party_history?party=Liberal'
+
+    /elections                          the dates of the elections
+    /popular_vote?date=D                Election.popular_vote
+    /party_seats?date=D                 Election.party_seats
+    /riding_winners?date=D[&riding=R]   Election.riding_winners, of every
+                                        riding if no riding is given
+    /party_history?party=P[&start=D][&end=D]
+    /party_wins?party=P[&start=D][&end=D]
+    /riding_changes                     Jurisdiction.riding_changes
+    /stats                              request counts and latencies
+
+Dates are written YYYY-MM-DD.  The answer to every query without a start or
+end is computed when the server starts; others are computed on first request
+and kept.  Each answer has an ETag made from the version of the data it was
+computed from, so a client sending If-None-Match gets 304 Not Modified until
+the data changes.  Requests are handled by a thread each; queries on the
+jurisdiction itself are made one at a time, since its caches are not
+thread-safe, but answers already computed are served without waiting for
+a query in progress.
+
+The server only listens on 127.0.0.1 by default.  Run with no arguments,
+this module is checked with python_ta and its doctests are run instead.
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from elections import Jurisdiction
+from instrument import percentiles
+
+# The most answers kept, so that queries with many different start and end
+# dates cannot use up memory.  Once there are this many, the oldest is dropped
+# to make room for each new one.
+MAX_RESPONSES = 10000
+
+# The number of most recent latencies kept for each endpoint.
+LATENCY_SAMPLES = 1000
+
+# The endpoints answered from the jurisdiction, as opposed to /stats.
+QUERIES = ['/elections', '/popular_vote', '/party_seats', '/riding_winners',
+           '/party_history', '/party_wins', '/riding_changes']
+
+
+class QueryService:
+    """Answers queries on a jurisdiction as JSON, keeping the answers.
+
+    === Private Attributes ===
+    _jurisdiction: the jurisdiction queried.
+    _lock: held while the jurisdiction is queried.
+    _responses_lock: held while self._responses or self._version is read or
+        changed.  It is never held while an answer is computed.
+    _stats_lock: held while the request counts and latencies are updated or
+        read.
+    _instance: a string unique to this service, so that ETags handed out by
+        an earlier run of the server are not taken for its own.
+    _version: the data_version of the jurisdiction that the answers in
+        self._responses were computed from.
+    _responses: maps the canonical form of each query answered to its ETag
+        and JSON body, oldest first.
+    _latencies: maps each endpoint to the seconds taken by its most recent
+        requests.
+    _requests: maps each endpoint to the number of requests made of it.
+    _counts: the number of answers served from self._responses, computed,
+        and not sent because the client had them already.
+    _started: the time.monotonic() time at which this service started.
+
+    === Representation Invariants ===
+    - len(self._responses) <= MAX_RESPONSES
+    """
+    _jurisdiction: Jurisdiction
+    _lock: threading.Lock
+    _responses_lock: threading.Lock
+    _stats_lock: threading.Lock
+    _instance: str
+    _version: int
+    _responses: OrderedDict
+    _latencies: Dict[str, deque]
+    _requests: Dict[str, int]
+    _counts: Dict[str, int]
+    _started: float
+
+    def __init__(self, jurisdiction: Jurisdiction) -> None:
+        """Initialize a service answering queries on <jurisdiction>."""
+        self._jurisdiction = jurisdiction
+        self._lock = threading.Lock()
+        self._responses_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._instance = uuid.uuid4().hex
+        self._version = jurisdiction.data_version()
+        self._responses = OrderedDict()
+        self._latencies = {}
+        self._requests = {}
+        self._counts = {'cached': 0, 'computed': 0, 'not_modified': 0}
+        self._started = time.monotonic()
+
+    def precompute(self) -> int:
+        """Compute and keep the answer to every query that has no start or
+        end date, and return the number of answers kept.
+        """
+        queries = [('/elections', {}), ('/riding_changes', {})]
+        for d in self._jurisdiction.election_dates():
+            for path in ['/popular_vote', '/party_seats', '/riding_winners']:
+                queries.append((path, {'date': d.isoformat()}))
+        for party in self._jurisdiction.parties():
+            queries.append(('/party_history', {'party': party}))
+            queries.append(('/party_wins', {'party': party}))
+
+        for path, params in queries:
+            self._answer(path, params)
+        with self._responses_lock:
+            return len(self._responses)
+
+    def respond(self, path: str, params: Dict[str, str],
+                if_none_match: Optional[str]
+                ) -> Tuple[int, Dict[str, str], bytes]:
+        """Return the status, headers and body of the answer to the query
+        <path> with <params>.  If <if_none_match> is the ETag of the answer,
+        the status is 304 and the body is empty.
+        """
+        start = time.perf_counter()
+        try:
+            if path == '/stats':
+                return 200, {'Cache-Control': 'no-store'}, \
+                    _to_json(self.stats())
+            if path not in QUERIES:
+                return _error(404, 'no such query: ' + path)
+            try:
+                etag, body = self._answer(path, params)
+            except KeyError as error:
+                return _error(404, 'not found: {}'.format(error))
+            except ValueError as error:
+                return _error(400, str(error))
+            headers = {'ETag': etag}
+            if if_none_match is not None and \
+                    etag in [tag.strip() for tag in if_none_match.split(',')]:
+                self._count('not_modified')
+                return 304, headers, b''
+            return 200, headers, body
+        finally:
+            self._record(path, time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of requests made of this service, the rate at
+        which they were made, and the latency percentiles of each endpoint,
+        in milliseconds, over its most recent requests.
+        """
+        uptime = time.monotonic() - self._started
+        with self._stats_lock:
+            requests = dict(self._requests)
+            latencies = {path: list(self._latencies[path])
+                         for path in requests}
+            counts = dict(self._counts)
+        with self._responses_lock:
+            kept, version = len(self._responses), self._version
+        total = sum(requests.values())
+        endpoints = {}
+        for path in sorted(requests):
+            endpoints[path] = {'requests': requests[path],
+                               'latency_ms': percentiles(latencies[path])}
+        return {'uptime_seconds': round(uptime, 3), 'requests': total,
+                'requests_per_sec': round(total / uptime, 3)
+                if uptime > 0 else 0.0,
+                'responses_kept': kept, 'data_version': version,
+                'answers': counts, 'endpoints': endpoints}
+
+    def _answer(self, path: str, params: Dict[str, str]) -> Tuple[str, bytes]:
+        """Return the ETag and JSON body of the answer to the query <path>
+        with <params>, computing it if it is not kept already.
+
+        Raise KeyError if it names an election or riding that does not
+        exist, and ValueError if its parameters are malformed.
+        """
+        key = path + '?' + urlencode(sorted(params.items()))
+        # Looking up the data version may bring the jurisdiction's index up
+        # to date, so only a version known without that is checked here.
+        # The version and the answer are read under one lock, so an answer
+        # is only served while it is of the data version it was computed
+        # from.
+        known = self._jurisdiction.known_data_version()
+        with self._responses_lock:
+            kept = self._responses.get(key) if known == self._version \
+                else None
+        if kept is not None:
+            self._count('cached')
+            return kept
+
+        with self._lock:
+            version = self._jurisdiction.data_version()
+            with self._responses_lock:
+                if version != self._version:
+                    self._responses.clear()
+                    self._version = version
+                # Another thread may have computed it while this one waited
+                kept = self._responses.get(key)
+            if kept is not None:
+                self._count('cached')
+                return kept
+            value = self._compute(path, params)
+            tag = '{}:{}:{}'.format(self._instance, version, key)
+            etag = '"{}"'.format(
+                hashlib.sha1(tag.encode('utf-8')).hexdigest()[:20])
+            answer = (etag, _to_json(value))
+            with self._responses_lock:
+                self._responses[key] = answer
+                if len(self._responses) > MAX_RESPONSES:
+                    self._responses.popitem(last=False)
+            self._count('computed')
+            return answer
+
+    def _compute(self, path: str, params: Dict[str, str]) -> Any:
+        """Return the answer to the query <path> with <params>, as a value
+        that can be written as JSON.
+        """
+        j = self._jurisdiction
+        if path == '/elections':
+            return [d.isoformat() for d in j.election_dates()]
+        if path == '/riding_changes':
+            dates = j.election_dates()
+            changes = j.riding_changes()
+            return [{'from': dates[i].isoformat(),
+                     'to': dates[i + 1].isoformat(),
+                     'removed': sorted(changes[i][0]),
+                     'added': sorted(changes[i][1])}
+                    for i in range(len(changes))]
+        if path in ['/party_history', '/party_wins']:
+            party = _required(params, 'party')
+            start = _date_param(params, 'start')
+            end = _date_param(params, 'end')
+            if path == '/party_wins':
+                return [d.isoformat() for d in j.party_wins(party, start, end)]
+            history = j.party_history(party, start, end)
+            return {d.isoformat(): history[d] for d in history}
+
+        election = j.election(_date_param(params, 'date', True))
+        if path == '/popular_vote':
+            return election.popular_vote()
+        if path == '/party_seats':
+            return election.party_seats()
+        riding = params.get('riding')
+        if riding is not None:
+            if riding not in election.ridings_recorded():
+                raise KeyError(riding)
+            return election.riding_winners(riding)
+        return election.summary()[2]
+
+    def _record(self, path: str, seconds: float) -> None:
+        """Record that a request of <path> took <seconds>."""
+        endpoint = path if path in QUERIES or path == '/stats' else 'other'
+        with self._stats_lock:
+            if endpoint not in self._latencies:
+                self._latencies[endpoint] = deque(maxlen=LATENCY_SAMPLES)
+                self._requests[endpoint] = 0
+            self._latencies[endpoint].append(seconds)
+            self._requests[endpoint] += 1
+
+    def _count(self, kind: str) -> None:
+        """Count one more answer of <kind> in self._counts."""
+        with self._stats_lock:
+            self._counts[kind] += 1
+
+
+def _required(params: Dict[str, str], name: str) -> str:
+    """Return the parameter <name> in <params>.  Raise ValueError if there is
+    none.
+    """
+    if name not in params:
+        raise ValueError('missing parameter: ' + name)
+    return params[name]
+
+
+def _date_param(params: Dict[str, str], name: str,
+                required: bool = False) -> Optional[date]:
+    """Return the date in the parameter <name> of <params>, or None if there
+    is none and it is not <required>.  Raise ValueError if it is not a date,
+    or it is required and missing.
+
+    >>> _date_param({'start': '2015-10-19'}, 'start')
+    datetime.date(2015, 10, 19)
+    >>> _date_param({}, 'end') is None
+    True
+    """
+    if name not in params and not required:
+        return None
+    return date.fromisoformat(_required(params, name))
+
+
+def _to_json(value: Any) -> bytes:
+    """Return <value> written as JSON, in utf-8."""
+    return json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+def _error(status: int, message: str) -> Tuple[int, Dict[str, str], bytes]:
+    """Return the status, headers and body of an error response."""
+    return status, {}, _to_json({'error': message})
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Handles a request made of a QueryServer."""
+    server: 'QueryServer'
+
+    def do_GET(self) -> None:
+        """Answer a GET request."""
+        url = urlsplit(self.path)
+        status, headers, body = self.server.service.respond(
+            url.path, dict(parse_qsl(url.query)),
+            self.headers.get('If-None-Match'))
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        for name in headers:
+            self.send_header(name, headers[name])
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Log a request only if the server is verbose."""
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+class QueryServer(ThreadingHTTPServer):
+    """An HTTP server answering queries with a QueryService, one thread per
+    request.
+
+    === Public Attributes ===
+    service: the service answering queries.
+    verbose: whether each request is logged.
+    """
+    service: QueryService
+    verbose: bool
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: QueryService,
+                 verbose: bool = False) -> None:
+        """Initialize a server listening on <address> and answering queries
+        with <service>.
+        """
+        ThreadingHTTPServer.__init__(self, address, QueryHandler)
+        self.service = service
+        self.verbose = verbose
+
+
+def load_jurisdiction(name: str, elections: List[List[str]],
+                      snapshot: Optional[str] = None,
+                      columnar: bool = False) -> Jurisdiction:
+    """Return a jurisdiction called <name>, loaded from the snapshot file at
+    <snapshot> if it is given, holding the results in <elections>: lists of
+    a date in the form YYYY-MM-DD followed by the paths of the csv files of
+    the election held on that date.
+    """
+    if snapshot is not None:
+        jurisdiction = Jurisdiction.load(snapshot, columnar)
+    else:
+        jurisdiction = Jurisdiction(name, columnar)
+    for election in elections:
+        d = date.fromisoformat(election[0])
+        jurisdiction.read_many(d.year, d.month, d.day, election[1:])
+    return jurisdiction
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Load a jurisdiction and answer queries on it until interrupted, as
+    described by the command line arguments <argv>.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--election', nargs='+', action='append', default=[],
+                        metavar=('DATE', 'PATH'),
+                        help='the date of an election and its csv files')
+    parser.add_argument('--snapshot', help='a snapshot to load first')
+    parser.add_argument('--name', default='Canada')
+    parser.add_argument('--columnar', action='store_true')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    jurisdiction = load_jurisdiction(args.name, args.election, args.snapshot,
+                                     args.columnar)
+    service = QueryService(jurisdiction)
+    start = time.perf_counter()
+    kept = service.precompute()
+    print('computed {} answers in {:.3f} s'.format(
+        kept, time.perf_counter() - start))
+
+    server = QueryServer((args.host, args.port), service, args.verbose)
+    print('listening on http://{}:{}/'.format(*server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main()
+    else:
+        import python_ta
+        python_ta.check_all(config={
+            'allowed-io': ['QueryHandler.do_GET', 'main'],
+            'allowed-import-modules': [
+                'doctest', 'python_ta', 'argparse', 'collections', 'datetime',
+                'hashlib', 'http.server', 'json', 'sys', 'threading', 'time',
+                'typing', 'urllib.parse', 'uuid', 'elections', 'instrument'
+            ],
+            'max-attributes': 15
+        })
+
+        import doctest
+        doctest.testmod()
@@ -0,0 +1,128 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from typing import Dict, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+from elections import Jurisdiction
+import server
+from server import QueryServer, QueryService, load_jurisdiction
+
+
+def get(server: QueryServer, path: str, etag: Optional[str] = None
+        ) -> Tuple[int, Dict[str, str], bytes]:
+    """Return the status, headers and body of a GET of <path> on <server>,
+    sending <etag> in If-None-Match if it is given."""
+    host, port = server.server_address[:2]
+    request = Request('http://{}:{}{}'.format(host, port, path))
+    if etag is not None:
+        request.add_header('If-None-Match', etag)
+    try:
+        with urlopen(request) as response:
+            return response.status, dict(response.headers), response.read()
+    except HTTPError as error:
+        return error.code, dict(error.headers), error.read()
+
+
+def start_server(jurisdiction: Jurisdiction) -> QueryServer:
+    """Return a server on a free local port, answering queries on
+    <jurisdiction> in a background thread."""
+    service = QueryService(jurisdiction)
+    service.precompute()
+    server = QueryServer(('127.0.0.1', 0), service)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_queries_and_conditional_requests() -> None:
+    """Test the answers to each query, and that an answer the client already
+    has is not sent again until the data changes."""
+    j = load_jurisdiction('Canada', [['2015-10-19', 'data/nunavut.csv',
+                                      'data/labrador.csv']])
+    server = start_server(j)
+    try:
+        status, headers, body = get(server, '/elections')
+        assert status == 200
+        assert json.loads(body) == ['2015-10-19']
+
+        status, headers, body = get(server, '/party_seats?date=2015-10-19')
+        assert json.loads(body) == j.election(j.election_dates()[0]) \
+            .party_seats()
+        status, _, body = get(server, '/riding_winners?date=2015-10-19'
+                                      '&riding=Nunavut')
+        assert json.loads(body) == ['Liberal']
+        status, _, body = get(server, '/party_history?party=Liberal')
+        assert list(json.loads(body)) == ['2015-10-19']
+
+        path = '/party_wins?party=' + quote('Liberal')
+        status, headers, body = get(server, path)
+        etag = headers['ETag']
+        assert json.loads(body) == ['2015-10-19']
+        status, _, body = get(server, path, etag)
+        assert status == 304 and body == b''
+
+        j.read_results(2019, 10, 21, StringIO(
+            'header\n,Nunavut,,,,,,,,,,,,NDP-New Democratic Party,,,,9\n'))
+        status, headers, body = get(server, path, etag)
+        assert status == 200
+        assert headers['ETag'] != etag
+        status, _, body = get(server, '/riding_changes')
+        assert json.loads(body) == [{'from': '2015-10-19', 'to': '2019-10-21',
+                                     'removed': ['Labrador'], 'added': []}]
+
+        assert get(server, '/party_seats?date=2000-01-01')[0] == 404
+        assert get(server, '/party_seats?date=tomorrow')[0] == 400
+        assert get(server, '/party_wins')[0] == 400
+        assert get(server, '/no_such_query')[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_concurrent_requests_and_stats() -> None:
+    """Test that concurrent requests all get the same answer, and that the
+    stats endpoint counts them."""
+    j = load_jurisdiction('Canada', [['2015-10-19',
+                                      'data/parkdale-highpark.csv']])
+    server = start_server(j)
+    try:
+        paths = ['/party_history?party=Liberal&start=2015-01-01',
+                 '/popular_vote?date=2015-10-19'] * 20
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda p: get(server, p), paths))
+        assert all(status == 200 for status, _, _ in results)
+        assert len({body for _, _, body in results}) == 2
+
+        stats = json.loads(get(server, '/stats')[2])
+        assert stats['endpoints']['/popular_vote']['requests'] == 20
+        assert stats['endpoints']['/party_history']['requests'] == 20
+        assert stats['answers']['cached'] >= 39
+        assert stats['requests_per_sec'] > 0
+        assert stats['endpoints']['/popular_vote']['latency_ms']['p99'] >= 0
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_full_table_evicts_oldest(monkeypatch) -> None:
+    """Test that once the table of answers is full, each new answer is kept
+    in place of the oldest, rather than being computed again every time."""
+    monkeypatch.setattr(server, 'MAX_RESPONSES', 2)
+    service = QueryService(load_jurisdiction(
+        'Canada', [['2015-10-19', 'data/nunavut.csv']]))
+    paths = ['/party_wins', '/party_history', '/party_seats']
+    params = [{'party': 'Liberal'}, {'party': 'Liberal'},
+              {'date': '2015-10-19'}]
+    for path, query in zip(paths, params):
+        assert service.respond(path, query, None)[0] == 200
+    assert service.stats()['responses_kept'] == 2
+
+    service.respond(paths[2], params[2], None)
+    service.respond(paths[1], params[1], None)
+    assert service.stats()['answers'] == {'cached': 2, 'computed': 3,
+                                          'not_modified': 0}
+    service.respond(paths[0], params[0], None)
+    assert service.stats()['answers']['computed'] == 4
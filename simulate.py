@@ -0,0 +1,330 @@
+"""What-if seat simulations on the results of an election.
+
+A SeatSimulator takes the vote share of each party in each riding of an
+election, and works out the seats each party would win if those shares were
+changed by a swing: "what if the Liberal vote drops 3 points everywhere" is
+the swing {'Liberal': -0.03}.  Swings are uniform, so a party's share moves
+by the same amount in every riding, and a party only wins ridings in which it
+had votes recorded.  Monte Carlo runs draw the national swing of each party,
+and optionally a separate perturbation of each party in each riding, from
+normal distributions.
+
+Scenarios are run in batches.  Within a batch, a riding whose leader is ahead
+of every other party by more than any swing in the batch could close is
+counted once for the whole batch, and only the other ridings are looked at
+scenario by scenario.  Batches can be run in parallel by several processes.
+Each batch draws its random numbers from its own seed, made from the seed of
+the run and the batch's number, so a run gives the same results however many
+processes it is spread over.
+"""
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from operator import add
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from elections import Election
+
+# The number of scenarios in each batch handed to a worker process.
+DEFAULT_BATCH_SIZE = 1000
+
+# The vote share of a party in a riding in which it had no votes recorded, so
+# that no swing can make it win there.
+_NO_CANDIDATE = float('-inf')
+
+
+class SimulationResult:
+    """The seats won by each party in each scenario of a simulation.
+
+    === Public Attributes ===
+    parties: the parties recorded in the simulated election, in order.
+    ridings: the number of ridings in the simulated election.
+    scenarios: the number of scenarios simulated.
+    seats: maps each party to the number of seats it won in each scenario,
+        in the order the scenarios were run.
+
+    === Representation Invariants ===
+    - len(self.seats[p]) == self.scenarios for every party p in self.parties
+    - In each scenario, the seats of all parties add up to at most
+      self.ridings; ridings that were tied are not counted for any party.
+    """
+    parties: List[str]
+    ridings: int
+    scenarios: int
+    seats: Dict[str, array]
+
+    def __init__(self, parties: List[str], ridings: int,
+                 seats: Dict[str, array]) -> None:
+        """Initialize the result of a simulation of an election with
+        <parties> and <ridings> ridings, in which each party won <seats>.
+        """
+        self.parties = parties
+        self.ridings = ridings
+        self.scenarios = len(seats[parties[0]]) if parties else 0
+        self.seats = seats
+
+    def mean_seats(self) -> Dict[str, float]:
+        """Return the mean number of seats won by each party.
+
+        >>> r = SimulationResult(['a', 'b'], 3, {'a': array('l', [2, 1]),
+        ...                                      'b': array('l', [1, 2])})
+        >>> r.mean_seats() == {'a': 1.5, 'b': 1.5}
+        True
+        """
+        if self.scenarios == 0:
+            return {party: 0.0 for party in self.parties}
+        return {party: sum(self.seats[party]) / self.scenarios
+                for party in self.parties}
+
+    def seat_distribution(self, party: str) -> Dict[int, int]:
+        """Return the number of scenarios in which <party> won each number of
+        seats, in increasing order of seats.
+
+        >>> r = SimulationResult(['a'], 3, {'a': array('l', [2, 1, 2])})
+        >>> r.seat_distribution('a')
+        {1: 1, 2: 2}
+        """
+        counts = {}
+        for seats in sorted(self.seats[party]):
+            counts[seats] = counts.get(seats, 0) + 1
+        return counts
+
+    def win_probabilities(self) -> Dict[str, float]:
+        """Return, for each party, the fraction of scenarios in which it won
+        the most seats.  As in Election.election_winners, every party tied
+        for the most seats is counted as winning.
+
+        >>> r = SimulationResult(['a', 'b'], 3, {'a': array('l', [2, 1]),
+        ...                                      'b': array('l', [1, 1])})
+        >>> r.win_probabilities() == {'a': 1.0, 'b': 0.5}
+        True
+        """
+        wins = dict.fromkeys(self.parties, 0)
+        columns = [self.seats[party] for party in self.parties]
+        for scenario in zip(*columns):
+            most = max(scenario)
+            for p in range(len(scenario)):
+                if scenario[p] == most:
+                    wins[self.parties[p]] += 1
+        return {party: wins[party] / self.scenarios if self.scenarios else 0.0
+                for party in self.parties}
+
+    def majority_probabilities(self) -> Dict[str, float]:
+        """Return, for each party, the fraction of scenarios in which it won
+        more than half of the ridings.
+
+        >>> r = SimulationResult(['a', 'b'], 3, {'a': array('l', [2, 1]),
+        ...                                      'b': array('l', [1, 1])})
+        >>> r.majority_probabilities() == {'a': 0.5, 'b': 0.0}
+        True
+        """
+        if self.scenarios == 0:
+            return {party: 0.0 for party in self.parties}
+        return {party: sum(1 for seats in self.seats[party]
+                           if 2 * seats > self.ridings) / self.scenarios
+                for party in self.parties}
+
+
+class SeatSimulator:
+    """Simulates the seats won by each party in an election under changes to
+    their vote shares.
+
+    === Private Attributes ===
+    _parties: the parties recorded in the election, in order.
+    _rows: for each riding recorded in the election, the fraction of its
+        votes earned by each party, in the order of self._parties.  A party
+        with no votes recorded in a riding has a share of -inf there.
+
+    === Representation Invariants ===
+    - len(row) == len(self._parties) for every row in self._rows
+
+    === Sample Usage ===
+    >>> from datetime import date
+    >>> e = Election(date(2000, 2, 8))
+    >>> e.update_results('r1', 'lib', 45)
+    >>> e.update_results('r1', 'pc', 55)
+    >>> e.update_results('r2', 'lib', 60)
+    >>> e.update_results('r2', 'pc', 40)
+    >>> sim = SeatSimulator(e)
+    >>> result = sim.uniform_swing([{}, {'lib': 0.06, 'pc': -0.06}])
+    >>> list(result.seats['lib'])
+    [1, 2]
+    """
+    _parties: List[str]
+    _rows: List[Tuple[float, ...]]
+
+    def __init__(self, election: Election) -> None:
+        """Initialize a simulator of the results recorded in <election>."""
+        self._parties = election.parties_recorded()
+        self._rows = []
+        for _, results in election.riding_results():
+            total = sum(results.values())
+            self._rows.append(tuple(
+                results[party] / total if results.get(party) else _NO_CANDIDATE
+                for party in self._parties))
+
+    def uniform_swing(self, swings: Sequence[Dict[str, float]],
+                      workers: Optional[int] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE
+                      ) -> SimulationResult:
+        """Return the seats won by each party under each of <swings>.
+
+        Each swing maps parties to the amount added to their share of the
+        vote in every riding; a party not in a swing keeps its shares.  The
+        swings are run in batches of <batch_size>, by up to <workers>
+        processes (one per CPU if <workers> is None).
+
+        Raise ValueError if a swing names a party with no votes recorded in
+        the election.
+        """
+        vectors = [self._swing_vector(swing) for swing in swings]
+        return self._run(vectors, 0.0, 0, workers, batch_size)
+
+    def monte_carlo(self, scenarios: int,
+                    swing: Optional[Dict[str, float]] = None,
+                    national_sd: float = 0.02, riding_sd: float = 0.0,
+                    seed: int = 0, workers: Optional[int] = None,
+                    batch_size: int = DEFAULT_BATCH_SIZE) -> SimulationResult:
+        """Return the seats won by each party in <scenarios> random
+        scenarios.
+
+        In each scenario, each party's share of the vote in every riding
+        changes by a national swing drawn from a normal distribution with mean
+        <swing>[party] (0 for a party not in <swing>) and standard deviation
+        <national_sd>.  If <riding_sd> is positive, each party's share in each
+        riding is also perturbed by a separate draw from a normal distribution
+        with mean 0 and standard deviation <riding_sd>.
+
+        The same <seed> always gives the same results, whatever <workers> is.
+        The scenarios are run as in uniform_swing.
+
+        Raise ValueError if <swing> names a party with no votes recorded in
+        the election.
+        """
+        means = self._swing_vector({} if swing is None else swing)
+        rng = random.Random(seed)
+        vectors = []
+        for _ in range(scenarios):
+            if national_sd > 0:
+                vectors.append([rng.gauss(mean, national_sd)
+                                for mean in means])
+            else:
+                vectors.append(means)
+        return self._run(vectors, riding_sd, seed, workers, batch_size)
+
+    def _swing_vector(self, swing: Dict[str, float]) -> List[float]:
+        """Return <swing> as a list of swings in the order of self._parties.
+
+        Raise ValueError if <swing> names a party not in self._parties.
+        """
+        for party in swing:
+            if party not in self._parties:
+                raise ValueError('no votes recorded for {!r}'.format(party))
+        return [swing.get(party, 0.0) for party in self._parties]
+
+    def _run(self, vectors: List[List[float]], riding_sd: float, seed: int,
+             workers: Optional[int], batch_size: int) -> SimulationResult:
+        """Return the seats won by each party under each of the swings in
+        <vectors>, with each riding perturbed as described in monte_carlo,
+        run in batches of <batch_size> by up to <workers> processes.
+        """
+        batches = [vectors[i:i + batch_size]
+                   for i in range(0, len(vectors), batch_size)]
+        seeds = ['{}/{}'.format(seed, i) for i in range(len(batches))]
+        seats = [array('l') for _ in self._parties]
+
+        if workers == 1 or len(batches) <= 1:
+            counted = map(_count_seats, repeat(self._rows), batches,
+                          repeat(riding_sd), seeds)
+            for batch_seats in counted:
+                for p in range(len(seats)):
+                    seats[p].extend(batch_seats[p])
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for batch_seats in executor.map(_count_seats,
+                                                repeat(self._rows), batches,
+                                                repeat(riding_sd), seeds):
+                    for p in range(len(seats)):
+                        seats[p].extend(batch_seats[p])
+
+        return SimulationResult(self._parties.copy(), len(self._rows),
+                                dict(zip(self._parties, seats)))
+
+
+def _count_seats(rows: List[Tuple[float, ...]], swings: List[List[float]],
+                 riding_sd: float, seed: str) -> List[array]:
+    """Return, for each party, the number of seats it won under each of
+    <swings>, when its shares of the vote are <rows>.  If <riding_sd> is
+    positive, each share is also perturbed, using random numbers drawn from
+    <seed>.  A riding that is tied is not counted for any party.
+
+    This is run by the worker processes of SeatSimulator.
+
+    >>> rows = [(0.5, 0.4), (0.3, 0.7), (0.45, 0.55)]
+    >>> [list(s) for s in _count_seats(rows, [[0, 0], [0.1, -0.1]], 0, '0')]
+    [[1, 2], [2, 1]]
+    """
+    n_parties = len(rows[0]) if rows else 0
+    seats = [array('l', [0]) * len(swings) for _ in range(n_parties)]
+    if not swings:
+        return seats
+
+    if riding_sd > 0:
+        contested = rows
+    else:
+        contested = []
+        highest = [max(column) for column in zip(*swings)]
+        lowest = [min(column) for column in zip(*swings)]
+        for row in rows:
+            leader = _safe_leader(row, highest, lowest)
+            if leader is None:
+                contested.append(row)
+            else:
+                column = seats[leader]
+                for s in range(len(swings)):
+                    column[s] += 1
+
+    gauss = random.Random(seed).gauss
+    for s in range(len(swings)):
+        swing = swings[s]
+        for row in contested:
+            values = list(map(add, row, swing))
+            if riding_sd > 0:
+                values = [value + gauss(0.0, riding_sd) for value in values]
+            best = max(values)
+            if values.count(best) == 1:
+                seats[values.index(best)][s] += 1
+    return seats
+
+
+def _safe_leader(row: Tuple[float, ...], highest: List[float],
+                 lowest: List[float]) -> Optional[int]:
+    """Return the index of the party that wins the riding whose shares are
+    <row> under every swing between <lowest> and <highest>, or None if
+    there is no such party.
+
+    >>> _safe_leader((0.6, 0.4), [0.05, 0.05], [-0.05, -0.05])
+    0
+    >>> _safe_leader((0.52, 0.48), [0.05, 0.05], [-0.05, -0.05]) is None
+    True
+    """
+    leader = row.index(max(row))
+    worst = row[leader] + lowest[leader]
+    for p in range(len(row)):
+        if p != leader and row[p] + highest[p] >= worst:
+            return None
+    return leader
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'array', 'concurrent.futures',
+            'itertools', 'operator', 'random', 'typing', 'elections'
+        ]
+    })
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,78 @@
+from datetime import date
+from io import StringIO
+
+import pytest
+
+from elections import ArrayElection, Election
+from generate_data import write_election
+from simulate import SeatSimulator
+
+
+def generated_election(kind: type = Election) -> Election:
+    """Return an election of class <kind> read from a small generated file."""
+    output = StringIO()
+    write_election(output, 40, 5, 6, seed=3)
+    e = kind(date(2000, 10, 19))
+    e.read_results(StringIO(output.getvalue()))
+    return e
+
+
+def brute_force_seats(e: Election, swing: dict) -> dict:
+    """Return the seats won by each party in <e> when <swing> is added to
+    its share of the vote in every riding, worked out one riding at a time."""
+    seats = dict.fromkeys(e._parties, 0)
+    for _, results in e.riding_results():
+        total = sum(results.values())
+        shares = {party: votes / total + swing.get(party, 0.0)
+                  for party, votes in results.items()}
+        best = max(shares.values())
+        winners = [party for party in shares if shares[party] == best]
+        if len(winners) == 1:
+            seats[winners[0]] += 1
+    return seats
+
+
+def test_no_swing_matches_party_seats() -> None:
+    """Test that a swing of zero gives the seats the election gave, for
+    both kinds of election."""
+    for kind in [Election, ArrayElection]:
+        e = generated_election(kind)
+        with open('data/parkdale-highpark.csv', encoding='utf-8') as file:
+            e.read_results(file)
+        result = SeatSimulator(e).uniform_swing([{}], workers=1)
+        assert {p: result.seats[p][0] for p in result.parties} == \
+            e.party_seats()
+        assert result.win_probabilities()[e.election_winners()[0]] == 1.0
+
+
+def test_uniform_swing_matches_brute_force() -> None:
+    """Test that ridings counted once for a whole batch are counted as if
+    each swing were applied on its own."""
+    e = generated_election()
+    swings = [{'Liberal': x / 100, 'Conservative': -x / 200}
+              for x in range(-10, 11)]
+    result = SeatSimulator(e).uniform_swing(swings, workers=1, batch_size=7)
+    for s in range(len(swings)):
+        expected = brute_force_seats(e, swings[s])
+        assert {p: result.seats[p][s] for p in result.parties} == expected
+    with pytest.raises(ValueError):
+        SeatSimulator(e).uniform_swing([{'Whig': 0.1}])
+
+
+def test_monte_carlo_reproducible() -> None:
+    """Test that a seed gives the same results however the scenarios are
+    spread over processes, and that different seeds differ."""
+    sim = SeatSimulator(generated_election())
+    serial = sim.monte_carlo(300, {'Liberal': -0.03}, riding_sd=0.01,
+                             seed=7, workers=1, batch_size=100)
+    parallel = sim.monte_carlo(300, {'Liberal': -0.03}, riding_sd=0.01,
+                               seed=7, workers=2, batch_size=100)
+    assert serial.seats == parallel.seats
+    assert serial.scenarios == 300
+    assert sum(serial.win_probabilities().values()) >= 1.0
+    assert sum(serial.seat_distribution('Liberal').values()) == 300
+    other = sim.monte_carlo(300, riding_sd=0.01, seed=8, workers=1,
+                            batch_size=100)
+    assert other.seats != serial.seats
+    for scenario in zip(*serial.seats.values()):
+        assert sum(scenario) <= serial.ridings
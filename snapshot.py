@@ -0,0 +1,229 @@
+"""A compact binary snapshot format for election results, so that they can be
+reloaded without parsing the original csv files again.
+
+A snapshot holds a name and a list of elections.  Every riding and party name
+is stored once, in a table of interned strings shared by all elections in the
+snapshot, and each election refers to those names by their index in the
+table.  Vote counts are stored as packed arrays of integers.
+
+=== Layout ===
+All integers are little-endian.
+
+header:  magic (8 bytes), format version (uint16), reserved (uint16),
+         CRC-32 of the payload (uint32), length of the payload (uint64)
+payload: number of strings n (uint32), length of the string data (uint32),
+         n + 1 string offsets (uint32), the utf-8 string data,
+         index of the snapshot's name in the string table (uint32),
+         number of elections (uint32), then for each election:
+             date as a proleptic Gregorian ordinal (uint32),
+             number of ridings, parties and entries (uint32 each),
+             the string index of each riding (uint32) and party (uint32),
+             number of ridings + 1 entry offsets (uint32),
+             the party index of each entry (uint32),
+             the votes of each entry (int64)
+
+The entries for riding r are entries offsets[r] to offsets[r + 1] - 1, in the
+order in which their parties were first recorded in that riding.
+"""
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import date
+from typing import List, Tuple
+
+MAGIC = b'ELECSNAP'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<8sHHIQ')
+_COUNT = struct.Struct('<I')
+_ELECTION_HEADER = struct.Struct('<IIII')
+
+
+class ElectionRecord:
+    """The votes recorded in one election, as stored in a snapshot.
+
+    === Attributes ===
+    d: the date of the election.
+    ridings: the ridings recorded in the election, in order.
+    parties: the parties recorded in the election, in order.
+    offsets: the entries for ridings[r] are entries offsets[r] to
+        offsets[r + 1] - 1 of entry_parties and entry_votes.
+    entry_parties: for each entry, the index in parties of its party.
+    entry_votes: for each entry, the votes its party earned in its riding.
+
+    === Representation Invariants ===
+    - len(offsets) == len(ridings) + 1 and offsets[0] == 0
+    - len(entry_parties) == len(entry_votes) == offsets[-1]
+    - every value in entry_votes is > 0
+    """
+    d: date
+    ridings: List[str]
+    parties: List[str]
+    offsets: array
+    entry_parties: array
+    entry_votes: array
+
+    def __init__(self, d: date, ridings: List[str], parties: List[str],
+                 offsets: array, entry_parties: array,
+                 entry_votes: array) -> None:
+        """Initialize a new record of the election on <d>."""
+        self.d = d
+        self.ridings = ridings
+        self.parties = parties
+        self.offsets = offsets
+        self.entry_parties = entry_parties
+        self.entry_votes = entry_votes
+
+
+def _to_le(values: array) -> bytes:
+    """Return the contents of <values> as little-endian bytes."""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(typecode: str, data: memoryview) -> array:
+    """Return an array of <typecode> holding the little-endian <data>."""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def write_snapshot(path: str, name: str,
+                   records: List[ElectionRecord]) -> None:
+    """Write a snapshot named <name> holding <records> to the file at <path>.
+
+    The file is written under a temporary name and then renamed, so a reader
+    never sees a partly written snapshot.
+    """
+    strings = []
+    string_ids = {}
+
+    def intern(s: str) -> int:
+        """Return the index of <s> in the string table, adding it if need be.
+        """
+        if s not in string_ids:
+            string_ids[s] = len(strings)
+            strings.append(s.encode('utf-8'))
+        return string_ids[s]
+
+    name_id = intern(name)
+    body = []
+    for record in records:
+        ridings = array('I', [intern(riding) for riding in record.ridings])
+        parties = array('I', [intern(party) for party in record.parties])
+        body.append(_ELECTION_HEADER.pack(
+            record.d.toordinal(), len(ridings), len(parties),
+            len(record.entry_votes)))
+        body.extend([_to_le(ridings), _to_le(parties),
+                     _to_le(array('I', record.offsets)),
+                     _to_le(array('I', record.entry_parties)),
+                     _to_le(array('q', record.entry_votes))])
+
+    string_offsets = array('I', [0])
+    for s in strings:
+        string_offsets.append(string_offsets[-1] + len(s))
+    payload = b''.join(
+        [_COUNT.pack(len(strings)), _COUNT.pack(string_offsets[-1]),
+         _to_le(string_offsets), b''.join(strings),
+         _COUNT.pack(name_id), _COUNT.pack(len(records))] + body)
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as output:
+        output.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0,
+                                  zlib.crc32(payload), len(payload)))
+        output.write(payload)
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path: str) -> Tuple[str, List[ElectionRecord]]:
+    """Return the name and the election records of the snapshot in the file
+    at <path>.
+
+    The file is memory-mapped, and its arrays are copied straight out of the
+    mapping.
+
+    Raise ValueError if the file is not a snapshot, was written with another
+    version of the format, or fails its checksum.
+    """
+    with open(path, 'rb') as input_file:
+        if os.fstat(input_file.fileno()).st_size < _HEADER.size:
+            raise ValueError(path + ' is not an election snapshot')
+        with mmap.mmap(input_file.fileno(), 0,
+                       access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                return _parse(path, view)
+
+
+def _parse(path: str, view: memoryview) -> Tuple[str, List[ElectionRecord]]:
+    """Return the name and the election records of the snapshot <view>, which
+    was read from <path>.
+    """
+    magic, version, _, checksum, length = _HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError(path + ' is not an election snapshot')
+    if version != FORMAT_VERSION:
+        raise ValueError('{} has snapshot format version {}, expected {}'
+                         .format(path, version, FORMAT_VERSION))
+    with view[_HEADER.size:] as payload:
+        if len(payload) != length or zlib.crc32(payload) != checksum:
+            raise ValueError(path + ' is truncated or corrupt')
+        return _parse_payload(payload)
+
+
+def _parse_payload(payload: memoryview) -> Tuple[str, List[ElectionRecord]]:
+    """Return the name and the election records stored in the snapshot
+    <payload>.
+    """
+    pos = 0
+
+    def take(typecode: str, n: int) -> array:
+        """Return the next <n> values of <typecode> in the payload."""
+        nonlocal pos
+        size = array(typecode).itemsize * n
+        values = _from_le(typecode, payload[pos:pos + size])
+        pos += size
+        return values
+
+    n_strings = take('I', 1)[0]
+    n_bytes = take('I', 1)[0]
+    string_offsets = take('I', n_strings + 1)
+    data = bytes(payload[pos:pos + n_bytes])
+    pos += n_bytes
+    strings = [data[string_offsets[i]:string_offsets[i + 1]].decode('utf-8')
+               for i in range(n_strings)]
+
+    name = strings[take('I', 1)[0]]
+    records = []
+    for _ in range(take('I', 1)[0]):
+        ordinal, n_ridings, n_parties, n_entries = \
+            _ELECTION_HEADER.unpack_from(payload, pos)
+        pos += _ELECTION_HEADER.size
+        ridings = [strings[i] for i in take('I', n_ridings)]
+        parties = [strings[i] for i in take('I', n_parties)]
+        offsets = take('I', n_ridings + 1)
+        records.append(ElectionRecord(
+            date.fromordinal(ordinal), ridings, parties, offsets,
+            take('I', n_entries), take('q', n_entries)))
+
+    return name, records
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-io': ['write_snapshot', 'read_snapshot'],
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'array', 'datetime', 'mmap', 'os',
+            'struct', 'sys', 'typing', 'zlib'
+        ]
+    })
+
+    import doctest
+    doctest.testmod()
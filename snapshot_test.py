@@ -0,0 +1,92 @@
+import os
+import struct
+from datetime import date
+
+import pytest
+
+from elections import ArrayElection, Election, Jurisdiction
+from snapshot import FORMAT_VERSION, read_snapshot
+
+
+def data_jurisdiction_setup() -> Jurisdiction:
+    """Set up a Jurisdiction with two elections read from the data files."""
+    j = Jurisdiction('Canada')
+    for path in ['data/parkdale-highpark.csv', 'data/nunavut.csv']:
+        with open(path, encoding='utf-8') as file:
+            j.read_results(2015, 10, 19, file)
+    with open('data/toronto-stpauls.csv', encoding='utf-8') as file:
+        j.read_results(2011, 5, 2, file)
+    return j
+
+
+def test_jurisdiction_round_trip(tmp_path) -> None:
+    """Test that Jurisdiction.load gives back what Jurisdiction.save wrote."""
+    j = data_jurisdiction_setup()
+    path = str(tmp_path / 'canada.snapshot')
+    j.save(path)
+    j2 = Jurisdiction.load(path)
+    assert j2._name == 'Canada'
+    assert list(j2._elections) == list(j._elections)
+    for d in j._elections:
+        assert j2._elections[d]._ridings == j._elections[d]._ridings
+        assert j2._elections[d]._parties == j._elections[d]._parties
+        assert j2._elections[d]._results == j._elections[d]._results
+
+
+def test_columnar_round_trip(tmp_path) -> None:
+    """Test that a snapshot loads into ArrayElections with the same results.
+    """
+    j = data_jurisdiction_setup()
+    path = str(tmp_path / 'canada.snapshot')
+    j.save(path)
+    j2 = Jurisdiction.load(path, columnar=True)
+    for d in j._elections:
+        assert isinstance(j2._elections[d], ArrayElection)
+        assert j2._elections[d].summary() == j._elections[d].summary()
+
+    a = j2._elections[date(2015, 10, 19)]
+    a.save(path)
+    assert ArrayElection.load(path).summary() == a.summary()
+
+
+def test_election_load_rejects_jurisdiction(tmp_path) -> None:
+    """Test that Election.load rejects a snapshot of several elections."""
+    path = str(tmp_path / 'canada.snapshot')
+    data_jurisdiction_setup().save(path)
+    with pytest.raises(ValueError):
+        Election.load(path)
+
+
+def test_corrupt_snapshot(tmp_path) -> None:
+    """Test that a snapshot whose payload was changed fails its checksum."""
+    path = str(tmp_path / 'canada.snapshot')
+    data_jurisdiction_setup().save(path)
+    with open(path, 'r+b') as file:
+        file.seek(-1, os.SEEK_END)
+        last = file.read(1)
+        file.seek(-1, os.SEEK_END)
+        file.write(bytes([last[0] ^ 0xFF]))
+    with pytest.raises(ValueError, match='corrupt'):
+        read_snapshot(path)
+
+
+def test_stale_snapshot_version(tmp_path) -> None:
+    """Test that a snapshot written with another format version is rejected.
+    """
+    path = str(tmp_path / 'canada.snapshot')
+    data_jurisdiction_setup().save(path)
+    with open(path, 'r+b') as file:
+        file.seek(8)
+        file.write(struct.pack('<H', FORMAT_VERSION + 1))
+    with pytest.raises(ValueError, match='version'):
+        read_snapshot(path)
+
+
+def test_not_a_snapshot() -> None:
+    """Test that a csv file is not mistaken for a snapshot."""
+    with pytest.raises(ValueError, match='not an election snapshot'):
+        read_snapshot('data/small_data.csv')
+
+
+if __name__ == '__main__':
+    pytest.main(['snapshot_test.py'])
@@ -0,0 +1,193 @@
+"""A mapping from dates to values that keeps its dates in sorted order.
+
+Jurisdiction keeps its elections in a Timeline, so that they can be visited
+in date order without sorting them on every query, and so that the election
+nearest to, before or after a date, and the elections between two dates, can
+be found by binary search.
+
+The dates are kept in a sorted list.  Inserting a new date shifts the later
+dates along; for the hundreds of general elections and by-elections in a
+jurisdiction that is a single short memmove, and lookups stay O(log n).
+"""
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from typing import Dict, Generic, Iterator, List, MutableMapping, Optional, \
+    Sequence, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+def date_span(dates: Sequence[date], start: Optional[date],
+              end: Optional[date]) -> Tuple[int, int]:
+    """Return the first index, and one past the last index, of the dates in
+    the sorted sequence <dates> that are on or after <start> and on or before
+    <end>.  A bound of None does not limit the range.
+
+    >>> dates = [date(2000, 1, 1), date(2004, 1, 1), date(2008, 1, 1)]
+    >>> date_span(dates, date(2001, 1, 1), None)
+    (1, 3)
+    >>> date_span(dates, None, date(2004, 1, 1))
+    (0, 2)
+    >>> date_span(dates, date(2005, 1, 1), date(2001, 1, 1))
+    (2, 2)
+    """
+    lo = 0 if start is None else bisect_left(dates, start)
+    hi = len(dates) if end is None else bisect_right(dates, end)
+    return lo, max(lo, hi)
+
+
+class Timeline(MutableMapping[date, T], Generic[T]):
+    """A mapping from dates to values, iterated in increasing order of date.
+
+    === Private Attributes ===
+    _values: maps each date in this timeline to its value.
+    _dates: the dates in self._values, in increasing order.
+    _version: the number of times a value has been set or removed, so that
+        users of this timeline can tell cheaply whether it has changed.
+
+    === Representation Invariants ===
+    - self._dates is sorted, with no duplicates, and holds exactly the keys of
+      self._values
+
+    === Sample Usage ===
+    >>> t = Timeline()
+    >>> t[date(2008, 10, 14)] = 'c'
+    >>> t[date(2000, 11, 27)] = 'a'
+    >>> t[date(2004, 6, 28)] = 'b'
+    >>> list(t)
+    [datetime.date(2000, 11, 27), datetime.date(2004, 6, 28), \
+datetime.date(2008, 10, 14)]
+    >>> t.previous(date(2004, 6, 28))
+    datetime.date(2000, 11, 27)
+    >>> t.between(date(2001, 1, 1), date(2010, 1, 1))
+    [datetime.date(2004, 6, 28), datetime.date(2008, 10, 14)]
+    """
+    _values: Dict[date, T]
+    _dates: List[date]
+    _version: int
+
+    def __init__(self) -> None:
+        """Initialize an empty timeline."""
+        self._values = {}
+        self._dates = []
+        self._version = 0
+
+    def __getitem__(self, d: date) -> T:
+        """Return the value on <d>.  Raise KeyError if there is none."""
+        return self._values[d]
+
+    def __setitem__(self, d: date, value: T) -> None:
+        """Set the value on <d> to <value>."""
+        if d not in self._values:
+            insort(self._dates, d)
+        self._values[d] = value
+        self._version += 1
+
+    def __delitem__(self, d: date) -> None:
+        """Remove the value on <d>.  Raise KeyError if there is none."""
+        del self._values[d]
+        del self._dates[bisect_left(self._dates, d)]
+        self._version += 1
+
+    def __contains__(self, d: object) -> bool:
+        """Return whether this timeline has a value on <d>."""
+        return d in self._values
+
+    def __iter__(self) -> Iterator[date]:
+        """Yield the dates in this timeline in increasing order."""
+        return iter(self._dates)
+
+    def __len__(self) -> int:
+        """Return the number of dates in this timeline."""
+        return len(self._dates)
+
+    def __repr__(self) -> str:
+        """Return a representation of this timeline, in the form of a dict
+        in date order.
+
+        >>> Timeline()
+        {}
+        """
+        return repr({d: self._values[d] for d in self._dates})
+
+    def version(self) -> int:
+        """Return the number of times a value has been set in or removed from
+        this timeline.
+
+        >>> t = Timeline()
+        >>> t[date(2000, 11, 27)] = 'a'
+        >>> t[date(2000, 11, 27)] = 'b'
+        >>> t.version()
+        2
+        """
+        return self._version
+
+    def dates(self) -> List[date]:
+        """Return the dates in this timeline, in increasing order."""
+        return self._dates.copy()
+
+    def previous(self, d: date) -> Optional[date]:
+        """Return the latest date in this timeline before <d>, or None if
+        there is none.
+        """
+        i = bisect_left(self._dates, d)
+        return self._dates[i - 1] if i > 0 else None
+
+    def next(self, d: date) -> Optional[date]:
+        """Return the earliest date in this timeline after <d>, or None if
+        there is none.
+        """
+        i = bisect_right(self._dates, d)
+        return self._dates[i] if i < len(self._dates) else None
+
+    def nearest(self, d: date) -> Optional[date]:
+        """Return the date in this timeline closest to <d>, or None if this
+        timeline is empty.  Of two dates equally close, return the earlier.
+
+        >>> t = Timeline()
+        >>> t[date(2000, 1, 1)] = 'a'
+        >>> t[date(2000, 1, 5)] = 'b'
+        >>> t.nearest(date(2000, 1, 3))
+        datetime.date(2000, 1, 1)
+        >>> t.nearest(date(2000, 1, 4))
+        datetime.date(2000, 1, 5)
+        """
+        i = bisect_left(self._dates, d)
+        if i == len(self._dates):
+            return self._dates[-1] if self._dates else None
+        if i == 0 or self._dates[i] - d < d - self._dates[i - 1]:
+            return self._dates[i]
+        return self._dates[i - 1]
+
+    def between(self, start: Optional[date] = None,
+                end: Optional[date] = None) -> List[date]:
+        """Return the dates in this timeline on or after <start> and on or
+        before <end>, in increasing order.  A bound of None does not limit
+        the range.
+        """
+        lo, hi = date_span(self._dates, start, end)
+        return self._dates[lo:hi]
+
+    def pairs(self) -> List[Tuple[date, date]]:
+        """Return each pair of adjacent dates in this timeline, in increasing
+        order.
+
+        >>> t = Timeline()
+        >>> t[date(2004, 1, 1)] = 'b'
+        >>> t[date(2000, 1, 1)] = 'a'
+        >>> t.pairs()
+        [(datetime.date(2000, 1, 1), datetime.date(2004, 1, 1))]
+        """
+        return list(zip(self._dates, self._dates[1:]))
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'bisect', 'datetime', 'typing'
+        ]
+    })
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,56 @@
+from datetime import date
+
+from elections import Election, Jurisdiction
+from timeline import Timeline
+
+
+def test_sorted_on_insert_and_remove() -> None:
+    """Test that dates stay in order as they are added, replaced and
+    removed, including through the dict-style methods."""
+    t = Timeline()
+    t.update({date(2011, 5, 2): 'c', date(2004, 6, 28): 'a'})
+    t.setdefault(date(2006, 1, 23), 'b')
+    t[date(2004, 6, 28)] = 'A'
+    assert list(t.items()) == [(date(2004, 6, 28), 'A'),
+                               (date(2006, 1, 23), 'b'),
+                               (date(2011, 5, 2), 'c')]
+    assert t.pop(date(2006, 1, 23)) == 'b'
+    del t[date(2004, 6, 28)]
+    assert t.dates() == [date(2011, 5, 2)]
+    assert t == {date(2011, 5, 2): 'c'}
+
+
+def test_lookups() -> None:
+    """Test previous, next, nearest and between at and past both ends."""
+    t = Timeline()
+    assert t.nearest(date(2000, 1, 1)) is None
+    for d in [date(2000, 1, 1), date(2000, 1, 11), date(2000, 2, 1)]:
+        t[d] = d.day
+    assert t.previous(date(2000, 1, 1)) is None
+    assert t.previous(date(2000, 1, 2)) == date(2000, 1, 1)
+    assert t.next(date(2000, 1, 11)) == date(2000, 2, 1)
+    assert t.next(date(2000, 2, 1)) is None
+    assert t.nearest(date(1999, 1, 1)) == date(2000, 1, 1)
+    assert t.nearest(date(2000, 1, 6)) == date(2000, 1, 1)
+    assert t.nearest(date(2000, 1, 11)) == date(2000, 1, 11)
+    assert t.nearest(date(2001, 1, 1)) == date(2000, 2, 1)
+    assert t.between(date(2000, 1, 11)) == [date(2000, 1, 11),
+                                            date(2000, 2, 1)]
+    assert t.between(end=date(2000, 1, 10)) == [date(2000, 1, 1)]
+    assert t.between(date(2000, 1, 12), date(2000, 1, 31)) == []
+
+
+def test_jurisdiction_in_date_order() -> None:
+    """Test that a jurisdiction whose elections are added out of order gives
+    its riding changes and election dates in date order."""
+    j = Jurisdiction('Canada')
+    for d, riding in [(date(2008, 10, 14), 'r3'), (date(2000, 11, 27), 'r1'),
+                      (date(2004, 6, 28), 'r2')]:
+        e = Election(d)
+        e.update_results(riding, 'lib', 1)
+        j._elections[d] = e
+    assert j.election_dates() == [date(2000, 11, 27), date(2004, 6, 28),
+                                  date(2008, 10, 14)]
+    assert j.riding_changes() == [({'r1'}, {'r2'}), ({'r2'}, {'r3'})]
+    assert j.party_wins('lib') == j.election_dates()
+    assert j.previous_election(date(2008, 10, 14)) == date(2004, 6, 28)